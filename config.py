@@ -2,28 +2,31 @@
 """
 Shared configuration: paths, API keys, HTTP constants, and Flask app instance.
 All other modules import from here to avoid circular dependencies.
+
+Importing this module only reads settings. Anything that touches the disk,
+the network or a heavy dependency (LLM client, geocoding cache, map
+renderer/cache, Flask app) is built on first use by its get_*() accessor;
+the old module attributes (config.app, config.llm_client, ...) still work
+and resolve through those accessors.
 """
 
 import os
 import threading
 
-import pytz
-from flask import Flask
-from flask_cors import CORS
 from dotenv import load_dotenv
-from openai import OpenAI
 
-from geocoding import GeocodingCache
+from notify import ChangeChannel
 
 load_dotenv()
 
 # ── Paths ────────────────────────────────────────────────────────────────────
 BASE_DIR     = os.path.dirname(os.path.abspath(__file__))
 TARGET_DIR   = os.path.join(BASE_DIR, "traffic-app", "maps")
-DB_FILE      = os.path.join(BASE_DIR, "traffic_data.db")
+DB_FILE      = os.environ.get("TRAFFIC_DB_FILE") or os.path.join(BASE_DIR, "traffic_data.db")
 MAP_GENERATOR = os.path.join(BASE_DIR, "generate_map.py")
-
-os.makedirs(TARGET_DIR, exist_ok=True)
+MONITOR_LOCK_FILE = DB_FILE + ".monitor.lock"  # Ensures a single monitor per database
+CHANGE_FILE  = DB_FILE + ".changes"        # Monitor → API data-version channel
+METRICS_DIR  = DB_FILE + ".metrics.d"      # One metrics dump per process, merged by /metrics
 
 # ── Feature flags ────────────────────────────────────────────────────────────
 TESTMODE = os.environ.get("TESTMODE", "False").lower() == "true"
@@ -53,18 +56,193 @@ COOKIE_MAX_AGE = 60 * 60 * 24 * 365  # 1 year
 
 # ── OpenAI / OpenRouter client ───────────────────────────────────────────────
 GPT_KEY = os.getenv("GPT_KEY")
-llm_client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=GPT_KEY,
-)
+LLM_BASE_URL = "https://openrouter.ai/api/v1"
+
+# ── Static map renderer (pooled, in-process by default) ─────────────────────
+MAP_ACCESS_TOKEN = os.getenv("MAP_ACCESS_TOKEN")
+MAP_RENDER_MODE  = os.environ.get("MAP_RENDER_MODE", "inprocess").lower()
+MAP_BACKEND      = os.environ.get("MAP_BACKEND", "mapbox").lower()  # "mapbox" | "pmtiles"
+MAP_PMTILES_PATH = os.environ.get("MAP_PMTILES_PATH")  # None → bundled basemap
+MAP_RENDER_WORKERS = int(os.environ.get("MAP_RENDER_WORKERS", "4"))
+MAP_CACHE_MAX_BYTES = int(os.environ.get("MAP_CACHE_MAX_MB", "500")) * 1024 * 1024
+MAP_EVICTION_INTERVAL = 60 * 60  # seconds between map cache eviction passes
+
+# ── Archive tier ────────────────────────────────────────────────────────────
+# Closed incidents older than this many days move to incidents_archive; 0 disables
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_INTERVAL   = 60 * 60  # seconds between archive passes
+
+# ── Likes write-behind buffer ───────────────────────────────────────────────
+# Milliseconds between batched like flushes; 0 writes every like through immediately
+LIKE_FLUSH_MS = int(os.environ.get("LIKE_FLUSH_MS", "250"))
+
+# ── Monitor → API change notifications ──────────────────────────────────────
+change_channel = ChangeChannel(CHANGE_FILE)
+MONITOR_PARSE_WORKERS = int(os.environ.get("MONITOR_PARSE_WORKERS", "2"))
+
+# ── Stats snapshots ─────────────────────────────────────────────────────────
+# The monitor precomputes /api/incident_stats for every date_filter × source subset;
+# disabled, the API computes stats per request
+STATS_SNAPSHOTS         = os.environ.get("STATS_SNAPSHOTS", "True").lower() == "true"
+STATS_SNAPSHOT_INTERVAL = 60   # seconds between rebuilds while no data changes
+STATS_SNAPSHOT_MAX_AGE  = 300  # older snapshots are not served (monitor stopped)
+
+# ── Metrics ──────────────────────────────────────────────────────────────────
+METRICS_DUMP_INTERVAL = float(os.environ.get("METRICS_DUMP_INTERVAL", "5"))  # seconds, API workers
+
+# ── Logging ──────────────────────────────────────────────────────────────────
+LOG_LEVEL  = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()  # "text" or "json"
+
+# ── Request profiling ────────────────────────────────────────────────────────
+# Requests sending X-Profile: <PROFILE_TOKEN> are profiled; empty token disables the header
+PROFILE_TOKEN         = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE   = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))  # fraction of all requests
+PROFILE_SLOW_QUERY_MS = float(os.environ.get("PROFILE_SLOW_QUERY_MS", "50"))
+
+# ── Flask settings ───────────────────────────────────────────────────────────
+STATIC_FOLDER  = os.path.join(BASE_DIR, "traffic-app", "dist")
+# Let a fronting server (nginx/Apache) stream files via X-Sendfile when available
+USE_X_SENDFILE = os.environ.get("USE_X_SENDFILE", "False").lower() == "true"
+
+
+# ---------------------------------------------------------------------------
+# Lazily-built shared instances
+# ---------------------------------------------------------------------------
+
+_instances      = {}
+_instances_lock = threading.RLock()
+
+
+def _shared(name, factory):
+    """Build ``name`` once with ``factory`` and return the same instance afterwards."""
+    instance = _instances.get(name)
+    if instance is None:
+        with _instances_lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = _instances[name] = factory()
+    return instance
+
+
+def _build_llm_client():
+    from openai import OpenAI
+    return OpenAI(base_url=LLM_BASE_URL, api_key=GPT_KEY)
+
+
+def _build_geo_cache():
+    from geocoding import GeocodingCache
+    return GeocodingCache(DB_FILE)
+
+
+def _build_map_renderer():
+    from map_renderer import MapRenderer
+    return MapRenderer(
+        MAP_ACCESS_TOKEN,
+        mode=MAP_RENDER_MODE,
+        max_workers=MAP_RENDER_WORKERS,
+        generator_path=MAP_GENERATOR,
+        backend=MAP_BACKEND,
+        pmtiles_path=MAP_PMTILES_PATH,
+    )
+
+
+def _build_map_cache():
+    from generate_map import MAPBOX_STYLE
+    from map_cache import MapImageCache
+    from metrics import collector
+    from pmtiles_map import LOCAL_STYLE
+    cache = MapImageCache(
+        TARGET_DIR,
+        get_map_renderer(),
+        style=LOCAL_STYLE if MAP_BACKEND == "pmtiles" else MAPBOX_STYLE,
+        max_bytes=MAP_CACHE_MAX_BYTES,
+    )
+    collector(cache.collect)
+    return cache
+
 
-# ── Geocoding cache (shared across modules) ──────────────────────────────────
-geo_cache = GeocodingCache(DB_FILE)
+def _build_like_buffer():
+    from like_buffer import LikeBuffer
+    from metrics import collector
+    buffer = LikeBuffer(DB_FILE, flush_interval=LIKE_FLUSH_MS / 1000)
+    collector(buffer.collect)
+    return buffer
+
+
+def _build_suggest_index():
+    from suggest import SuggestIndex
+    return SuggestIndex(DB_FILE, change_channel)
+
+
+def _build_stats_snapshots():
+    from stats import StatsSnapshots
+    return StatsSnapshots(change_channel, max_age=STATS_SNAPSHOT_MAX_AGE)
+
+
+def _build_app():
+    from flask import Flask
+    from flask_cors import CORS
+    flask_app = Flask(__name__, static_folder=STATIC_FOLDER)
+    flask_app.config["USE_X_SENDFILE"] = USE_X_SENDFILE
+    CORS(flask_app, resources={
+        r"/api/*":   {"origins": "*"},
+        r"/maps/*":  {"origins": "*"},
+        r"/tiles/*": {"origins": "*"},
+    })
+    return flask_app
+
+
+def get_llm_client():
+    return _shared("llm_client", _build_llm_client)
+
+
+def get_geo_cache():
+    return _shared("geo_cache", _build_geo_cache)
+
+
+def get_map_renderer():
+    return _shared("map_renderer", _build_map_renderer)
+
+
+def get_map_cache():
+    return _shared("map_cache", _build_map_cache)
+
+
+def get_like_buffer():
+    """Shared LikeBuffer, or None when LIKE_FLUSH_MS=0 (write-through)."""
+    if LIKE_FLUSH_MS <= 0:
+        return None
+    return _shared("like_buffer", _build_like_buffer)
+
+
+def get_suggest_index():
+    return _shared("suggest_index", _build_suggest_index)
+
+
+def get_stats_snapshots():
+    return _shared("stats_snapshots", _build_stats_snapshots)
+
+
+def get_app():
+    return _shared("app", _build_app)
+
+
+_ACCESSORS = {
+    "llm_client":      get_llm_client,
+    "geo_cache":       get_geo_cache,
+    "map_renderer":    get_map_renderer,
+    "map_cache":       get_map_cache,
+    "like_buffer":     get_like_buffer,
+    "suggest_index":   get_suggest_index,
+    "stats_snapshots": get_stats_snapshots,
+    "app":             get_app,
+}
 
-# ── Thread locks ─────────────────────────────────────────────────────────────
-db_lock    = threading.Lock()
-print_lock = threading.Lock()
 
-# ── Flask app ─────────────────────────────────────────────────────────────────
-app = Flask(__name__, static_folder=os.path.join(BASE_DIR, "traffic-app", "dist"))
-CORS(app, resources={r"/api/*": {"origins": "*"}, r"/maps/*": {"origins": "*"}})
+def __getattr__(name):
+    # Backward compatibility: `from config import app` etc. build on first access
+    accessor = _ACCESSORS.get(name)
+    if accessor is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return accessor()
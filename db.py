@@ -3,50 +3,125 @@
 Database initialisation and all CRUD operations for the traffic app.
 """
 
+import calendar
+import html
 import json
+import random
+import re
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 
-from config import DB_FILE, db_lock
-from logger import safe_print
-from llm import generate_description
+import metrics
+import profiling
+from config import DB_FILE
+from logger import get_logger
+
+log = get_logger(__name__)
+
+
+def connect(db_file=None, timeout=30, **kwargs):
+    """Open a connection to the app database (traced while a request is profiled)."""
+    return profiling.connect(db_file or DB_FILE, timeout=timeout, **kwargs)
 
 
 # ---------------------------------------------------------------------------
 # Schema & migrations
 # ---------------------------------------------------------------------------
 
+# Low-cardinality text stored as small integer ids into `lookups` (see Lookups)
+ENCODED_FIELDS = ("type", "source", "city", "neighborhood", "location_desc")
+
+# Shared by incidents and incidents_archive (details: one timeline line per row of text).
+# ts_epoch is the stored time; the text timestamp, the day number and the
+# hour of the week (0 = Sunday 00:00, like strftime('%w')) derive from it.
+INCIDENT_SCHEMA = """
+    incident_no       TEXT,
+    date              TEXT,
+    ts_epoch          INTEGER,
+    city_id           INTEGER REFERENCES lookups(id),
+    neighborhood_id   INTEGER REFERENCES lookups(id),
+    location          TEXT,
+    location_desc_id  INTEGER REFERENCES lookups(id),
+    type_id           INTEGER REFERENCES lookups(id),
+    details           TEXT,
+    description       TEXT,
+    latitude          REAL,
+    longitude         REAL,
+    map_filename      TEXT,
+    likes             INTEGER DEFAULT 0,
+    active            INTEGER DEFAULT 1,
+    source_id         INTEGER REFERENCES lookups(id),
+    geocode_precision TEXT DEFAULT 'unknown',
+    severity          INTEGER DEFAULT NULL,
+    comment_count     INTEGER DEFAULT 0,
+    timestamp         TEXT    GENERATED ALWAYS AS (datetime(ts_epoch, 'unixepoch')) VIRTUAL,
+    day               INTEGER GENERATED ALWAYS AS (ts_epoch / 86400) STORED,
+    hour_of_week      INTEGER GENERATED ALWAYS AS ((ts_epoch / 86400 + 4) % 7 * 24 + ts_epoch % 86400 / 3600) STORED,
+    PRIMARY KEY (incident_no, date)
+"""
+SECONDS_PER_DAY = 86400
+
+# Scraped type names folded into the standard ones ("Trfc Collision*" too, by prefix)
+TYPE_ALIASES = {
+    "Assist CT with Maintenance": "Maintenance",
+    "Road/Weather Conditions":    "Road Conditions",
+    "Object Flying From Veh":     "Debris from Vehicle",
+    "Assist with Construction":   "Construction",
+}
+IGNORED_TYPES = ("Request CalTrans Notify",)
+
+
+def to_epoch(value):
+    """ts_epoch for a naive datetime or timestamp text (None if the text does not parse).
+
+    Incident times are local wall-clock times without a zone, and ts_epoch
+    keeps them on that clock: seconds from 1970-01-01 00:00 local, which is
+    what SQLite's strftime('%s') gives for the same text. Days and hours of
+    the week then fall on local boundaries with plain integer arithmetic.
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None if value is None else calendar.timegm(value.timetuple())
+
+
+def to_day(value):
+    """``day`` column value (days since 1970-01-01) for a datetime."""
+    return to_epoch(value) // SECONDS_PER_DAY
+
+
+def hour_of_week(value):
+    """``hour_of_week`` column value (0 = Sunday 00:00) for a datetime."""
+    return value.isoweekday() % 7 * 24 + value.hour
+
+
 def init_db():
     """Initialize SQLite database schema and run any pending migrations."""
-    with sqlite3.connect(DB_FILE, timeout=30) as conn:
+    with connect() as conn:
         conn.execute("PRAGMA journal_mode=WAL")   # Better concurrent read/write
         conn.execute("PRAGMA synchronous=NORMAL")  # Balanced durability/speed
         conn.execute("PRAGMA foreign_keys = ON")
+        # Every API worker and the monitor call this on start: take the write
+        # lock up front so their checks and DDL run one process at a time
+        conn.execute("BEGIN IMMEDIATE")
         cur = conn.cursor()
+        lookups.reset()
 
         # ── Core tables ────────────────────────────────────────────────────
         cur.execute("""
-            CREATE TABLE IF NOT EXISTS incidents (
-                incident_no       TEXT,
-                date              TEXT,
-                timestamp         TEXT,
-                city              TEXT,
-                neighborhood      TEXT,
-                location          TEXT,
-                location_desc     TEXT,
-                type              TEXT,
-                details           TEXT,
-                description       TEXT,
-                latitude          REAL,
-                longitude         REAL,
-                map_filename      TEXT,
-                likes             INTEGER DEFAULT 0,
-                comments          TEXT DEFAULT '[]',
-                active            INTEGER DEFAULT 1,
-                source            TEXT DEFAULT 'CHP',
-                PRIMARY KEY (incident_no, date)
+            CREATE TABLE IF NOT EXISTS lookups (
+                id     INTEGER PRIMARY KEY,
+                field  TEXT NOT NULL,
+                value  TEXT NOT NULL,
+                UNIQUE (field, value)
             )
         """)
+        cur.execute(f"CREATE TABLE IF NOT EXISTS incidents ({INCIDENT_SCHEMA})")
         cur.execute("""
             CREATE TABLE IF NOT EXISTS likes (
                 device_uuid  TEXT,
@@ -65,50 +140,630 @@ def init_db():
                 timestamp   TEXT
             )
         """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS stats_snapshots (
+                date_filter TEXT NOT NULL,
+                sources     TEXT NOT NULL,
+                stats       TEXT NOT NULL,
+                built_at    REAL NOT NULL,
+                PRIMARY KEY (date_filter, sources)
+            )
+        """)
 
         # ── Migrations (safe ALTER TABLE with fallback) ────────────────────
-        _add_column(cur, "incidents", "source",           "TEXT DEFAULT 'CHP'")
-        _add_column(cur, "incidents", "geocode_precision", "TEXT DEFAULT 'unknown'")
-        _add_column(cur, "incidents", "severity",          "INTEGER DEFAULT NULL")
+        if "type" in _incident_columns(cur):  # text layout from before dictionary encoding
+            _add_column(cur, "incidents", "source",           "TEXT DEFAULT 'CHP'")
+            _add_column(cur, "incidents", "geocode_precision", "TEXT DEFAULT 'unknown'")
+            _add_column(cur, "incidents", "severity",          "INTEGER DEFAULT NULL")
+            if _add_column(cur, "incidents", "comment_count", "INTEGER DEFAULT 0"):
+                cur.execute("""
+                    UPDATE incidents SET comment_count =
+                        (SELECT COUNT(*) FROM comments c WHERE c.incident_no = incidents.incident_no)
+                """)
 
-        # ── Type normalisation ─────────────────────────────────────────────
-        _normalise_types(cur)
+        # ── Table rebuilds (dictionary encoding, epoch timestamps) ─────────
+        migrated = _migrate_tables(cur)
 
         # ── Indexes ────────────────────────────────────────────────────────
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_incidents_timestamp ON incidents(timestamp)")
+        _init_time_indexes(cur, "incidents")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_incidents_active    ON incidents(active)")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_incidents_date      ON incidents(date)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_comments_incident   ON comments(incident_no, id)")
+
+        # ── Denormalised like/comment counters ─────────────────────────────
+        _init_counter_triggers(cur)
+
+        # ── Spatial index ──────────────────────────────────────────────────
+        _init_spatial_index(cur)
+
+        # ── Full-text index ────────────────────────────────────────────────
+        _init_fulltext_index(cur)
+
+        # ── Archive tier ───────────────────────────────────────────────────
+        _init_archive(cur)
+        _init_fulltext_index(cur, "incidents_archive")
 
         conn.commit()
+        if migrated:
+            log.info("Rebuilt %s in the current layout; compacting the database file.", ", ".join(migrated))
+            conn.execute("VACUUM")
 
 
 def _add_column(cur, table, column, definition):
-    """Safely add a column; ignore if it already exists."""
+    """Safely add a column; ignore if it already exists. Returns True if it was added."""
     try:
         cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
     except sqlite3.OperationalError:
-        pass  # Column already exists
+        return False  # Column already exists
+
+
+def _init_time_indexes(cur, table):
+    """Indexes behind range reads and chart buckets, day filters and hour-of-week averages."""
+    prefix = "idx_archive" if table == "incidents_archive" else "idx_incidents"
+    cur.execute(f"CREATE INDEX IF NOT EXISTS {prefix}_ts_epoch  ON {table}(ts_epoch)")
+    cur.execute(f"CREATE INDEX IF NOT EXISTS {prefix}_source_ts ON {table}(source_id, ts_epoch)")
+    cur.execute(f"CREATE INDEX IF NOT EXISTS {prefix}_day       ON {table}(day)")
+    cur.execute(f"CREATE INDEX IF NOT EXISTS {prefix}_how       ON {table}(hour_of_week, source_id, day)")
+
+
+def _normalise_types(cur, table="incidents"):
+    """Standardise type names in a text-layout table (new rows go through normalise_type)."""
+    cur.execute(f"UPDATE {table} SET type = 'Traffic Collision' WHERE type LIKE 'Trfc Collision%'")
+    for legacy, standard in TYPE_ALIASES.items():
+        cur.execute(f"UPDATE {table} SET type = ? WHERE type = ?", (standard, legacy))
+    for ignored in IGNORED_TYPES:
+        cur.execute(f"DELETE FROM {table} WHERE type = ?", (ignored,))
+
+
+def _migrate_tables(cur):
+    """Rebuild incident tables from older layouts in the current one. Returns the tables rebuilt.
+
+    Generated columns cannot be added with ALTER TABLE, so any table
+    without ts_epoch is copied into INCIDENT_SCHEMA.
+    """
+    legacy = []
+    for table in ("incidents", "incidents_archive"):
+        columns = _incident_columns(cur, table)
+        if columns and "ts_epoch" not in columns:
+            legacy.append(table)
+    if legacy:  # once per old database, under init_db's write lock
+        cur.execute("DROP VIEW IF EXISTS incidents_all")  # init_db recreates it
+    for table in legacy:
+        cur.execute(f"DROP VIEW IF EXISTS {table}_decoded")
+        if "type" in _incident_columns(cur, table):  # text layout from before dictionary encoding
+            _normalise_types(cur, table)
+        _rebuild_table(cur, table)
+    return legacy
+
+
+def _rebuild_table(cur, table):
+    """Copy ``table`` into the current layout in one pass and swap it in.
+
+    Text values become lookups ids, JSON details become newline-separated
+    lines, timestamps become ts_epoch and the unused ``comments`` column is
+    dropped. Rowids are kept, so the R*Tree stays valid; the FTS index is
+    dropped and rebuilt by init_db because its content now comes through
+    the decoded view.
+    """
+    legacy = set(_incident_columns(cur, table))
+    for field in ENCODED_FIELDS:
+        if field in legacy:
+            cur.execute(
+                f"INSERT OR IGNORE INTO lookups (field, value) "
+                f"SELECT DISTINCT ?, {field} FROM {table} WHERE {field} IS NOT NULL",
+                (field,),
+            )
+
+    rebuilt = f"{table}_rebuilt"
+    cur.execute(f"DROP TABLE IF EXISTS {rebuilt}")
+    cur.execute(f"CREATE TABLE {rebuilt} ({INCIDENT_SCHEMA})")
+    columns, values = [], []
+    for column in _incident_columns(cur, rebuilt):
+        field = column[:-3]
+        if column.endswith("_id") and field in legacy:
+            columns.append(column)
+            values.append(f"(SELECT id FROM lookups WHERE field = '{field}' AND value = t.{field})")
+        elif column == "details":
+            columns.append(column)
+            values.append(_DETAILS_FROM_JSON)
+        elif column == "ts_epoch":
+            columns.append(column)
+            values.append("CAST(strftime('%s', t.timestamp) AS INTEGER)")
+        elif column in legacy:
+            columns.append(column)
+            values.append(f"t.{column}")
+    cur.execute(
+        f"INSERT INTO {rebuilt} (rowid, {', '.join(columns)}) "
+        f"SELECT t.rowid, {', '.join(values)} FROM {table} t"
+    )
+
+    cur.execute(f"DROP TABLE {table}")
+    cur.execute(f"DROP TABLE IF EXISTS {table}_fts")
+    # Legacy rename: the counter triggers on likes/comments name the table and
+    # must not be re-checked while it is briefly missing
+    cur.execute("PRAGMA legacy_alter_table = ON")
+    cur.execute(f"ALTER TABLE {rebuilt} RENAME TO {table}")
+    cur.execute("PRAGMA legacy_alter_table = OFF")
+
+
+# JSON details array -> newline-separated lines (NULL when empty)
+_DETAILS_FROM_JSON = """
+    CASE
+        WHEN t.details IS NULL OR t.details IN ('', '[]') THEN NULL
+        WHEN json_valid(t.details) AND json_type(t.details) = 'array' THEN
+            (SELECT group_concat(replace(value, char(10), ' '), char(10)) FROM json_each(t.details))
+        ELSE t.details
+    END
+"""
+
+
+def _init_counter_triggers(cur):
+    """Keep incidents.likes / incidents.comment_count in step with their tables.
+
+    Every row-level change to likes or comments adjusts the counter in the
+    same transaction, so toggling a like is one statement and readers never
+    need to COUNT(*).
+    """
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS likes_count_ai AFTER INSERT ON likes
+        BEGIN
+            UPDATE incidents SET likes = likes + 1 WHERE incident_no = new.incident_no;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS likes_count_ad AFTER DELETE ON likes
+        BEGIN
+            UPDATE incidents SET likes = MAX(likes - 1, 0) WHERE incident_no = old.incident_no;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS comments_count_ai AFTER INSERT ON comments
+        BEGIN
+            UPDATE incidents SET comment_count = comment_count + 1 WHERE incident_no = new.incident_no;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS comments_count_ad AFTER DELETE ON comments
+        BEGIN
+            UPDATE incidents SET comment_count = MAX(comment_count - 1, 0) WHERE incident_no = old.incident_no;
+        END
+    """)
+
+
+def _init_spatial_index(cur):
+    """Create the R*Tree over incident coordinates, kept in sync by triggers."""
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'incidents_rtree'")
+    needs_backfill = cur.fetchone() is None
+
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS incidents_rtree USING rtree(
+            id, min_lon, max_lon, min_lat, max_lat
+        )
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS incidents_rtree_ai AFTER INSERT ON incidents
+        WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL
+        BEGIN
+            INSERT OR REPLACE INTO incidents_rtree
+            VALUES (new.rowid, new.longitude, new.longitude, new.latitude, new.latitude);
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS incidents_rtree_au AFTER UPDATE OF latitude, longitude ON incidents
+        BEGIN
+            DELETE FROM incidents_rtree WHERE id = old.rowid;
+            INSERT INTO incidents_rtree
+            SELECT new.rowid, new.longitude, new.longitude, new.latitude, new.latitude
+            WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS incidents_rtree_ad AFTER DELETE ON incidents
+        BEGIN
+            DELETE FROM incidents_rtree WHERE id = old.rowid;
+        END
+    """)
+
+    if needs_backfill:
+        cur.execute("""
+            INSERT INTO incidents_rtree
+            SELECT rowid, longitude, longitude, latitude, latitude FROM incidents
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        """)
+
+
+FTS_COLUMNS = ("location", "location_desc", "neighborhood", "type", "description", "details")
+
+
+def _lookup_value(ref, field):
+    """SQL for the text of ``ref``'s encoded ``field`` (``ref`` is a table alias or new/old)."""
+    if field in ENCODED_FIELDS:
+        return f"(SELECT value FROM lookups WHERE id = {ref}.{field}_id)"
+    return f"{ref}.{field}"
+
+
+def _init_decoded_view(cur, table):
+    """Create ``<table>_decoded``: ``table`` with text in place of lookup ids.
+
+    It is the FTS index's content table and handy for ad-hoc queries; the
+    app itself decodes in Python through ``lookups``.
+    """
+    columns = []
+    for column in _incident_columns(cur, table, generated=True):
+        field = column[:-3]
+        if column.endswith("_id") and field in ENCODED_FIELDS:
+            columns.append(f"{_lookup_value('t', field)} AS {field}")
+        else:
+            columns.append(f"t.{column}")
+    _ensure_view(cur, f"{table}_decoded", f"SELECT t.rowid AS id, {', '.join(columns)} FROM {table} t")
+
+
+def _init_fulltext_index(cur, table="incidents"):
+    """Create the FTS5 index over ``table``'s text, kept in sync by triggers.
+
+    External-content table: the text lives only in ``table`` (read through
+    the decoded view), the index stores just the tokens. The update trigger
+    fires only when an indexed column changes, so likes/active flips don't
+    churn the index.
+    """
+    fts = f"{table}_fts"
+    _init_decoded_view(cur, table)
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+    needs_backfill = cur.fetchone() is None
+
+    columns    = ", ".join(FTS_COLUMNS)
+    stored     = ", ".join(f"{c}_id" if c in ENCODED_FIELDS else c for c in FTS_COLUMNS)
+    new_values = ", ".join(_lookup_value("new", c) for c in FTS_COLUMNS)
+    old_values = ", ".join(_lookup_value("old", c) for c in FTS_COLUMNS)
+    cur.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {columns},
+            content='{table}_decoded', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO {fts} (rowid, {columns}) VALUES (new.rowid, {new_values});
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {stored} ON {table}
+        BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+            INSERT INTO {fts} (rowid, {columns}) VALUES (new.rowid, {new_values});
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+        END
+    """)
+
+    if needs_backfill:
+        cur.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def _incident_columns(cur, table="incidents", generated=False):
+    """Column names of ``table`` in declaration order; generated columns only if asked for."""
+    cur.execute(f"PRAGMA table_xinfo({table})")
+    return [row[1] for row in cur.fetchall() if row[6] == 0 or (generated and row[6] in (2, 3))]
+
+
+def _ensure_view(cur, name, select):
+    """Create view ``name`` as ``select``, replacing an existing one only if its definition differs."""
+    sql = f"CREATE VIEW {name} AS {select}".rstrip()  # sqlite_master keeps it without trailing space
+    cur.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = ?", (name,))
+    row = cur.fetchone()
+    if row is not None and row[0] == sql:
+        return
+    if row is not None:
+        cur.execute(f"DROP VIEW {name}")
+    cur.execute(sql)
+
+
+def _init_archive(cur):
+    """Create the cold tier: incidents_archive, its indexes and the incidents_all view.
+
+    The archive shares the live table's schema (older layouts are rebuilt
+    by _migrate_tables), so rows move between tiers with a plain
+    INSERT ... SELECT.
+    """
+    cur.execute(f"CREATE TABLE IF NOT EXISTS incidents_archive ({INCIDENT_SCHEMA})")
+    _init_time_indexes(cur, "incidents_archive")
+
+    # Lists the current columns; replaced only when they change
+    columns = ", ".join(_incident_columns(cur, generated=True))
+    _ensure_view(cur, "incidents_all", f"""
+            SELECT {columns} FROM incidents
+            UNION ALL
+            SELECT {columns} FROM incidents_archive
+    """)
+
+    # Likes/comments on archived incidents still move their counters
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS likes_count_archive_ai AFTER INSERT ON likes
+        BEGIN
+            UPDATE incidents_archive SET likes = likes + 1 WHERE incident_no = new.incident_no;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS likes_count_archive_ad AFTER DELETE ON likes
+        BEGIN
+            UPDATE incidents_archive SET likes = MAX(likes - 1, 0) WHERE incident_no = old.incident_no;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS comments_count_archive_ai AFTER INSERT ON comments
+        BEGIN
+            UPDATE incidents_archive SET comment_count = comment_count + 1 WHERE incident_no = new.incident_no;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS comments_count_archive_ad AFTER DELETE ON comments
+        BEGIN
+            UPDATE incidents_archive SET comment_count = MAX(comment_count - 1, 0)
+            WHERE incident_no = old.incident_no;
+        END
+    """)
+
+
+# ---------------------------------------------------------------------------
+# Dictionary encoding
+# ---------------------------------------------------------------------------
+
+class Lookups:
+    """In-memory two-way map between lookup ids and the values they encode.
+
+    ``lookups`` is append-only, so an id always means the same value and
+    both directions can be cached for the life of the process. A miss
+    reloads the whole table (a few hundred rows; another process may have
+    added values). New values are committed in their own short transaction
+    before any incident row refers to them.
+    """
+
+    def __init__(self):
+        self._lock    = threading.Lock()
+        self._db_file = None
+        self._values  = {}  # id -> value
+        self._ids     = {}  # (field, value) -> id
+
+    def reset(self):
+        with self._lock:
+            self._db_file = None
+
+    def _sync(self, reload=False):
+        """Reload if asked to, or if the process has switched databases (tests, scripts)."""
+        if reload or self._db_file != DB_FILE:
+            with connect() as conn:
+                rows = conn.execute("SELECT id, field, value FROM lookups").fetchall()
+            self._db_file = DB_FILE
+            self._values  = {lookup_id: value for lookup_id, _field, value in rows}
+            self._ids     = {(field, value): lookup_id for lookup_id, field, value in rows}
+
+    def value(self, lookup_id):
+        """The value behind ``lookup_id`` (None for None)."""
+        if lookup_id is None:
+            return None
+        if self._db_file == DB_FILE:  # fast path: the maps are only ever replaced whole
+            value = self._values.get(lookup_id)
+            if value is not None:
+                return value
+        with self._lock:
+            self._sync()
+            if lookup_id not in self._values:
+                self._sync(reload=True)
+            return self._values.get(lookup_id)
+
+    def ids(self, field, values):
+        """Ids for filtering on ``field``; unknown values map to None, which matches nothing in SQL."""
+        if not values:
+            return []
+        with self._lock:
+            self._sync()
+            if any((field, value) not in self._ids for value in values):
+                self._sync(reload=True)
+            return [self._ids.get((field, value)) for value in values]
+
+    def id_for(self, field, value):
+        """Id of ``value`` in ``field``, adding it to the dictionary if it is new."""
+        if value is None:
+            return None
+        key = (field, value)
+        with self._lock:
+            self._sync()
+            if key not in self._ids:
+                self._sync(reload=True)
+            if key not in self._ids:
+                with write_transaction("lookup") as conn:
+                    conn.execute(
+                        "INSERT INTO lookups (field, value) VALUES (?, ?) ON CONFLICT DO NOTHING", key,
+                    )
+                    lookup_id = conn.execute(
+                        "SELECT id FROM lookups WHERE field = ? AND value = ?", key,
+                    ).fetchone()[0]
+                self._ids[key] = lookup_id
+                self._values[lookup_id] = value
+            return self._ids[key]
+
+    def decode(self, row):
+        """Replace the ``<field>_id`` keys of a row dict with ``<field>`` values, in place."""
+        for field, key in _ID_COLUMNS:
+            if key in row:
+                row[field] = self.value(row.pop(key))
+        return row
+
+
+_ID_COLUMNS = [(field, f"{field}_id") for field in ENCODED_FIELDS]
+
+lookups = Lookups()
+
+
+def normalise_type(value):
+    """Standard name for a scraped incident type."""
+    if value and value.startswith("Trfc Collision"):
+        return "Traffic Collision"
+    return TYPE_ALIASES.get(value, value)
+
+
+def encode_details(details):
+    """Timeline lines as stored: newline-separated text, None when empty."""
+    lines = [str(line).replace("\n", " ") for line in details or []]
+    return "\n".join(lines) if lines else None
+
+
+def decode_details(stored):
+    """Timeline lines from a stored ``details`` value (JSON arrays from older rows are accepted)."""
+    if not stored:
+        return []
+    if stored == "[]" or stored.startswith('["'):
+        try:
+            return json.loads(stored)
+        except ValueError:
+            pass
+    return stored.split("\n")
+
+
+def decode_incident(row):
+    """Turn a stored incident row dict into its API shape: text fields and a ``Details`` list."""
+    lookups.decode(row)
+    row["Details"] = decode_details(row.pop("details", None))
+    return row
+
+
+# ---------------------------------------------------------------------------
+# Write coordination
+# ---------------------------------------------------------------------------
+# Readers take no lock at all (WAL gives them a consistent snapshot). Writers
+# open their transaction with BEGIN IMMEDIATE, which takes SQLite's single
+# write lock up front instead of upgrading mid-transaction (the source of
+# SQLITE_BUSY deadlocks), and retry with jittered backoff if it stays busy.
+# SQLite's lock also covers other processes (monitor vs API workers), which an
+# in-process threading.Lock cannot.
+
+WRITE_BUSY_TIMEOUT = 5.0   # seconds SQLite waits for the write lock per attempt
+WRITE_RETRIES      = 5     # attempts before giving up
+WRITE_BACKOFF      = 0.05  # base backoff between attempts (doubles each retry)
+
+DB_WRITE_WAIT     = metrics.histogram(
+    "traffic_db_write_lock_wait_seconds", "Time spent acquiring the SQLite write lock.", ["label"],
+)
+DB_WRITE_HOLD     = metrics.histogram(
+    "traffic_db_write_seconds", "Time the SQLite write lock was held per transaction.", ["label"],
+)
+DB_WRITE_RETRIES  = metrics.counter(
+    "traffic_db_write_busy_retries_total", "BEGIN IMMEDIATE attempts that found the DB busy.", ["label"],
+)
+DB_WRITE_FAILURES = metrics.counter(
+    "traffic_db_write_failures_total", "Write transactions that failed or rolled back.", ["label"],
+)
+
+
+class WriteStats:
+    """Contention counters for write transactions, overall and per label."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.transactions = 0
+            self.busy_retries = 0
+            self.failures     = 0
+            self.wait_total   = 0.0   # seconds spent acquiring the write lock
+            self.wait_max     = 0.0
+            self.hold_total   = 0.0   # seconds the write lock was held
+            self.hold_max     = 0.0
+            self.by_label     = {}
+
+    def record(self, label, wait, hold, retries, ok):
+        DB_WRITE_WAIT.observe(wait, label=label)
+        if retries:
+            DB_WRITE_RETRIES.inc(retries, label=label)
+        if ok:
+            DB_WRITE_HOLD.observe(hold, label=label)
+        else:
+            DB_WRITE_FAILURES.inc(label=label)
+        with self._lock:
+            self.busy_retries += retries
+            self.wait_total   += wait
+            self.wait_max      = max(self.wait_max, wait)
+            if not ok:
+                self.failures += 1
+                return
+            self.transactions += 1
+            self.hold_total   += hold
+            self.hold_max      = max(self.hold_max, hold)
+            self.by_label[label] = self.by_label.get(label, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            n = self.transactions or 1
+            return {
+                "transactions":  self.transactions,
+                "busy_retries":  self.busy_retries,
+                "failures":      self.failures,
+                "wait_avg_ms":   self.wait_total / n * 1000,
+                "wait_max_ms":   self.wait_max * 1000,
+                "hold_avg_ms":   self.hold_total / n * 1000,
+                "hold_max_ms":   self.hold_max * 1000,
+                "by_label":      dict(self.by_label),
+            }
+
+
+write_stats = WriteStats()
 
 
-def _normalise_types(cur):
-    """Standardise legacy type names in the incidents table."""
-    mappings = [
-        ("type LIKE 'Trfc Collision%'",            "Traffic Collision"),
-        ("type = 'Assist CT with Maintenance'",    "Maintenance"),
-        ("type = 'Road/Weather Conditions'",       "Road Conditions"),
-        ("type = 'Object Flying From Veh'",        "Debris from Vehicle"),
-        ("type = 'Assist with Construction'",      "Construction"),
-    ]
-    for condition, new_type in mappings:
-        cur.execute(f"UPDATE incidents SET type = ? WHERE {condition}", (new_type,))
+def is_busy_error(error):
+    """True for SQLITE_BUSY / SQLITE_LOCKED errors (another connection holds the lock)."""
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
 
-    cur.execute("DELETE FROM incidents WHERE type = 'Request CalTrans Notify'")
+
+@contextmanager
+def write_transaction(label="write", db_file=None):
+    """Yield a connection inside a BEGIN IMMEDIATE transaction; commit on success.
+
+    Retries acquiring the write lock on SQLITE_BUSY and rolls back on any
+    exception. Keep slow work (network, LLM) outside the block.
+    """
+    conn = connect(db_file, timeout=WRITE_BUSY_TIMEOUT, isolation_level=None)
+    start, retries = time.perf_counter(), 0
+    try:
+        while True:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                break
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or retries + 1 >= WRITE_RETRIES:
+                    write_stats.record(label, time.perf_counter() - start, 0.0, retries, ok=False)
+                    raise
+                retries += 1
+                time.sleep(WRITE_BACKOFF * 2 ** retries * random.uniform(0.5, 1.5))
+
+        acquired = time.perf_counter()
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            write_stats.record(label, acquired - start, 0.0, retries, ok=False)
+            raise
+        write_stats.record(label, acquired - start, time.perf_counter() - acquired, retries, ok=True)
+    finally:
+        conn.close()
 
 
 # ---------------------------------------------------------------------------
 # Read
 # ---------------------------------------------------------------------------
 
+COMMENT_PREVIEW  = 3   # latest comments embedded in each list item
+MAX_USER_COMMENTS = 2  # per username per incident
+
 def read_incidents(
     limit=20,
     incident_types=None,
@@ -120,39 +775,52 @@ def read_incidents(
     device_uuid=None,
 ):
     """Fetch incidents with optional filtering, cursor-based pagination, and embedded comments."""
-    with sqlite3.connect(DB_FILE, timeout=30) as conn:
+    with connect() as conn:
         conn.row_factory = sqlite3.Row
         cur = conn.cursor()
 
         conditions, params = [], []
 
         if sources:
-            _in(conditions, params, "source", sources)
+            _in(conditions, params, "source_id", lookups.ids("source", sources))
         if incident_types:
-            _in(conditions, params, "type", incident_types)
+            _in(conditions, params, "type_id", lookups.ids("type", incident_types))
         if locations:
             _in(conditions, params, "location", locations)
         if active_only:
             conditions.append("active = 1")
         if date_filter in ("day", "daily"):
-            conditions.append("date = ?")
-            params.append(datetime.now().strftime("%Y-%m-%d"))
+            conditions.append("day = ?")
+            params.append(to_day(datetime.now()))
         if cursor:
+            # Cursors carry the text timestamp the client was given
             if "|" in cursor:
                 ts_part, id_part = cursor.split("|", 1)
-                conditions.append("(timestamp, incident_no) < (?, ?)")
-                params.extend([ts_part, id_part])
+                conditions.append("(ts_epoch, incident_no) < (?, ?)")
+                params.extend([to_epoch(ts_part), id_part])
             else:
-                conditions.append("timestamp < ?")
-                params.append(cursor)
+                conditions.append("ts_epoch < ?")
+                params.append(to_epoch(cursor))
 
         where = " WHERE " + " AND ".join(conditions) if conditions else ""
-        query = f"SELECT * FROM incidents{where} ORDER BY timestamp DESC, incident_no DESC LIMIT ?"
+        query = f"SELECT * FROM incidents{where} ORDER BY ts_epoch DESC, incident_no DESC LIMIT ?"
         params.append(limit)
 
         cur.execute(query, tuple(params))
         incidents = [dict(row) for row in cur.fetchall()]
 
+        # Older pages continue into the archive once they reach archived dates
+        horizon = archive_horizon(cur)
+        if horizon is not None and (
+            len(incidents) < limit or (incidents[-1]["day"] or 0) <= horizon
+        ):
+            cur.execute(query.replace("FROM incidents", "FROM incidents_archive", 1), tuple(params))
+            incidents += [dict(row) for row in cur.fetchall()]
+            incidents.sort(key=lambda inc: (inc["ts_epoch"] or 0, inc["incident_no"] or ""), reverse=True)
+            del incidents[limit:]
+
+        for inc in incidents:
+            decode_incident(inc)
         if incidents:
             _attach_comments(cur, incidents)
             _attach_user_like_state(cur, incidents, device_uuid)
@@ -160,32 +828,56 @@ def read_incidents(
         return incidents
 
 
+def archive_horizon(cur):
+    """Latest ``day`` held in incidents_archive, or None if nothing is archived."""
+    cur.execute("SELECT MAX(day) FROM incidents_archive")
+    return cur.fetchone()[0]
+
+
+def incident_table(cur, since=None):
+    """Table to read for rows from ``since`` (ts_epoch seconds, None = all time) on.
+
+    The live table alone unless the range reaches back into archived days,
+    in which case the incidents_all view unions both tiers.
+    """
+    horizon = archive_horizon(cur)
+    if horizon is None or (since is not None and since // SECONDS_PER_DAY > horizon):
+        return "incidents"
+    return "incidents_all"
+
+
 def _in(conditions, params, column, values):
     placeholders = ",".join("?" for _ in values)
     conditions.append(f"{column} IN ({placeholders})")
     params.extend(values)
 
 
+def _comment_dict(row):
+    return {"id": row["id"], "username": row["username"] or "Anonymous",
+            "comment": row["comment"], "timestamp": row["timestamp"]}
+
+
 def _attach_comments(cur, incidents):
-    """Join comments onto each incident dict in-place."""
+    """Attach the latest COMMENT_PREVIEW comments (oldest first) to each incident in-place.
+
+    The full thread is paged through read_comments(); comment_count carries the total.
+    """
     incident_nos = [inc["incident_no"] for inc in incidents]
     placeholders = ",".join("?" for _ in incident_nos)
     cur.execute(
-        f"SELECT incident_no, username, comment, timestamp "
-        f"FROM comments WHERE incident_no IN ({placeholders}) ORDER BY timestamp ASC",
-        tuple(incident_nos),
+        f"""
+        SELECT incident_no, id, username, comment, timestamp FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY incident_no ORDER BY id DESC) AS rn
+            FROM comments WHERE incident_no IN ({placeholders})
+        ) WHERE rn <= ? ORDER BY id ASC
+        """,
+        (*incident_nos, COMMENT_PREVIEW),
     )
     by_incident = {}
     for row in cur.fetchall():
-        by_incident.setdefault(row[0], []).append(
-            {"username": row[1] or "Anonymous", "comment": row[2], "timestamp": row[3]}
-        )
+        by_incident.setdefault(row["incident_no"], []).append(_comment_dict(row))
     for inc in incidents:
         inc["comments"] = by_incident.get(inc["incident_no"], [])
-        try:
-            inc["Details"] = json.loads(inc["details"]) if inc["details"] else []
-        except Exception:
-            inc["Details"] = []
 
 
 def _attach_user_like_state(cur, incidents, device_uuid):
@@ -206,9 +898,159 @@ def _attach_user_like_state(cur, incidents, device_uuid):
         inc["liked_by_user"] = inc["incident_no"] in liked_incidents
 
 
+def read_comments(incident_no, limit=20, before_id=None):
+    """Return one page of an incident's comments, newest page first.
+
+    Keyset-paginated on comments.id: pass the returned ``next_cursor`` as
+    ``before_id`` to fetch the next (older) page. Comments within a page are
+    oldest first. Returns (comments, next_cursor or None).
+    """
+    with connect() as conn:
+        conn.row_factory = sqlite3.Row
+        cur = conn.cursor()
+        if before_id is not None:
+            cur.execute(
+                "SELECT id, username, comment, timestamp FROM comments "
+                "WHERE incident_no = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (incident_no, before_id, limit + 1),
+            )
+        else:
+            cur.execute(
+                "SELECT id, username, comment, timestamp FROM comments "
+                "WHERE incident_no = ? ORDER BY id DESC LIMIT ?",
+                (incident_no, limit + 1),
+            )
+        rows = cur.fetchall()
+
+    has_more = len(rows) > limit
+    page     = [_comment_dict(row) for row in reversed(rows[:limit])]
+    return page, (page[0]["id"] if has_more else None)
+
+
+# ── Full-text search ───────────────────────────────────────────────────────
+
+# bm25 column weights, in FTS_COLUMNS order: a hit in the location or type
+# outranks one buried in the timeline details
+FTS_WEIGHTS  = (5.0, 3.0, 3.0, 4.0, 1.0, 0.5)
+_SNIPPET_OPEN, _SNIPPET_CLOSE = "\x02", "\x03"
+_FTS_TOKEN   = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(text):
+    """Turn free text into a safe FTS5 MATCH expression (all terms, last one as a prefix).
+
+    Returns None if the text has no searchable terms.
+    """
+    terms = _FTS_TOKEN.findall(text or "")
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _snippet_html(raw):
+    """HTML-escape a snippet and turn the FTS markers into <mark> tags."""
+    return (html.escape(raw or "")
+            .replace(_SNIPPET_OPEN, "<mark>")
+            .replace(_SNIPPET_CLOSE, "</mark>"))
+
+
+def search_incidents(query, limit=20, cursor=None, sources=None, active_only=False):
+    """Ranked full-text search over both incident tiers.
+
+    Live matches come first, then archived ones: bm25 depends on each FTS
+    index's own statistics, so scores are only compared within a tier. Each
+    tier is ordered by score (best first), then rowid, and the results are
+    keyset-paginated: pass the returned ``next_cursor`` back as ``cursor``.
+    Each result carries an HTML ``snippet`` with matches wrapped in <mark>.
+    Returns (results, next_cursor or None).
+    """
+    match = fts_query(query)
+    if match is None:
+        return [], None
+
+    conditions, params = [], []
+    if sources:
+        _in(conditions, params, "i.source_id", lookups.ids("source", sources))
+    if active_only:
+        conditions.append("i.active = 1")
+    after_tier = 0
+    if cursor:
+        tier_part, score_part, rowid_part = cursor.split("|")
+        after_tier, after = int(tier_part), [float(score_part), int(rowid_part)]
+
+    weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+    rows = []
+    with connect() as conn:
+        conn.row_factory = sqlite3.Row
+        cur = conn.cursor()
+        tiers = ["incidents"] if archive_horizon(cur) is None else ["incidents", "incidents_archive"]
+        for tier, table in enumerate(tiers):
+            if tier < after_tier:
+                continue
+            tier_conditions, tier_params = list(conditions), list(params)
+            if cursor and tier == after_tier:
+                tier_conditions.append("(m.score, m.rowid) > (?, ?)")
+                tier_params.extend(after)
+            where = " AND " + " AND ".join(tier_conditions) if tier_conditions else ""
+            cur.execute(f"""
+                SELECT i.*, m.tier, m.rowid AS fts_rowid, m.score, m.snippet FROM (
+                    SELECT {tier} AS tier, rowid, bm25({table}_fts, {weights}) AS score,
+                           snippet({table}_fts, -1, ?, ?, '…', 12) AS snippet
+                    FROM {table}_fts WHERE {table}_fts MATCH ?
+                ) m JOIN {table} i ON i.rowid = m.rowid
+                WHERE 1 = 1{where}
+                ORDER BY m.score, m.rowid
+                LIMIT ?
+            """, (_SNIPPET_OPEN, _SNIPPET_CLOSE, match, *tier_params, limit + 1 - len(rows)))
+            rows += [dict(row) for row in cur.fetchall()]
+            if len(rows) > limit:
+                break  # Older tiers only once this one is exhausted
+
+    has_more = len(rows) > limit
+    rows     = rows[:limit]
+    for row in rows:
+        row["snippet"] = _snippet_html(row["snippet"])
+        decode_incident(row)
+    last = rows[-1] if has_more else None
+    next_cursor = f"{last['tier']}|{last['score']!r}|{last['fts_rowid']}" if last else None
+    for row in rows:
+        del row["tier"], row["fts_rowid"]
+    return rows, next_cursor
+
+
+def incidents_in_bbox(min_lon, min_lat, max_lon, max_lat,
+                      sources=None, incident_types=None, active_only=False):
+    """Return incidents whose coordinates fall inside a bounding box (via the R*Tree)."""
+    with connect() as conn:
+        conn.row_factory = sqlite3.Row
+        cur = conn.cursor()
+
+        conditions = [
+            "r.min_lon >= ?", "r.max_lon <= ?", "r.min_lat >= ?", "r.max_lat <= ?",
+        ]
+        params = [min_lon, max_lon, min_lat, max_lat]
+        if sources:
+            _in(conditions, params, "i.source_id", lookups.ids("source", sources))
+        if incident_types:
+            _in(conditions, params, "i.type_id", lookups.ids("type", incident_types))
+        if active_only:
+            conditions.append("i.active = 1")
+
+        cur.execute(
+            "SELECT i.incident_no, i.type_id, i.source_id, i.active, i.severity, i.timestamp, "
+            "i.latitude, i.longitude "
+            "FROM incidents_rtree r JOIN incidents i ON i.rowid = r.id "
+            f"WHERE {' AND '.join(conditions)}",
+            tuple(params),
+        )
+        return [lookups.decode(dict(row)) for row in cur.fetchall()]
+
+
 def incident_exists(incident_no, date):
     """Return True if an incident already exists in the DB."""
-    with sqlite3.connect(DB_FILE, timeout=30) as conn:
+    with connect() as conn:
         cur = conn.cursor()
         cur.execute(
             "SELECT 1 FROM incidents WHERE incident_no = ? AND date = ?",
@@ -217,10 +1059,122 @@ def incident_exists(incident_no, date):
         return cur.fetchone() is not None
 
 
+def referenced_map_filenames():
+    """Return the set of map image filenames still referenced by live or archived incidents."""
+    with connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT DISTINCT map_filename FROM incidents_all WHERE map_filename IS NOT NULL AND map_filename != ''")
+        return {row[0] for row in cur.fetchall()}
+
+
 # ---------------------------------------------------------------------------
 # Write
 # ---------------------------------------------------------------------------
 
+def clear_map_filenames(filenames):
+    """Drop references to map images that were evicted from disk."""
+    if not filenames:
+        return
+    with write_transaction("clear_maps") as conn:
+        for table in ("incidents", "incidents_archive"):
+            conn.executemany(
+                f"UPDATE {table} SET map_filename = '' WHERE map_filename = ?",
+                [(name,) for name in filenames],
+            )
+
+
+ARCHIVE_BATCH = 500  # rows moved per write transaction
+
+
+def archive_incidents(older_than_days, batch_size=ARCHIVE_BATCH):
+    """Move closed incidents dated more than ``older_than_days`` ago into incidents_archive.
+
+    Works in small batches so each write transaction stays short. Likes and
+    comments stay where they are (they are keyed by incident_no). Returns
+    the number of rows moved.
+    """
+    cutoff = to_day(datetime.now() - timedelta(days=older_than_days))
+    moved  = 0
+    while True:
+        with write_transaction("archive") as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT rowid FROM incidents WHERE active = 0 AND day < ? LIMIT ?",
+                (cutoff, batch_size),
+            )
+            rowids = [row[0] for row in cur.fetchall()]
+            if rowids:
+                columns      = _incident_columns(cur)
+                placeholders = ",".join("?" for _ in rowids)
+                # An upsert, not OR REPLACE: its implicit delete would skip the FTS trigger
+                updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in ("incident_no", "date"))
+                cur.execute(
+                    f"INSERT INTO incidents_archive ({', '.join(columns)}) "
+                    f"SELECT {', '.join(columns)} FROM incidents WHERE rowid IN ({placeholders}) "
+                    f"ON CONFLICT (incident_no, date) DO UPDATE SET {updates}",
+                    rowids,
+                )
+                cur.execute(f"DELETE FROM incidents WHERE rowid IN ({placeholders})", rowids)
+        moved += len(rowids)
+        if len(rowids) < batch_size:
+            return moved
+
+
+def set_like(incident_no, device_uuid, liked=True):
+    """Like (or unlike) an incident for one device.
+
+    One conditional write per call — the counter is maintained by triggers —
+    and the write lock is held only for that statement and the count read.
+    Returns (changed, likes): changed is False if the state was already as requested.
+    """
+    with write_transaction("like") as conn:
+        cur = conn.cursor()
+        if liked:
+            cur.execute(
+                "INSERT INTO likes (incident_no, device_uuid, timestamp) VALUES (?, ?, ?) "
+                "ON CONFLICT DO NOTHING",
+                (incident_no, device_uuid, datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+            )
+        else:
+            cur.execute(
+                "DELETE FROM likes WHERE incident_no = ? AND device_uuid = ?",
+                (incident_no, device_uuid),
+            )
+        changed = cur.rowcount == 1
+        cur.execute("SELECT likes FROM incidents_all WHERE incident_no = ? LIMIT 1", (incident_no,))
+        row = cur.fetchone()
+    return changed, (row[0] if row else 0)
+
+
+def add_comment(incident_no, device_uuid, username, comment, timestamp):
+    """Insert a comment unless ``username`` already has MAX_USER_COMMENTS on this incident.
+
+    The limit check and insert are a single statement, so it holds under
+    concurrent posts. Returns (comment dict or None if over the limit, comment_count).
+    """
+    with write_transaction("comment") as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO comments (incident_no, device_uuid, username, comment, timestamp)
+            SELECT ?, ?, ?, ?, ?
+            WHERE (SELECT COUNT(*) FROM comments WHERE incident_no = ? AND username = ?) < ?
+            """,
+            (incident_no, device_uuid, username, comment, timestamp,
+             incident_no, username, MAX_USER_COMMENTS),
+        )
+        inserted = cur.rowcount == 1
+        comment_id = cur.lastrowid
+        cur.execute("SELECT comment_count FROM incidents_all WHERE incident_no = ? LIMIT 1", (incident_no,))
+        row = cur.fetchone()
+
+    if not inserted:
+        return None, (row[0] if row else 0)
+    created = {"id": comment_id, "username": username or "Anonymous",
+               "comment": comment, "timestamp": timestamp}
+    return created, (row[0] if row else 0)
+
+
 def save_or_update_incident(data):
     """Insert a new incident or update an existing one. Returns True if a change was made."""
     if not data:
@@ -228,7 +1182,7 @@ def save_or_update_incident(data):
 
     incident_no = data.get("No.") or data.get("Incident No.")
     if not incident_no:
-        safe_print("No incident number found in data.")
+        log.warning("No incident number found in data.")
         return False
 
     date            = data.get("Date",      datetime.now().strftime("%Y-%m-%d"))
@@ -244,92 +1198,104 @@ def save_or_update_incident(data):
     new_map_filename = data.get("MapFilename", "")
     active_status   = data.get("active", 1)
 
-    # Standardise type
-    type_field = data.get("Type", "")
-    if type_field and type_field.startswith("Trfc Collision"):
-        type_field = "Traffic Collision"
+    type_field = normalise_type(data.get("Type", ""))
+    if type_field in IGNORED_TYPES:
+        return False
 
     new_details = data.get("Details", [])
     if isinstance(new_details, str):
         new_details = [new_details]
-    details_json = json.dumps(new_details)
+    details = encode_details(new_details)
 
-    # ── Fetch existing record (outside db_lock – read-only) ────────────────
-    with db_lock:
-        with sqlite3.connect(DB_FILE, timeout=30) as conn:
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT details, description, severity FROM incidents WHERE incident_no = ? AND date = ?",
-                (str(incident_no), date),
-            )
-            existing = cur.fetchone()
+    # ── Read the current row (no lock: WAL readers never block) ────────────
+    with connect() as conn:
+        conn.row_factory = sqlite3.Row
+        existing = conn.execute(
+            "SELECT * FROM incidents WHERE incident_no = ? AND date = ?",
+            (str(incident_no), date),
+        ).fetchone()
 
-    # ── Generate LLM description outside the lock (slow network call) ──────
-    if not existing:
-        new_description, new_severity = generate_description(data)
-    else:
+    if existing:
+        updates, _ = _incident_updates(
+            dict(existing), details, latitude, longitude, geocode_precision, new_map_filename,
+        )
+        if not updates:
+            log.debug("No changes for incident %s.", incident_no)
+            return False
         new_description = existing["description"]
         new_severity    = existing["severity"]
+    else:
+        # ── Generate LLM description before taking the write lock (slow call)
+        from llm import generate_description  # imported lazily: pulls in the LLM client
+        new_description, new_severity = generate_description(data)
+
+    # New dictionary values are committed before the row that uses them. Needed
+    # on both paths: a row read above may be archived before the lock is taken
+    encoded = [lookups.id_for(field, value) for field, value in (
+        ("city", city), ("neighborhood", neighborhood), ("location_desc", location_desc),
+        ("type", type_field), ("source", source),
+    )]
 
     # ── Apply DB update/insert ─────────────────────────────────────────────
-    with db_lock:
-        with sqlite3.connect(DB_FILE, timeout=30) as conn:
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT * FROM incidents WHERE incident_no = ? AND date = ?",
-                (str(incident_no), date),
+    with write_transaction("incident") as conn:
+        conn.row_factory = sqlite3.Row
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT * FROM incidents WHERE incident_no = ? AND date = ?",
+            (str(incident_no), date),
+        )
+        existing_record = cur.fetchone()
+
+        if existing_record:
+            updates, params = _incident_updates(
+                dict(existing_record), details, latitude, longitude,
+                geocode_precision, new_map_filename,
             )
-            existing_record = cur.fetchone()
-
-            if existing_record:
-                existing_data = dict(existing_record)
-                updates, params = [], []
-
-                if details_json != existing_data.get("details", ""):
-                    updates.append("details = ?, description = ?")
-                    params.extend([details_json, new_description])
-                if latitude and latitude != existing_data.get("latitude"):
-                    updates.append("latitude = ?")
-                    params.append(latitude)
-                if longitude and longitude != existing_data.get("longitude"):
-                    updates.append("longitude = ?")
-                    params.append(longitude)
-                if geocode_precision != "unknown" and geocode_precision != existing_data.get("geocode_precision"):
-                    updates.append("geocode_precision = ?")
-                    params.append(geocode_precision)
-                if new_map_filename and new_map_filename != existing_data.get("map_filename"):
-                    updates.append("map_filename = ?")
-                    params.append(new_map_filename)
-
-                if updates:
-                    updates.append("active = ?")
-                    query = f"UPDATE incidents SET {', '.join(updates)} WHERE incident_no = ? AND date = ?"
-                    params.extend([active_status, str(incident_no), date])
-                    cur.execute(query, tuple(params))
-                    conn.commit()
-                    safe_print(f"Incident {incident_no} updated.")
-                    return True
-                else:
-                    safe_print(f"No changes for incident {incident_no}.")
-                    return False
-            else:
-                cur.execute(
-                    """
-                    INSERT INTO incidents
-                    (incident_no, date, timestamp, city, neighborhood, location, location_desc, type,
-                     details, description, latitude, longitude, map_filename, likes, comments,
-                     active, source, geocode_precision, severity)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        str(incident_no), date, new_timestamp, city, neighborhood,
-                        location, location_desc, type_field, details_json, new_description,
-                        latitude, longitude, new_map_filename, 0, "[]",
-                        active_status, source, geocode_precision, new_severity,
-                    ),
-                )
-                conn.commit()
-                safe_print(f"Incident {incident_no} inserted.")
-                return True
+            if not updates:
+                log.debug("No changes for incident %s.", incident_no)
+                return False
+            updates.append("active = ?")
+            query = f"UPDATE incidents SET {', '.join(updates)} WHERE incident_no = ? AND date = ?"
+            params.extend([active_status, str(incident_no), date])
+            cur.execute(query, tuple(params))
+            log.info("Incident %s updated.", incident_no)
+            return True
+
+        cur.execute(
+            """
+            INSERT INTO incidents
+            (incident_no, date, ts_epoch, city_id, neighborhood_id, location_desc_id, type_id,
+             source_id, location, details, description, latitude, longitude, map_filename,
+             likes, active, geocode_precision, severity)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                str(incident_no), date, to_epoch(new_timestamp), *encoded,
+                location, details, new_description,
+                latitude, longitude, new_map_filename, 0,
+                active_status, geocode_precision, new_severity,
+            ),
+        )
+        log.info("Incident %s inserted.", incident_no)
+        return True
+
+
+def _incident_updates(existing, details, latitude, longitude, geocode_precision, map_filename):
+    """Return (SET clauses, params) for fields that differ from the stored row."""
+    updates, params = [], []
+    if details != existing.get("details"):
+        updates.append("details = ?, description = ?")
+        params.extend([details, existing.get("description")])
+    if latitude and latitude != existing.get("latitude"):
+        updates.append("latitude = ?")
+        params.append(latitude)
+    if longitude and longitude != existing.get("longitude"):
+        updates.append("longitude = ?")
+        params.append(longitude)
+    if geocode_precision != "unknown" and geocode_precision != existing.get("geocode_precision"):
+        updates.append("geocode_precision = ?")
+        params.append(geocode_precision)
+    if map_filename and map_filename != existing.get("map_filename"):
+        updates.append("map_filename = ?")
+        params.append(map_filename)
+    return updates, params
@@ -4,20 +4,23 @@ import pytz
 from dotenv import load_dotenv
 import os
 
+from logger import get_logger
+
 load_dotenv()
 
+log = get_logger(__name__)
+
 MAPBOX_BASE_URL = "https://api.mapbox.com/styles/v1/mapbox/"
+MAPBOX_STYLE = "satellite-streets-v12"
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-# Build the target folder: roadAlerts/traffic-app/maps
+# Build the target folder: roadAlerts/traffic-app/maps (created on first save)
 TARGET_DIR = os.path.join(BASE_DIR, "traffic-app", "maps")
-if not os.path.exists(TARGET_DIR):
-    os.makedirs(TARGET_DIR)
 
 def generate_mapbox_url(lon, lat, access_token, zoom=16, bearing=0, pitch=60, size='500x500', dark_mode=False):
     """
     Generate a Mapbox URL for a static map image.
     """
-    style = "satellite-streets-v12"  # Same style regardless of dark_mode for now
+    style = MAPBOX_STYLE  # Same style regardless of dark_mode for now
     url = (
         f"{MAPBOX_BASE_URL}{style}/static/"
         f"pin-s+ff4242({lon},{lat})/{lon},{lat},{zoom},{bearing},{pitch}/{size}"
@@ -34,22 +37,26 @@ def is_after_sunset(lon, lat):
     sunset = datetime.datetime(now.year, now.month, now.day, 19, 0, 0, tzinfo=local_timezone)
     return now > sunset
 
-def save_map_image(lon, lat, access_token, filename='map.png'):
+def save_map_image(lon, lat, access_token, filename='map.png', zoom=16, session=None, timeout=15):
     """
     Download and save a static map image from Mapbox.
+    Pass a shared requests.Session to reuse pooled connections across calls.
+    Returns the full path of the written file.
     """
     dark_mode = is_after_sunset(lon, lat)
-    url = generate_mapbox_url(lon, lat, access_token, dark_mode=dark_mode)
-    response = requests.get(url)
+    url = generate_mapbox_url(lon, lat, access_token, zoom=zoom, dark_mode=dark_mode)
+    response = (session or requests).get(url, timeout=timeout)
     response.raise_for_status()
     
     # Ensure the filename is a full path, if not, prepend TARGET_DIR
     if not os.path.isabs(filename):
         filename = os.path.join(TARGET_DIR, os.path.basename(filename))
-        
+        os.makedirs(TARGET_DIR, exist_ok=True)
+
     with open(filename, 'wb') as file:
         file.write(response.content)
-    print(f"Map image saved as {filename}")
+    log.info("Map image saved as %s", filename)
+    return filename
 
 if __name__ == "__main__":
     import sys
@@ -74,6 +81,11 @@ if __name__ == "__main__":
         filename_date_str = incident_time.strftime("%Y%m%d_%H%M")
         filename = f"map_{filename_date_str}.png"
 
+    if os.getenv("MAP_BACKEND", "mapbox").lower() == "pmtiles":
+        from pmtiles_map import save_map_image as save_local_map_image
+        save_local_map_image(lon, lat, filename=filename, pmtiles_path=os.getenv("MAP_PMTILES_PATH"))
+        sys.exit(0)
+
     access_token = os.getenv("MAP_ACCESS_TOKEN")
     if not access_token:
         print("MAP_ACCESS_TOKEN not found in environment variables.")
@@ -12,6 +12,19 @@ import threading
 from typing import Optional, Dict, Tuple
 from geopy.geocoders import Nominatim, ArcGIS
 
+import metrics
+
+GEOCODE_CACHE    = metrics.counter(
+    "traffic_geocode_cache_total", "Geocode cache lookups by kind and result.", ["kind", "result"]
+)
+GEOCODE_SECONDS  = metrics.histogram(
+    "traffic_geocode_provider_seconds", "Geocoding provider request latency (excluding rate-limit waits).",
+    ["provider", "kind"],
+)
+GEOCODE_ERRORS   = metrics.counter(
+    "traffic_geocode_provider_errors_total", "Geocoding provider requests that raised.", ["provider", "kind"]
+)
+
 # Thread lock for cache operations
 _cache_lock = threading.Lock()
 
@@ -304,6 +317,7 @@ def geocode_location(
     # Check cache first
     if cache:
         cached = cache.get(normalized)
+        GEOCODE_CACHE.inc(kind="forward", result="hit" if cached else "miss")
         if cached:
             debug_print(f"CACHE HIT: '{normalized}' -> ({cached['Latitude']}, {cached['Longitude']})")
             return cached
@@ -324,8 +338,14 @@ def geocode_location(
                 if elapsed < 1.1:
                     time.sleep(1.1 - elapsed)
                 
-                location = geolocator.geocode(query, addressdetails=True)
-                _last_request_time = time.time()
+                try:
+                    with GEOCODE_SECONDS.time(provider="nominatim", kind="forward"):
+                        location = geolocator.geocode(query, addressdetails=True)
+                except Exception:
+                    GEOCODE_ERRORS.inc(provider="nominatim", kind="forward")
+                    raise
+                finally:
+                    _last_request_time = time.time()
             
             if location:
                 lat, lon = location.latitude, location.longitude
@@ -365,7 +385,12 @@ def geocode_location(
         for query, precision in variations:
             try:
                 debug_print(f"GEOCODE (ArcGIS): Trying '{query}'")
-                location = arcgis_geolocator.geocode(query)
+                try:
+                    with GEOCODE_SECONDS.time(provider="arcgis", kind="forward"):
+                        location = arcgis_geolocator.geocode(query)
+                except Exception:
+                    GEOCODE_ERRORS.inc(provider="arcgis", kind="forward")
+                    raise
                 
                 if location:
                     lat, lon = location.latitude, location.longitude
@@ -408,6 +433,7 @@ def reverse_geocode(lat: float, lon: float, cache: Optional[GeocodingCache] = No
     
     if cache:
         cached = cache.get_reverse(lat, lon)
+        GEOCODE_CACHE.inc(kind="reverse", result="hit" if cached else "miss")
         if cached:
             debug_print(f"REVERSE CACHE HIT: ({lat}, {lon})")
             return cached
@@ -422,8 +448,14 @@ def reverse_geocode(lat: float, lon: float, cache: Optional[GeocodingCache] = No
             if elapsed < 1.1:
                 time.sleep(1.1 - elapsed)
             
-            location = geolocator.reverse((lat, lon), exactly_one=True)
-            _last_request_time = time.time()
+            try:
+                with GEOCODE_SECONDS.time(provider="nominatim", kind="reverse"):
+                    location = geolocator.reverse((lat, lon), exactly_one=True)
+            except Exception:
+                GEOCODE_ERRORS.inc(provider="nominatim", kind="reverse")
+                raise
+            finally:
+                _last_request_time = time.time()
             
         if location and location.raw.get("address"):
             address = location.raw.get("address")
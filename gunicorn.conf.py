@@ -0,0 +1,43 @@
+# gunicorn.conf.py
+"""Gunicorn settings for `python traffic_scraper.py --production` and `gunicorn -c gunicorn.conf.py wsgi:app`."""
+
+import multiprocessing
+import os
+
+bind    = os.environ.get("BIND", "127.0.0.1:5002")
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get("WEB_THREADS", 4))
+worker_class = "gthread"
+
+# Recycle workers periodically to cap memory growth; jitter avoids restarting all at once
+max_requests        = int(os.environ.get("MAX_REQUESTS", 2000))
+max_requests_jitter = 200
+
+# Graceful shutdown: finish in-flight requests before exiting
+graceful_timeout = 30
+timeout          = 60
+keepalive        = 5
+
+accesslog = "-"
+errorlog  = "-"
+
+# Also supervise the singleton monitor from the master (set by --production)
+RUN_MONITOR = os.environ.get("RUN_MONITOR", "false").lower() == "true"
+_monitor    = None
+
+
+def on_starting(server):
+    """Migrate the schema once in the master, before any worker or the monitor starts."""
+    global _monitor
+    from db import init_db
+    init_db()
+    if RUN_MONITOR:
+        from monitor import MonitorSupervisor
+        _monitor = MonitorSupervisor()
+        _monitor.start()
+
+
+def on_exit(server):
+    """Let the monitor finish its current cycle once the workers have stopped."""
+    if _monitor is not None:
+        _monitor.stop()
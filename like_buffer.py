@@ -0,0 +1,207 @@
+# like_buffer.py
+"""
+Write-behind buffer for likes.
+
+Like/unlike requests only update an in-memory map keyed by
+(device_uuid, incident_no) and return an optimistic count straight away.
+A background thread flushes the net changes every few hundred milliseconds
+as one transaction of batched INSERT/DELETEs; the triggers on the likes
+table apply the matching counter deltas inside that same transaction.
+Repeated toggles by one device between flushes collapse to at most one
+row change, so a viral post costs one write per flush instead of one per tap.
+
+Counts are the committed value plus this process's not-yet-committed net
+changes. A sequence counter (odd while a flush is committing) makes sure a
+reader never combines a post-commit count with pre-commit deltas.
+"""
+
+import atexit
+import threading
+from collections import Counter
+from datetime import datetime
+
+from db import connect, write_transaction
+from logger import safe_print
+
+
+class LikeBuffer:
+    """Buffer like toggles in memory and persist them in periodic batches."""
+
+    def __init__(self, db_file, flush_interval=0.25):
+        self.db_file        = db_file
+        self.flush_interval = flush_interval
+        self._cond          = threading.Condition()
+        self._flush_lock    = threading.Lock()
+        self._pending       = {}         # (device_uuid, incident_no) -> (liked, net, timestamp)
+        self._flushing      = {}         # batch currently being committed
+        self._deltas        = Counter()  # incident_no -> net uncommitted change
+        self._seq           = 0          # odd while a flush is committing
+        self._thread        = None
+        self._stop          = threading.Event()
+        self.flushes        = 0
+        self.flushed_rows   = 0
+
+    # ── Public API ─────────────────────────────────────────────────────────
+
+    def set_like(self, incident_no, device_uuid, liked=True):
+        """Record a like/unlike. Returns (changed, optimistic like count)."""
+        self._ensure_started()
+        key = (device_uuid, incident_no)
+        while True:
+            seq = self._wait_for_stable_seq()
+            db_liked, db_likes = self._read(incident_no, device_uuid)
+            with self._cond:
+                if self._seq != seq:
+                    continue  # A flush committed while we were reading; re-read
+                current = self._current_state(key, db_liked)
+                changed = current != liked
+                if changed:
+                    self._apply(key, liked)
+                return changed, max(db_likes + self._deltas[incident_no], 0)
+
+    def overlay(self, incidents, device_uuid=None):
+        """Adjust ``likes``/``liked_by_user`` on incident dicts for uncommitted toggles.
+
+        Best effort: a list read that races a flush may be off by the batch
+        for one request, which the next refresh corrects.
+        """
+        with self._cond:
+            if not self._deltas:
+                return incidents
+            for inc in incidents:
+                incident_no = inc.get("incident_no")
+                inc["likes"] = max((inc.get("likes") or 0) + self._deltas.get(incident_no, 0), 0)
+                if device_uuid:
+                    inc["liked_by_user"] = self._current_state(
+                        (device_uuid, incident_no), inc.get("liked_by_user", False)
+                    )
+        return incidents
+
+    def flush(self):
+        """Commit all pending toggles in one transaction. Returns the rows written."""
+        with self._flush_lock:
+            with self._cond:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                self._flushing = batch
+                self._seq += 1
+
+            try:
+                self._write(batch)
+            except Exception as e:
+                safe_print(f"Like buffer flush failed ({len(batch)} rows will be retried): {e}")
+                with self._cond:
+                    self._requeue(batch)
+                    self._flushing = {}
+                    self._seq += 1
+                    self._cond.notify_all()
+                return 0
+
+            with self._cond:
+                for (_device, incident_no), (_liked, net, _ts) in batch.items():
+                    self._deltas[incident_no] -= net
+                    if not self._deltas[incident_no]:
+                        del self._deltas[incident_no]
+                self._flushing = {}
+                self._seq += 1
+                self._cond.notify_all()
+            self.flushes      += 1
+            self.flushed_rows += len(batch)
+            return len(batch)
+
+    def collect(self):
+        """Metrics collector (see metrics.Registry.collector)."""
+        with self._cond:
+            pending = len(self._pending)
+        return [
+            ("traffic_like_buffer_flushes_total", "counter", "Like buffer batches committed.",
+             [({}, self.flushes)]),
+            ("traffic_like_buffer_flushed_rows_total", "counter", "Like/unlike rows committed by the buffer.",
+             [({}, self.flushed_rows)]),
+            ("traffic_like_buffer_pending", "gauge", "Like toggles waiting for the next flush.",
+             [({}, pending)]),
+        ]
+
+    def close(self):
+        """Stop the flusher thread and write anything still buffered."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    # ── Internals ──────────────────────────────────────────────────────────
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="like-flusher", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _wait_for_stable_seq(self):
+        with self._cond:
+            while self._seq % 2:
+                self._cond.wait()
+            return self._seq
+
+    def _read(self, incident_no, device_uuid):
+        with connect(self.db_file) as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT likes FROM incidents_all WHERE incident_no = ? LIMIT 1", (incident_no,))
+            row = cur.fetchone()
+            cur.execute(
+                "SELECT 1 FROM likes WHERE incident_no = ? AND device_uuid = ?",
+                (incident_no, device_uuid),
+            )
+            return cur.fetchone() is not None, (row[0] if row else 0)
+
+    def _current_state(self, key, db_liked):
+        entry = self._pending.get(key) or self._flushing.get(key)
+        return entry[0] if entry else db_liked
+
+    def _apply(self, key, liked):
+        """Record one toggle; a toggle that undoes a pending one cancels it."""
+        step = 1 if liked else -1
+        net  = self._pending[key][1] + step if key in self._pending else step
+        if net:
+            self._pending[key] = (liked, net, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        else:
+            del self._pending[key]
+        self._deltas[key[1]] += step
+        if not self._deltas[key[1]]:
+            del self._deltas[key[1]]
+
+    def _requeue(self, batch):
+        """Put a failed batch back underneath any toggles made since."""
+        for key, (liked, net, ts) in batch.items():
+            newer = self._pending.get(key)
+            if newer is None:
+                self._pending[key] = (liked, net, ts)
+            elif newer[1] + net:
+                self._pending[key] = (newer[0], newer[1] + net, newer[2])
+            else:
+                del self._pending[key]
+
+    def _write(self, batch):
+        inserts = [(inc, dev, ts) for (dev, inc), (liked, _net, ts) in batch.items() if liked]
+        deletes = [(inc, dev) for (dev, inc), (liked, _net, _ts) in batch.items() if not liked]
+        with write_transaction("like_flush", db_file=self.db_file) as conn:
+            cur = conn.cursor()
+            if inserts:
+                cur.executemany(
+                    "INSERT INTO likes (incident_no, device_uuid, timestamp) VALUES (?, ?, ?) "
+                    "ON CONFLICT DO NOTHING",
+                    inserts,
+                )
+            if deletes:
+                cur.executemany(
+                    "DELETE FROM likes WHERE incident_no = ? AND device_uuid = ?",
+                    deletes,
+                )
@@ -5,12 +5,24 @@ Uses OpenRouter with a primary + fallback model strategy.
 """
 
 import json
+import time
 
-from config import llm_client, print_lock, TESTMODE
-from logger import safe_print
+import metrics
+from config import get_llm_client, TESTMODE
+from logger import get_logger, safe_print
 
-# Track total LLM calls (thread-safe via print_lock)
-_call_count = 0
+LLM_CALLS    = metrics.counter("traffic_llm_calls_total", "Incident descriptions requested from the LLM.")
+LLM_SECONDS  = metrics.histogram(
+    "traffic_llm_request_seconds", "LLM completion latency per model.", ["model"],
+    buckets=(0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0),
+)
+LLM_TOKENS   = metrics.counter("traffic_llm_tokens_total", "Tokens reported by the LLM API.", ["model", "kind"])
+LLM_FAILURES = metrics.counter("traffic_llm_failures_total", "Failed LLM completions per model.", ["model"])
+
+log = get_logger(__name__)
+
+PRIMARY_MODEL  = "openrouter/hunter-alpha"
+FALLBACK_MODEL = "mistralai/mistral-nemo"
 
 
 def generate_description(data):
@@ -22,11 +34,8 @@ def generate_description(data):
     Returns:
         (summary: str, severity: int | None)
     """
-    global _call_count
-    with print_lock:
-        _call_count += 1
-        count = _call_count
-    safe_print(f"GPT API Calls: {count}")
+    LLM_CALLS.inc()
+    log.debug("GPT API Calls: %d", LLM_CALLS.value())
 
     is_sig_alert = bool(data.get("Type")) and "SIG" in data.get("Type", "").upper()
 
@@ -72,14 +81,27 @@ def _call_llm(system_prompt, user_message):
         {"role": "user",   "content": user_message},
     ]
     try:
-        return llm_client.chat.completions.create(
-            model="openrouter/hunter-alpha", messages=messages
-        )
+        return _timed_completion(PRIMARY_MODEL, messages)
     except Exception as e:
-        safe_print(f"Primary model failed: {e}. Falling back to mistralai/mistral-nemo")
-        return llm_client.chat.completions.create(
-            model="mistralai/mistral-nemo", messages=messages
-        )
+        safe_print(f"Primary model failed: {e}. Falling back to {FALLBACK_MODEL}")
+        return _timed_completion(FALLBACK_MODEL, messages)
+
+
+def _timed_completion(model, messages):
+    """One chat completion, recorded in the LLM latency/token/failure metrics."""
+    start = time.perf_counter()
+    try:
+        response = get_llm_client().chat.completions.create(model=model, messages=messages)
+    except Exception:
+        LLM_FAILURES.inc(model=model)
+        raise
+    finally:
+        LLM_SECONDS.observe(time.perf_counter() - start, model=model)
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, model=model, kind="prompt")
+        LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, model=model, kind="completion")
+    return response
 
 
 def _parse_response(response, is_sig_alert):
@@ -1,12 +1,172 @@
 # logger.py
-"""Thread-safe logging utility."""
+"""
+Non-blocking logging for the traffic app.
 
+Records go onto an in-memory queue and a single background listener thread
+formats and writes them, so request and scrape threads never wait on stdout.
+Use ``get_logger(__name__)`` with %-style arguments (``log.debug("x %s", y)``):
+when the level is disabled the call returns before any formatting happens.
+
+Output is plain text by default, or one JSON object per line with
+LOG_FORMAT=json; keyword fields passed via ``extra=`` appear as JSON keys.
+High-volume messages can pass ``extra={"sample": N}`` to emit only every
+Nth occurrence of that message template.
+
+``safe_print`` remains as a thin INFO-level wrapper for existing call sites.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
 import sys
-from config import print_lock
+import threading
+import time
+
+from config import LOG_FORMAT, LOG_LEVEL
+
+ROOT_LOGGER = "traffic"
+
+_setup_lock = threading.Lock()
+_listener   = None
+_at_exit    = False
+
+# LogRecord attributes that are not user-supplied fields
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "sample"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message plus ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            "ts":     round(record.created, 3),
+            "level":  record.levelname,
+            "logger": record.name,
+            "msg":    record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SampleFilter(logging.Filter):
+    """Pass every Nth record per message template for records with ``extra={"sample": N}``."""
+
+    def __init__(self):
+        super().__init__()
+        self._lock   = threading.Lock()
+        self._counts = {}
+
+    def filter(self, record):
+        every = getattr(record, "sample", None)
+        if not every or every <= 1:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            seen = self._counts.get(key, 0)
+            self._counts[key] = seen + 1
+        if seen % every:
+            return False
+        record.sampled = every
+        return True
+
+
+def _build_handler(stream):
+    handler = logging.StreamHandler(stream)
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        formatter = logging.Formatter("%(asctime)s %(levelname)-5s %(name)s: %(message)s", "%H:%M:%S")
+        formatter.converter = time.localtime
+        handler.setFormatter(formatter)
+    return handler
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that starts the writer thread on the first record it sees."""
+
+    def enqueue(self, record):
+        if _listener is None:
+            _start_listener()
+        super().enqueue(record)
+
+
+def _start_listener(stream=None):
+    global _listener, _at_exit
+    with _setup_lock:
+        if _listener is not None:
+            return
+        _listener = logging.handlers.QueueListener(_queue, _build_handler(stream or sys.stdout))
+        _listener.start()
+        if not _at_exit:
+            atexit.register(_shutdown)
+            _at_exit = True
+
+
+def _shutdown():
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+
+
+def _after_fork_in_child():
+    """A forked worker (gunicorn) inherits the queue but not the writer thread."""
+    global _listener, _queue, _setup_lock
+    _setup_lock    = threading.Lock()
+    _listener      = None
+    _queue         = queue.SimpleQueue()  # Records queued before the fork belong to the parent
+    _handler.queue = _queue
+
+
+def configure(stream=None, level=None):
+    """Redirect output to ``stream`` and/or change the level (tests, entry points)."""
+    global _listener
+    root = logging.getLogger(ROOT_LOGGER)
+    if level is not None:
+        root.setLevel(level)
+    if stream is not None:
+        with _setup_lock:
+            listener, _listener = _listener, None
+        if listener is not None:
+            listener.stop()
+        _start_listener(stream)
+    return root
+
+
+def flush():
+    """Block until every record queued so far has been written."""
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener.start()
+
+
+def get_logger(name=None):
+    """Logger under the app root (``traffic``); ``name`` is usually ``__name__``."""
+    if not name or name == ROOT_LOGGER:
+        return logging.getLogger(ROOT_LOGGER)
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
 
 
 def safe_print(*args, **kwargs):
-    """Thread-safe print wrapper."""
-    with print_lock:
-        print(*args, **kwargs)
-        sys.stdout.flush()
+    """Backwards-compatible print replacement: logs the joined arguments at INFO."""
+    if _root.isEnabledFor(logging.INFO):
+        _root.info(kwargs.get("sep", " ").join(str(a) for a in args))
+
+
+# Handler wiring is in-memory only; the writer thread starts with the first record
+_queue = queue.SimpleQueue()
+_root  = logging.getLogger(ROOT_LOGGER)
+_root.setLevel(LOG_LEVEL)
+_root.propagate = False
+_handler = _QueueHandler(_queue)
+_handler.addFilter(SampleFilter())  # Drop sampled-out records before they are queued
+_root.addHandler(_handler)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,165 @@
+# map_cache.py
+"""
+Content-addressed cache for static map images.
+
+Images are keyed by quantized (lat, lon, zoom, style), so incidents at the
+same spot share one PNG in traffic-app/maps instead of each paying for a
+Mapbox request. An eviction pass removes orphaned files and trims the least
+recently used images to stay within a disk budget.
+"""
+
+import glob
+import hashlib
+import os
+import threading
+import time
+
+import metrics
+
+CACHE_PREFIX   = "map_"
+QUANTIZE_PX    = 4        # Coordinates within this many pixels share an image
+ORPHAN_GRACE_S = 15 * 60  # Don't delete unreferenced files younger than this
+
+MAP_RENDER_SECONDS = metrics.histogram(
+    "traffic_map_render_seconds", "Time to render one static map image on a cache miss.",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0),
+)
+
+
+def quantize(lat, lon, zoom):
+    """Snap coordinates to a grid of QUANTIZE_PX pixels at the given zoom."""
+    step = 360.0 / (256 * 2 ** zoom) * QUANTIZE_PX
+    return round(round(lat / step) * step, 6), round(round(lon / step) * step, 6)
+
+
+def cache_filename(lat, lon, zoom, style):
+    """Return the content-addressed filename for a quantized map request."""
+    qlat, qlon = quantize(lat, lon, zoom)
+    digest = hashlib.sha1(f"{style}|{zoom}|{qlat:.6f}|{qlon:.6f}".encode()).hexdigest()[:20]
+    return f"{CACHE_PREFIX}{digest}.png"
+
+
+class MapImageCache:
+    """Shared-by-reference map image store backed by a MapRenderer."""
+
+    def __init__(self, target_dir, renderer, style, max_bytes=500 * 1024 * 1024):
+        self.target_dir = target_dir
+        self.renderer   = renderer
+        os.makedirs(target_dir, exist_ok=True)
+        self.style      = style
+        self.max_bytes  = max_bytes
+        self._lock      = threading.Lock()
+        self._stripes   = [threading.Lock() for _ in range(32)]
+        self.hits       = 0
+        self.misses     = 0
+        self.evicted    = 0
+        self.disk_bytes = 0
+        self.disk_files = 0
+
+    # ── Lookup ─────────────────────────────────────────────────────────────
+
+    def get_or_render(self, lat, lon, zoom=16):
+        """Return the basename of a map image for these coordinates, rendering on miss."""
+        filename = cache_filename(lat, lon, zoom, self.style)
+        path     = os.path.join(self.target_dir, filename)
+
+        if os.path.exists(path):
+            os.utime(path)  # Bump mtime so LRU eviction sees the reuse
+            with self._lock:
+                self.hits += 1
+            return filename
+
+        # Serialise renders of the same image; other keys proceed in parallel
+        with self._stripes[hash(filename) % len(self._stripes)]:
+            if os.path.exists(path):
+                with self._lock:
+                    self.hits += 1
+                return filename
+
+            with self._lock:
+                self.misses += 1
+
+            qlat, qlon = quantize(lat, lon, zoom)
+            tmp_path   = f"{path}.{threading.get_ident()}.tmp"
+            with MAP_RENDER_SECONDS.time():
+                self.renderer.render(qlon, qlat, tmp_path, zoom=zoom)
+            os.replace(tmp_path, path)
+        return filename
+
+    # ── Eviction ───────────────────────────────────────────────────────────
+
+    def evict(self, referenced):
+        """Delete orphans, then LRU-trim to the disk budget.
+
+        Args:
+            referenced: set of map filenames still referenced by incidents.
+
+        Returns:
+            list of referenced filenames that were evicted for budget reasons;
+            callers should clear those references.
+        """
+        now   = time.time()
+        files = []
+        for path in glob.glob(os.path.join(self.target_dir, f"{CACHE_PREFIX}*.png")):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+
+        kept, evicted_refs, removed = [], [], 0
+        for mtime, size, path in files:
+            name = os.path.basename(path)
+            if name not in referenced and now - mtime > ORPHAN_GRACE_S:
+                removed += self._remove(path)
+            else:
+                kept.append((mtime, size, path))
+
+        total = sum(size for _, size, _ in kept)
+        kept.sort()  # Oldest mtime (least recently used) first
+        while kept and total > self.max_bytes:
+            mtime, size, path = kept.pop(0)
+            if self._remove(path):
+                removed += 1
+                total   -= size
+                evicted_refs.append(os.path.basename(path))
+
+        with self._lock:
+            self.evicted   += removed
+            self.disk_bytes = total
+            self.disk_files = len(kept)
+        return evicted_refs
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits":       self.hits,
+                "misses":     self.misses,
+                "hit_ratio":  self.hits / lookups if lookups else 0.0,
+                "evicted":    self.evicted,
+                "disk_bytes": self.disk_bytes,
+                "disk_files": self.disk_files,
+            }
+
+    def collect(self):
+        """Metrics collector (see metrics.Registry.collector)."""
+        stats = self.stats()
+        return [
+            ("traffic_map_cache_lookups_total", "counter", "Map image cache lookups by result.",
+             [({"result": "hit"}, stats["hits"]), ({"result": "miss"}, stats["misses"])]),
+            ("traffic_map_cache_evicted_total", "counter", "Map images deleted by eviction.",
+             [({}, stats["evicted"])]),
+            ("traffic_map_cache_disk_bytes", "gauge", "Bytes of map images on disk at the last eviction pass.",
+             [({}, stats["disk_bytes"])]),
+            ("traffic_map_cache_disk_files", "gauge", "Map images on disk at the last eviction pass.",
+             [({}, stats["disk_files"])]),
+        ]
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError:
+            return 0
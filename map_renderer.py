@@ -0,0 +1,112 @@
+# map_renderer.py
+"""
+In-process static map rendering service.
+
+Replaces one `python generate_map.py` subprocess per incident with a shared
+pooled HTTP session and a bounded worker pool. Identical (lon, lat, zoom)
+requests that are already in flight are coalesced onto a single download.
+The old subprocess path remains available (mode="subprocess") for isolation,
+and backend="pmtiles" renders offline from the local PMTiles basemap.
+"""
+
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import pmtiles_map
+from generate_map import save_map_image
+
+MODE_INPROCESS = "inprocess"
+MODE_SUBPROCESS = "subprocess"
+
+BACKEND_MAPBOX  = "mapbox"
+BACKEND_PMTILES = "pmtiles"
+
+
+class MapRenderer:
+    """Render static map PNGs on a bounded worker pool with request coalescing."""
+
+    def __init__(self, access_token, mode=MODE_INPROCESS, max_workers=4,
+                 generator_path=None, timeout=15, backend=BACKEND_MAPBOX, pmtiles_path=None):
+        if mode not in (MODE_INPROCESS, MODE_SUBPROCESS):
+            raise ValueError(f"Unknown map render mode: {mode!r}")
+        if backend not in (BACKEND_MAPBOX, BACKEND_PMTILES):
+            raise ValueError(f"Unknown map backend: {backend!r}")
+        self.access_token   = access_token
+        self.mode           = mode
+        self.backend        = backend
+        self.pmtiles_path   = pmtiles_path
+        self.generator_path = generator_path
+        self.timeout        = timeout
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self._session.mount("https://", adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="map-render")
+        self._inflight = {}
+        self._lock     = threading.Lock()
+
+    # ── Public API ─────────────────────────────────────────────────────────
+
+    def submit(self, lon, lat, filename, zoom=16):
+        """Queue a render and return a Future resolving to the written file path.
+
+        If an identical (lon, lat, zoom) render is already in flight, the
+        existing Future is returned and ``filename`` is ignored — callers
+        must use the path the Future resolves to.
+        """
+        key = (round(float(lon), 6), round(float(lat), 6), zoom)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = self._executor.submit(self._render, lon, lat, filename, zoom)
+            self._inflight[key] = future
+
+        future.add_done_callback(lambda _f: self._forget(key))
+        return future
+
+    def render(self, lon, lat, filename, zoom=16):
+        """Blocking helper: render and return the written file path."""
+        return self.submit(lon, lat, filename, zoom).result()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        self._session.close()
+
+    # ── Internals ──────────────────────────────────────────────────────────
+
+    def _forget(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def _render(self, lon, lat, filename, zoom):
+        if self.mode == MODE_SUBPROCESS:
+            if not self.generator_path or not os.path.exists(self.generator_path):
+                raise FileNotFoundError(f"Map generator not found at '{self.generator_path}'.")
+            env = {**os.environ, "MAP_BACKEND": self.backend}
+            if self.pmtiles_path:
+                env["MAP_PMTILES_PATH"] = self.pmtiles_path
+            subprocess.run(
+                [sys.executable, self.generator_path, str(lon), str(lat), filename],
+                check=True, env=env,
+            )
+            return filename
+
+        if self.backend == BACKEND_PMTILES:
+            return pmtiles_map.save_map_image(
+                lon, lat, filename=filename, zoom=zoom, pmtiles_path=self.pmtiles_path,
+            )
+
+        if not self.access_token:
+            raise RuntimeError("MAP_ACCESS_TOKEN not configured.")
+        return save_map_image(
+            lon, lat, self.access_token, filename,
+            zoom=zoom, session=self._session, timeout=self.timeout,
+        )
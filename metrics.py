@@ -0,0 +1,285 @@
+# metrics.py
+"""
+In-process metrics: counters, histograms and collected gauges, rendered in
+the Prometheus text exposition format.
+
+Instruments are created at import time by the module that owns them and
+updated with one short lock-protected add, so recording costs about a
+microsecond. The pipeline spans several processes, the monitor (scraping,
+geocoding, LLM, maps) and one or more API workers, and a scrape reaches only
+one worker. So every process dumps its samples to its own small JSON file in
+a shared directory (the monitor after each cycle, API workers every few
+seconds) and /metrics renders the serving process's live samples plus every
+other live process's dump, each labelled with its role and pid so each
+process's counters stay one monotonic series.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Label attached to every sample this process exports; entry points override it
+process_role = "app"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name       = name
+        self.help       = help
+        self.labelnames = tuple(labelnames)
+        self._lock      = threading.Lock()
+        self._values    = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key):
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    """Monotonic count, optionally split by labels."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in fixed buckets (seconds by default)."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key   = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1]        += value
+            series[2]        += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        series = self._values.get(self._key(labels))
+        return series[2] if series else 0
+
+    def samples(self):
+        out = []
+        with self._lock:
+            items = [(key, list(counts), total, n) for key, (counts, total, n) in self._values.items()]
+        for key, counts, total, n in items:
+            labels, cumulative = self._labels(key), 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                out.append((f"{self.name}_bucket", {**labels, "le": le}, cumulative))
+            out.append((f"{self.name}_sum", labels, total))
+            out.append((f"{self.name}_count", labels, n))
+        return out
+
+
+class Registry:
+    """Named instruments plus collector callbacks, exportable as text or JSON."""
+
+    def __init__(self):
+        self._lock       = threading.Lock()
+        self._metrics    = {}
+        self._collectors = []
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def collector(self, fn):
+        """Register ``fn() -> [(name, type, help, [(labels, value), ...]), ...]``, run at export."""
+        with self._lock:
+            self._collectors.append(fn)
+        return fn
+
+    def snapshot(self):
+        """All current samples as JSON-friendly families."""
+        with self._lock:
+            metrics, collectors = list(self._metrics.values()), list(self._collectors)
+        families = [
+            {"name": m.name, "type": m.kind, "help": m.help, "samples": m.samples()}
+            for m in metrics
+        ]
+        for fn in collectors:
+            try:
+                for name, kind, help, values in fn():
+                    families.append({
+                        "name": name, "type": kind, "help": help,
+                        "samples": [(name, labels, value) for labels, value in values],
+                    })
+            except Exception:
+                continue  # A broken collector must not take /metrics down
+        return families
+
+    def dump(self, path):
+        """Write this process's samples to ``path`` atomically."""
+        state = {"pid": os.getpid(), "role": process_role, "updated_at": time.time(),
+                 "families": self.snapshot()}
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+
+registry = Registry()
+counter   = registry.counter
+histogram = registry.histogram
+collector = registry.collector
+
+
+# ---------------------------------------------------------------------------
+# Cross-process dumps
+# ---------------------------------------------------------------------------
+
+def publish(dump_dir):
+    """Dump this process's samples into ``dump_dir`` as ``<role>-<pid>.json``."""
+    os.makedirs(dump_dir, exist_ok=True)
+    registry.dump(os.path.join(dump_dir, f"{process_role}-{os.getpid()}.json"))
+
+
+def start_publisher(dump_dir, interval):
+    """Publish every ``interval`` seconds from a daemon thread (API workers)."""
+    def loop():
+        while True:
+            try:
+                publish(dump_dir)
+            except OSError:
+                pass  # Next round retries; /metrics still serves this worker live
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name="metrics-publisher", daemon=True)
+    thread.start()
+    return thread
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read_dumps(dump_dir):
+    """States dumped by other live processes; dumps of exited ones are removed."""
+    try:
+        names = sorted(os.listdir(dump_dir))
+    except (OSError, TypeError):
+        return []
+    states = []
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(dump_dir, name)
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            continue
+        pid = state.get("pid")
+        if pid == os.getpid():
+            continue  # Reported live instead
+        if not isinstance(pid, int) or pid <= 0 or not _alive(pid):
+            try:
+                os.remove(path)  # A recycled worker or a stopped monitor
+            except OSError:
+                pass
+            continue
+        states.append(state)
+    return states
+
+
+# ---------------------------------------------------------------------------
+# Exposition
+# ---------------------------------------------------------------------------
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def render(sources):
+    """Prometheus text for ``[(process labels, families), ...]``, merging families by name."""
+    merged = {}
+    for process, families in sources:
+        for family in families:
+            entry = merged.setdefault(family["name"], {**family, "samples": []})
+            entry["samples"].extend(
+                (name, {**process, **labels}, value) for name, labels, value in family["samples"]
+            )
+
+    lines = []
+    for name, family in merged.items():
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for sample, labels, value in family["samples"]:
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{sample}{{{label_text}}} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def exposition(dump_dir=None):
+    """This process's metrics plus the dumps of the other live processes in ``dump_dir``."""
+    sources = [({"process": process_role, "pid": os.getpid()}, registry.snapshot())]
+    for state in _read_dumps(dump_dir):
+        process = {"process": state.get("role", "monitor"), "pid": state["pid"]}
+        age     = time.time() - state.get("updated_at", 0)
+        sources.append((process, state["families"] + [{
+            "name": "traffic_metrics_snapshot_age_seconds", "type": "gauge",
+            "help": "Seconds since the process last dumped its metrics.",
+            "samples": [("traffic_metrics_snapshot_age_seconds", {}, age)],
+        }]))
+    return render(sources)
@@ -2,32 +2,51 @@
 """
 Background monitoring loop: orchestrates scraping, geocoding,
 map generation, and final-description generation for inactive incidents.
+
+Run standalone with `python monitor.py`: the pipeline then lives in its own
+process, CPU-bound HTML parsing goes to a process pool, and the API only
+sees the results through SQLite plus the change channel (notify.py).
 """
 
-import json
+import argparse
 import os
+import signal
 import sqlite3
 import subprocess
 import sys
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime
 
-import pytz
-import requests
-
+import metrics
 from config import (
-    DB_FILE, MAP_GENERATOR, TARGET_DIR, TESTMODE, HEALTHCHECK_URL, db_lock
+    ARCHIVE_AFTER_DAYS, ARCHIVE_INTERVAL, DB_FILE, TARGET_DIR, TESTMODE, HEALTHCHECK_URL,
+    MAP_EVICTION_INTERVAL, METRICS_DIR, MONITOR_LOCK_FILE, MONITOR_PARSE_WORKERS, STATS_SNAPSHOTS,
+    STATS_SNAPSHOT_INTERVAL, change_channel, get_geo_cache, get_map_cache, get_stats_snapshots,
 )
-from logger import safe_print
-from db import incident_exists, save_or_update_incident
+from logger import get_logger
+from db import (
+    archive_incidents, clear_map_filenames, connect, decode_incident, incident_exists, init_db,
+    referenced_map_filenames, save_or_update_incident, write_stats, write_transaction,
+)
+from process_lock import SingletonLock
 from llm import generate_description
 from geocoding import geocode_location as geo_geocode_location
-from config import geo_cache
+from stats import build_snapshots
+
+
+log     = get_logger(__name__)
+_geo_log = get_logger("geocoding")
+
+# Per-incident messages log one occurrence in this many (per message template)
+_PER_INCIDENT = {"sample": 20}
 
 
 def geocode_location(location_query):
-    """Geocode using the shared module and cache."""
-    return geo_geocode_location(location_query, cache=geo_cache, debug_print=safe_print)
+    """Geocode using the shared module and cache (its chatter goes to DEBUG)."""
+    return geo_geocode_location(location_query, cache=get_geo_cache(), debug_print=_geo_log.debug)
 
 
 # ---------------------------------------------------------------------------
@@ -38,24 +57,95 @@ def run_map_generator(incident):
     """Generate a static map PNG for an incident and store the filename in-place."""
     incident_no = incident.get("No.") or incident.get("Incident No.", "unknown")
     if TESTMODE:
-        safe_print(f"TESTMODE: Skipping map generation for {incident_no}")
-        return
-    if not os.path.exists(MAP_GENERATOR):
-        safe_print(f"Map generator not found at '{MAP_GENERATOR}'.")
+        log.debug("TESTMODE: Skipping map generation for %s", incident_no, extra=_PER_INCIDENT)
         return
     try:
-        lon              = incident.get("Longitude")
-        lat              = incident.get("Latitude")
-        tz               = pytz.timezone("America/Los_Angeles")
-        ts_str           = datetime.now(tz).strftime("%Y%m%d_%H%M%S_%f")
-        filename         = os.path.join(TARGET_DIR, f"map_{incident_no}_{ts_str}.png")
-        subprocess.run([sys.executable, MAP_GENERATOR, str(lon), str(lat), filename], check=True)
-        safe_print(f"Map generated for {incident_no}.")
-        incident["MapFilename"] = os.path.basename(filename)
+        lon      = incident.get("Longitude")
+        lat      = incident.get("Latitude")
+        filename = get_map_cache().get_or_render(lat, lon)
+        log.debug("Map ready for %s: %s", incident_no, filename, extra=_PER_INCIDENT)
+        incident["MapFilename"] = filename
     except subprocess.CalledProcessError as e:
-        safe_print(f"Map generator error for {incident_no}: {e}")
+        log.warning("Map generator error for %s: %s", incident_no, e, extra=_PER_INCIDENT)
+    except Exception as e:
+        log.error("Unexpected map generator error for %s: %s", incident_no, e, extra=_PER_INCIDENT)
+
+
+_last_map_eviction = 0.0
+
+
+def _maybe_evict_maps():
+    """Periodically drop orphaned map images and trim the cache to its disk budget."""
+    global _last_map_eviction
+    if time.time() - _last_map_eviction < MAP_EVICTION_INTERVAL:
+        return
+    _last_map_eviction = time.time()
+    try:
+        cache   = get_map_cache()
+        evicted = cache.evict(referenced_map_filenames())
+        clear_map_filenames(evicted)
+        stats = cache.stats()
+        log.info(
+            "Map cache: hit ratio %.1f%% (%d hits / %d misses), %d files, %.1f MB on disk",
+            stats["hit_ratio"] * 100, stats["hits"], stats["misses"],
+            stats["disk_files"], stats["disk_bytes"] / 1e6,
+        )
+    except Exception as e:
+        log.error("Map cache eviction error: %s", e)
+
+
+_last_archive = 0.0
+
+
+def _maybe_archive():
+    """Periodically move old closed incidents to the archive tier. Returns rows moved."""
+    global _last_archive
+    if ARCHIVE_AFTER_DAYS <= 0 or time.time() - _last_archive < ARCHIVE_INTERVAL:
+        return 0
+    _last_archive = time.time()
+    try:
+        moved = archive_incidents(ARCHIVE_AFTER_DAYS)
+        if moved:
+            log.info("Archived %d incidents older than %d days.", moved, ARCHIVE_AFTER_DAYS)
+        return moved
+    except Exception as e:
+        log.error("Archive error: %s", e)
+        return 0
+
+
+_last_stats_build = 0.0
+
+
+def _maybe_build_stats(changed):
+    """Rebuild the stats snapshots after a cycle that changed data, or once they age."""
+    global _last_stats_build
+    if not STATS_SNAPSHOTS or (not changed and time.time() - _last_stats_build < STATS_SNAPSHOT_INTERVAL):
+        return
+    _last_stats_build = time.time()
+    try:
+        count = get_stats_snapshots().publish(build_snapshots())
+        log.debug("Published %d stats snapshots in %.0f ms", count, (time.time() - _last_stats_build) * 1000)
     except Exception as e:
-        safe_print(f"Unexpected map generator error for {incident_no}: {e}")
+        log.error("Stats snapshot error: %s", e)
+
+
+_last_write_stats = write_stats.snapshot()
+
+
+def _log_write_contention():
+    """Log this cycle's write-lock wait/hold times so contention is visible."""
+    global _last_write_stats
+    stats, prev = write_stats.snapshot(), _last_write_stats
+    _last_write_stats = stats
+    txns = stats["transactions"] - prev["transactions"]
+    if not txns:
+        return
+    retries  = stats["busy_retries"] - prev["busy_retries"]
+    failures = stats["failures"] - prev["failures"]
+    log.info(
+        "DB writes: %d txns, lock wait max %.1f ms (avg %.1f ms overall), %d busy retries, %d failures",
+        txns, stats["wait_max_ms"], stats["wait_avg_ms"], retries, failures,
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -63,18 +153,21 @@ def run_map_generator(incident):
 # ---------------------------------------------------------------------------
 
 def process_and_save_incident(incident):
-    """Geocode, generate map, and persist one incident. Returns incident_no or None."""
+    """Geocode, generate map, and persist one incident.
+
+    Returns (incident_no, changed); incident_no is None if the incident was skipped.
+    """
     try:
         incident_no = incident.get("No.") or incident.get("Incident No.")
         if not incident_no:
-            safe_print("WARNING: No incident number found. Skipping.")
-            return None
+            log.warning("No incident number found. Skipping.", extra=_PER_INCIDENT)
+            return None, False
 
         inc_exists  = incident_exists(incident_no, incident.get("Date", datetime.now().strftime("%Y-%m-%d")))
         needs_geocoding = not inc_exists
 
         if not needs_geocoding:
-            with sqlite3.connect(DB_FILE, timeout=30) as conn:
+            with connect() as conn:
                 cur = conn.cursor()
                 cur.execute(
                     "SELECT latitude, map_filename FROM incidents WHERE incident_no = ?",
@@ -82,7 +175,7 @@ def process_and_save_incident(incident):
                 )
                 row = cur.fetchone()
                 if row and (row[0] is None or not row[1]):
-                    safe_print(f"Incident {incident_no} missing coords/map — will geocode.")
+                    log.debug("Incident %s missing coords/map — will geocode.", incident_no, extra=_PER_INCIDENT)
                     needs_geocoding = True
 
         if needs_geocoding:
@@ -90,12 +183,12 @@ def process_and_save_incident(incident):
             if "Latitude" in incident and "Longitude" in incident:
                 run_map_generator(incident)
 
-        save_or_update_incident(incident)
-        return str(incident_no)
+        changed = save_or_update_incident(incident)
+        return str(incident_no), bool(changed)
     except Exception as e:
         inc_id = incident.get("No.", "unknown") if isinstance(incident, dict) else "unknown"
-        safe_print(f"Error processing incident {inc_id}: {e}")
-        return None
+        log.error("Error processing incident %s: %s", inc_id, e, extra=_PER_INCIDENT)
+        return None, False
 
 
 def _geocode_incident(incident):
@@ -124,114 +217,271 @@ def _geocode_incident(incident):
     else:
         return
 
-    safe_print(f"Geocoding {incident.get('No.')} ({source}): {query}")
+    log.info("Geocoding %s (%s): %s", incident.get("No."), source, query, extra=_PER_INCIDENT)
     coords = geocode_location(query)
     if coords:
         incident.update(coords)
 
 
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+SCRAPE_SECONDS  = metrics.histogram("traffic_scrape_seconds", "Scrape duration per source.", ["source"])
+SCRAPE_ROWS     = metrics.counter("traffic_scrape_rows_total", "Incidents returned per source.", ["source"])
+SCRAPE_ERRORS   = metrics.counter("traffic_scrape_errors_total", "Scrapes that raised, per source.", ["source"])
+CYCLE_SECONDS   = metrics.histogram(
+    "traffic_monitor_cycle_seconds", "Duration of one full monitor cycle.",
+    buckets=(1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0),
+)
+INCIDENT_CHANGES = metrics.counter("traffic_incident_changes_total", "Incident rows changed by the monitor.")
+STAGE_SECONDS   = metrics.histogram(
+    "traffic_monitor_stage_seconds", "Duration of each stage of a monitor cycle.", ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+
+def _timed_scrape(source, fn, timings=None):
+    """Run one scraper, recording its duration, row count and failures."""
+    start = time.perf_counter()
+    try:
+        results = fn()
+    except Exception:
+        SCRAPE_ERRORS.inc(source=source)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        SCRAPE_SECONDS.observe(elapsed, source=source)
+        if timings is not None:
+            timings[f"scrape.{source}"] = elapsed
+    SCRAPE_ROWS.inc(len(results), source=source)
+    return results
+
+
+@contextmanager
+def _stage(name, timings):
+    """Time one cycle stage into ``timings`` and the stage histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def _dump_metrics():
+    """Publish this process's metrics for the API's /metrics endpoint."""
+    try:
+        metrics.publish(METRICS_DIR)
+    except OSError as e:
+        log.warning("Could not write metrics to %s: %s", METRICS_DIR, e)
+
+
+# ---------------------------------------------------------------------------
+# Active-set tracking
+# ---------------------------------------------------------------------------
+
+_IN_CHUNK = 500  # incident numbers per IN (...) list
+
+
+class ActiveSet:
+    """The incident numbers the DB has marked active, mirrored in memory.
+
+    Loaded once with an indexed read, then replaced by each cycle's scrape,
+    so the incidents that went inactive are a set difference and the DB
+    work per cycle scales with churn instead of table size. ``reset()``
+    drops the mirror after an error so the next cycle reloads it.
+    """
+
+    def __init__(self):
+        self._ids = None
+
+    def closed(self, active_ids):
+        """Incident numbers active last cycle that are missing from ``active_ids``."""
+        if self._ids is None:
+            with connect() as conn:
+                cur = conn.cursor()
+                cur.execute("SELECT DISTINCT incident_no FROM incidents WHERE active = 1")
+                self._ids = {row[0] for row in cur.fetchall()}
+        return self._ids - set(active_ids)
+
+    def update(self, active_ids):
+        self._ids = set(active_ids)
+
+    def reset(self):
+        self._ids = None
+
+
+def _chunks(ids):
+    ids = sorted(ids)
+    for i in range(0, len(ids), _IN_CHUNK):
+        yield ids[i:i + _IN_CHUNK]
+
+
 # ---------------------------------------------------------------------------
 # Monitoring loop
 # ---------------------------------------------------------------------------
 
-def monitor_traffic_data(interval=15):
-    """Continuously scrape all sources, process incidents, and manage active status."""
+def _scrapers():
     # Import here to avoid circular dependency at module level
     from scrapers.chp  import scrape_chp_incidents
     from scrapers.sdpd import scrape_sdpd_incidents
     from scrapers.sdfd import scrape_sdfd_incidents
     from scrapers.sdso import scrape_sdso_incidents
 
-    safe_print("Starting continuous traffic monitoring...")
-    safe_print(f"DB: {DB_FILE}")
-    safe_print(f"Maps: {TARGET_DIR}")
-    safe_print("Press Ctrl+C to stop.")
+    return {
+        "CHP":  scrape_chp_incidents,
+        "SDPD": scrape_sdpd_incidents,
+        "SDFD": scrape_sdfd_incidents,
+        "SDSO": scrape_sdso_incidents,
+    }
+
+
+def run_cycle(active_set, scrapers=None):
+    """One monitor pass: scrape, process, close, archive and stats. Returns (changed, stage timings).
+
+    Timings are wall-clock seconds per stage plus ``scrape.<SOURCE>`` per
+    scraper. Errors propagate; the loop decides how to report them.
+    """
+    scrapers = scrapers or _scrapers()
+    timings  = {}
+
+    # ── Parallel scraping ──────────────────────────────────────────────────
+    all_incidents = []
+    with _stage("scrape", timings), ThreadPoolExecutor(max_workers=4) as executor:
+        futures = {executor.submit(_timed_scrape, name, fn, timings): name for name, fn in scrapers.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results = future.result()
+                all_incidents.extend(results)
+                log.info("%s: %d incidents fetched", name, len(results))
+            except Exception as e:
+                log.error("Error scraping %s: %s", name, e)
+
+    # ── Parallel processing ────────────────────────────────────────────────
+    active_ids = set()
+    changed    = 0
+    with _stage("process", timings):
+        if all_incidents:
+            # CHP first (already has coords — faster to process)
+            all_incidents.sort(key=lambda x: 0 if x.get("Source") == "CHP" else 1)
+            with ThreadPoolExecutor(max_workers=10) as executor:
+                futures = [executor.submit(process_and_save_incident, inc) for inc in all_incidents]
+                for f in as_completed(futures):
+                    inc_id, inc_changed = f.result()
+                    if inc_id:
+                        active_ids.add(inc_id)
+                    changed += inc_changed
+        else:
+            log.warning("No data retrieved from any source.")
+
+    # ── Incidents that dropped out of the feeds since last cycle ───────────
+    with _stage("close", timings):
+        closed_ids = active_set.closed(active_ids)
+
+        # ── Final descriptions for newly-inactive incidents ─────────────────
+        changed += _generate_final_descriptions(closed_ids)
+
+        # ── Mark stale incidents inactive ──────────────────────────────────
+        changed += _mark_inactive(closed_ids)
+        active_set.update(active_ids)
+
+    # ── Move old closed incidents to the archive tier ──────────────────────
+    with _stage("archive", timings):
+        changed += _maybe_archive()
+
+    # ── Precompute /api/incident_stats before announcing the change ────────
+    with _stage("stats", timings):
+        _maybe_build_stats(changed)
+
+    # ── Tell API workers there is new data ─────────────────────────────────
+    if changed:
+        INCIDENT_CHANGES.inc(changed)
+        version = change_channel.publish()
+        log.info("%d incident change(s); data version %d", changed, version)
+
+    # ── Map cache housekeeping ─────────────────────────────────────────────
+    with _stage("housekeeping", timings):
+        _maybe_evict_maps()
+        _log_write_contention()
+
+    return changed, timings
+
 
+def monitor_traffic_data(interval=15, stop_event=None):
+    """Continuously scrape all sources, process incidents, and manage active status.
+
+    Runs until interrupted, or until ``stop_event`` (a threading.Event) is set,
+    in which case the current cycle finishes before returning.
+    """
+    scrapers = _scrapers()
+
+    log.info("Starting continuous traffic monitoring...")
+    log.info("DB: %s", DB_FILE)
+    log.info("Maps: %s", TARGET_DIR)
+    log.info("Press Ctrl+C to stop.")
+
+    active_set = ActiveSet()
     try:
-        while True:
+        while stop_event is None or not stop_event.is_set():
+            cycle_start = time.perf_counter()
             try:
-                safe_print(f"Checking updates... {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-
-                # ── Parallel scraping ──────────────────────────────────────
-                all_incidents = []
-                scrapers = {
-                    "CHP":  scrape_chp_incidents,
-                    "SDPD": scrape_sdpd_incidents,
-                    "SDFD": scrape_sdfd_incidents,
-                    "SDSO": scrape_sdso_incidents,
-                }
-                with ThreadPoolExecutor(max_workers=4) as executor:
-                    futures = {executor.submit(fn): name for name, fn in scrapers.items()}
-                    for future in as_completed(futures):
-                        name = futures[future]
-                        try:
-                            results = future.result()
-                            all_incidents.extend(results)
-                            safe_print(f"{name}: {len(results)} incidents fetched")
-                        except Exception as e:
-                            safe_print(f"Error scraping {name}: {e}")
-
-                # ── Parallel processing ────────────────────────────────────
-                active_ids = set()
-                if all_incidents:
-                    # CHP first (already has coords — faster to process)
-                    all_incidents.sort(key=lambda x: 0 if x.get("Source") == "CHP" else 1)
-                    with ThreadPoolExecutor(max_workers=10) as executor:
-                        futures = [executor.submit(process_and_save_incident, inc) for inc in all_incidents]
-                        for f in as_completed(futures):
-                            inc_id = f.result()
-                            if inc_id:
-                                active_ids.add(inc_id)
-                else:
-                    safe_print("No data retrieved from any source.")
-
-                # ── Final descriptions for newly-inactive incidents ─────────
-                _generate_final_descriptions(active_ids)
-
-                # ── Mark stale incidents inactive ──────────────────────────
-                _mark_inactive(active_ids)
+                log.info("Checking updates...")
+                run_cycle(active_set, scrapers)
 
                 # ── Healthcheck ping ───────────────────────────────────────
                 _ping_healthcheck(success=True)
 
             except Exception as e:
-                safe_print(f"Error in monitoring loop: {e}")
+                log.error("Error in monitoring loop: %s", e, exc_info=True)
+                active_set.reset()
                 _ping_healthcheck(success=False)
 
-            import time
-            time.sleep(interval)
+            CYCLE_SECONDS.observe(time.perf_counter() - cycle_start)
+            _dump_metrics()
 
+            if stop_event is not None:
+                stop_event.wait(interval)
+            else:
+                time.sleep(interval)
+
+        log.info("Monitoring stopped.")
     except KeyboardInterrupt:
-        safe_print("Monitoring stopped by user.")
+        log.info("Monitoring stopped by user.")
     except Exception as e:
-        safe_print(f"Fatal error: {e}")
+        log.critical("Fatal error: %s", e, exc_info=True)
         raise
 
 
-def _generate_final_descriptions(active_ids):
-    """Generate closing LLM summaries for incidents that just went inactive."""
-    with db_lock:
-        with sqlite3.connect(DB_FILE, timeout=30) as conn:
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-            if active_ids:
-                placeholders = ",".join("?" for _ in active_ids)
-                cur.execute(
-                    f"SELECT * FROM incidents WHERE active = 1 AND incident_no NOT IN ({placeholders})",
-                    tuple(active_ids),
-                )
-            else:
-                cur.execute("SELECT * FROM incidents WHERE active = 1")
-            newly_inactive = [dict(row) for row in cur.fetchall()]
+def _generate_final_descriptions(closed_ids):
+    """Generate closing LLM summaries for incidents that just went inactive.
+
+    Returns the number of incidents whose description was updated.
+    """
+    if not closed_ids:
+        return 0
+    newly_inactive = []
+    with connect() as conn:
+        conn.row_factory = sqlite3.Row
+        cur = conn.cursor()
+        for chunk in _chunks(closed_ids):
+            placeholders = ",".join("?" for _ in chunk)
+            cur.execute(
+                f"SELECT * FROM incidents WHERE active = 1 AND incident_no IN ({placeholders})",
+                chunk,
+            )
+            newly_inactive += [decode_incident(dict(row)) for row in cur.fetchall()]
 
     if not newly_inactive:
-        return
+        return 0
 
-    safe_print(f"Generating final summaries for {len(newly_inactive)} newly inactive incidents...")
+    log.info("Generating final summaries for %d newly inactive incidents...", len(newly_inactive))
 
     def _process_final(record):
         try:
-            details = json.loads(record.get("details", "[]") or "[]")
+            details = record["Details"]
             if not details:
                 return
             data = {
@@ -242,41 +492,163 @@ def _generate_final_descriptions(active_ids):
                 "Details":       details,
             }
             final_desc, final_sev = generate_description(data)
-            with db_lock:
-                with sqlite3.connect(DB_FILE, timeout=30) as conn:
-                    conn.cursor().execute(
-                        "UPDATE incidents SET description = ?, severity = ? WHERE incident_no = ? AND date = ?",
-                        (final_desc, final_sev, record["incident_no"], record["date"]),
-                    )
-                    conn.commit()
+            with write_transaction("final_description") as conn:
+                conn.execute(
+                    "UPDATE incidents SET description = ?, severity = ? WHERE incident_no = ? AND date = ?",
+                    (final_desc, final_sev, record["incident_no"], record["date"]),
+                )
+            return True
         except Exception as ex:
-            safe_print(f"Error generating final description for {record.get('incident_no')}: {ex}")
+            log.error("Error generating final description for %s: %s", record.get("incident_no"), ex,
+                      extra=_PER_INCIDENT)
+            return False
 
     with ThreadPoolExecutor(max_workers=5) as executor:
-        for _ in as_completed([executor.submit(_process_final, r) for r in newly_inactive]):
-            pass
-
-
-def _mark_inactive(active_ids):
-    """Set active = 0 for incidents no longer in the current scrape."""
-    with db_lock:
-        with sqlite3.connect(DB_FILE, timeout=30) as conn:
-            cur = conn.cursor()
-            if active_ids:
-                placeholders = ",".join("?" for _ in active_ids)
-                cur.execute(
-                    f"UPDATE incidents SET active = 0 WHERE incident_no NOT IN ({placeholders})",
-                    tuple(active_ids),
-                )
-            else:
-                cur.execute("UPDATE incidents SET active = 0")
-            conn.commit()
+        futures = [executor.submit(_process_final, r) for r in newly_inactive]
+        return sum(1 for f in as_completed(futures) if f.result())
+
+
+def _mark_inactive(closed_ids):
+    """Set active = 0 for incidents that dropped out of the scrape. Returns rows changed."""
+    if not closed_ids:
+        return 0
+    changed = 0
+    with write_transaction("mark_inactive") as conn:
+        cur = conn.cursor()
+        for chunk in _chunks(closed_ids):
+            placeholders = ",".join("?" for _ in chunk)
+            cur.execute(
+                f"UPDATE incidents SET active = 0 WHERE active = 1 AND incident_no IN ({placeholders})",
+                chunk,
+            )
+            changed += cur.rowcount
+    return changed
 
 
 def _ping_healthcheck(success=True):
+    import requests
     url = HEALTHCHECK_URL + ("" if success else "/fail")
     try:
         requests.get(url, timeout=10)
-        safe_print(f"Healthcheck ping: {'success' if success else 'failure'}")
+        log.debug("Healthcheck ping: %s", "success" if success else "failure")
     except Exception as e:
-        safe_print(f"Failed to ping healthcheck: {e}")
+        log.warning("Failed to ping healthcheck: %s", e)
+
+
+# ---------------------------------------------------------------------------
+# Standalone worker process
+# ---------------------------------------------------------------------------
+
+def run_monitor_singleton(stop_event=None, interval=15, parse_workers=0):
+    """Run the monitor loop here unless another process already holds the monitor lock.
+
+    ``parse_workers`` > 0 moves HTML parsing onto a process pool of that size.
+    Returns False immediately if the lock is taken, True once monitoring stops.
+    """
+    from scrapers import parse_pool
+
+    lock = SingletonLock(MONITOR_LOCK_FILE)
+    if not lock.acquire():
+        log.warning("Monitor already running (PID %s); not starting another.", lock.holder_pid())
+        return False
+    try:
+        if parse_workers > 0:
+            parse_pool.start(parse_workers)
+            log.info("Parsing on %d worker process(es).", parse_workers)
+        monitor_traffic_data(interval=interval, stop_event=stop_event)
+    finally:
+        parse_pool.shutdown()
+        lock.release()
+    return True
+
+
+def run_monitor_process(interval=15, parse_workers=MONITOR_PARSE_WORKERS):
+    """Process entry point: finish the current cycle and exit on SIGTERM/SIGINT."""
+    metrics.process_role = "monitor"
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    return run_monitor_singleton(stop_event, interval=interval, parse_workers=parse_workers)
+
+
+class MonitorSupervisor:
+    """Keep one ``python monitor.py`` child running; started from the gunicorn master.
+
+    A subprocess rather than a fork of the master: gunicorn reaps any child
+    in its SIGCHLD handler, and Popen.poll() still reports a child reaped
+    that way as exited, so a dead monitor is noticed and restarted (after
+    ``restart_delay`` seconds, doubling while it keeps dying young).
+    """
+
+    def __init__(self, command=None, poll_interval=5.0, restart_delay=5.0, max_delay=300.0):
+        self.command       = command or [sys.executable, os.path.abspath(__file__), "--no-init-db"]
+        self.poll_interval = poll_interval
+        self.restart_delay = restart_delay
+        self.max_delay     = max_delay
+        self.restarts      = 0
+        self._proc         = None
+        self._started_at   = 0.0
+        self._stop         = threading.Event()
+        self._thread       = None
+
+    def start(self):
+        self._spawn()
+        self._thread = threading.Thread(target=self._watch, name="monitor-supervisor", daemon=True)
+        self._thread.start()
+
+    def _spawn(self):
+        self._proc       = subprocess.Popen(self.command)
+        self._started_at = time.monotonic()
+        log.info("Monitor process started (PID %d).", self._proc.pid)
+
+    def _watch(self):
+        delay = self.restart_delay
+        while not self._stop.wait(self.poll_interval):
+            code = self._proc.poll()
+            if code is None:
+                continue
+            if time.monotonic() - self._started_at > self.max_delay:
+                delay = self.restart_delay  # It ran for a while: not a crash loop
+            log.error("Monitor process %d exited with status %s; restarting in %.0f s.",
+                      self._proc.pid, code, delay)
+            if self._stop.wait(delay):
+                return
+            self.restarts += 1
+            self._spawn()
+            delay = min(delay * 2, self.max_delay)
+
+    def stop(self, timeout=60):
+        """Stop watching, then let the monitor finish its cycle (SIGTERM) or kill it."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._proc is None or self._proc.poll() is not None:
+            return
+        self._proc.terminate()
+        try:
+            self._proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            log.warning("Monitor did not stop in time; killing it.")
+            self._proc.kill()
+            self._proc.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Traffic Alert System monitor worker")
+    parser.add_argument("--interval", type=int, default=15,
+                        help="seconds between scrape cycles (default: 15)")
+    parser.add_argument("--parse-workers", type=int, default=MONITOR_PARSE_WORKERS,
+                        help="processes for HTML parsing; 0 parses inline (default: %(default)s)")
+    parser.add_argument("--no-init-db", action="store_true",
+                        help="skip the schema migration (already run by the gunicorn master)")
+    args = parser.parse_args(argv)
+
+    if not args.no_init_db:
+        init_db()
+    if not run_monitor_process(interval=args.interval, parse_workers=args.parse_workers):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,61 @@
+# notify.py
+"""
+Lightweight change-notification channel between the monitor and the API.
+
+The monitor process bumps a version counter in a small file after every
+cycle that changed incident data; API workers read it to decide whether
+anything cached in memory is stale. Reads are throttled so a busy worker
+opens the file at most a few times per second, and writes go through a
+temp file + os.replace so readers never see a partial value.
+"""
+
+import json
+import os
+import threading
+import time
+
+_READ_INTERVAL = 0.25  # seconds a worker may reuse the last value read
+
+
+class ChangeChannel:
+    """Monotonic data version shared across processes through a file."""
+
+    def __init__(self, path):
+        self.path       = path
+        self._lock      = threading.Lock()
+        self._cached    = (0, None)
+        self._read_at   = 0.0
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            return int(state.get("version", 0)), state.get("updated_at")
+        except (OSError, ValueError):
+            return 0, None
+
+    def publish(self):
+        """Increment the version (monitor side). Returns the new version."""
+        with self._lock:
+            version = self._read()[0] + 1
+            state   = {"version": version, "updated_at": time.time()}
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.path)
+            self._cached  = (version, state["updated_at"])
+            self._read_at = time.monotonic()
+            return version
+
+    def state(self):
+        """Return (version, updated_at epoch seconds or None)."""
+        now = time.monotonic()
+        if now - self._read_at >= _READ_INTERVAL:
+            with self._lock:
+                if now - self._read_at >= _READ_INTERVAL:
+                    self._cached  = self._read()
+                    self._read_at = now
+        return self._cached
+
+    def version(self):
+        return self.state()[0]
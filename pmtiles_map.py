@@ -0,0 +1,501 @@
+# pmtiles_map.py
+"""
+Offline static map rendering from the local PMTiles basemap.
+
+Reads the San Diego extract produced by scripts/download-map-ubuntu.sh via
+memory-mapped I/O, decodes the vector tiles around an incident and rasterizes
+them to PNG with a small pure-Python renderer. `save_map_image` mirrors
+generate_map.save_map_image so MapRenderer can use either backend.
+"""
+
+import gzip
+import math
+import mmap
+import os
+import struct
+import threading
+import zlib
+from bisect import bisect_right
+from collections import OrderedDict
+
+from generate_map import BASE_DIR, TARGET_DIR
+from logger import get_logger
+
+log = get_logger(__name__)
+
+LOCAL_STYLE          = "pmtiles-basemap"
+DEFAULT_PMTILES_PATH = os.path.join(BASE_DIR, "traffic-app", "public", "maps", "sandiego.pmtiles")
+TILE_SIZE            = 512  # Output pixels per tile at the tile's own zoom
+
+# ── PMTiles v3 constants ───────────────────────────────────────────────────
+_HEADER_LEN       = 127
+_COMPRESSION_NONE = 1
+_COMPRESSION_GZIP = 2
+_TILE_TYPE_MVT    = 1
+
+# ── MVT geometry constants ─────────────────────────────────────────────────
+GEOM_POINT      = 1
+GEOM_LINESTRING = 2
+GEOM_POLYGON    = 3
+
+# ── Styling ────────────────────────────────────────────────────────────────
+PALETTES = {
+    "light": {
+        "background": (242, 239, 233),
+        "landuse":    (214, 230, 200),
+        "water":      (170, 211, 223),
+        "buildings":  (217, 208, 201),
+        "casing":     (200, 190, 180),
+        "highway":    (247, 213, 137),
+        "major_road": (255, 255, 255),
+        "minor_road": (255, 255, 255),
+        "path":       (225, 220, 214),
+    },
+    "dark": {
+        "background": (34, 36, 42),
+        "landuse":    (38, 48, 40),
+        "water":      (28, 46, 66),
+        "buildings":  (52, 54, 60),
+        "casing":     (20, 20, 24),
+        "highway":    (150, 112, 60),
+        "major_road": (92, 94, 102),
+        "minor_road": (70, 72, 80),
+        "path":       (58, 60, 66),
+    },
+}
+PIN_COLOR     = (255, 66, 66)
+PIN_OUTLINE   = (255, 255, 255)
+ROAD_WIDTHS   = {"highway": 9.0, "major_road": 7.0, "medium_road": 6.0, "minor_road": 4.0, "path": 1.5}
+LANDUSE_KINDS = {"park", "forest", "wood", "grass", "golf_course", "nature_reserve", "cemetery", "garden"}
+
+
+# ---------------------------------------------------------------------------
+# Protobuf / MVT decoding
+# ---------------------------------------------------------------------------
+
+def _read_varint(buf, pos):
+    result, shift = 0, 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _iter_fields(buf):
+    """Yield (field_number, value) pairs from a protobuf message."""
+    pos, end = 0, len(buf)
+    while pos < end:
+        key, pos = _read_varint(buf, pos)
+        number, wire = key >> 3, key & 0x7
+        if wire == 0:
+            value, pos = _read_varint(buf, pos)
+        elif wire == 2:
+            length, pos = _read_varint(buf, pos)
+            value = buf[pos:pos + length]
+            pos += length
+        elif wire == 1:
+            value = buf[pos:pos + 8]
+            pos += 8
+        elif wire == 5:
+            value = buf[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire}")
+        yield number, value
+
+
+def _unpack_varints(buf):
+    values, pos = [], 0
+    while pos < len(buf):
+        value, pos = _read_varint(buf, pos)
+        values.append(value)
+    return values
+
+
+def _unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def _decode_value(buf):
+    for number, value in _iter_fields(buf):
+        if number == 1:
+            return bytes(value).decode("utf-8", "replace")
+        if number == 2:
+            return struct.unpack("<f", value)[0]
+        if number == 3:
+            return struct.unpack("<d", value)[0]
+        if number in (4, 5):
+            return value
+        if number == 6:
+            return _unzigzag(value)
+        if number == 7:
+            return bool(value)
+    return None
+
+
+def _decode_geometry(commands):
+    """Decode MVT geometry commands into a list of parts (lists of (x, y))."""
+    parts, part = [], None
+    x = y = i = 0
+    while i < len(commands):
+        cmd_id, count = commands[i] & 0x7, commands[i] >> 3
+        i += 1
+        if cmd_id == 7:  # ClosePath
+            if part:
+                part.append(part[0])
+            continue
+        for _ in range(count):
+            x += _unzigzag(commands[i])
+            y += _unzigzag(commands[i + 1])
+            i += 2
+            if cmd_id == 1:  # MoveTo
+                part = [(x, y)]
+                parts.append(part)
+            else:            # LineTo
+                part.append((x, y))
+    return parts
+
+
+def decode_tile(data):
+    """Decode an MVT tile into {layer_name: (extent, [(geom_type, parts, props)])}."""
+    layers = {}
+    for number, layer_buf in _iter_fields(data):
+        if number != 3:
+            continue
+        name, extent, keys, values, raw_features = "", 4096, [], [], []
+        for n, value in _iter_fields(layer_buf):
+            if n == 1:
+                name = bytes(value).decode("utf-8")
+            elif n == 2:
+                raw_features.append(value)
+            elif n == 3:
+                keys.append(bytes(value).decode("utf-8"))
+            elif n == 4:
+                values.append(_decode_value(value))
+            elif n == 5:
+                extent = value
+
+        features = []
+        for feature_buf in raw_features:
+            geom_type, tags, geometry = 0, [], []
+            for n, value in _iter_fields(feature_buf):
+                if n == 2:
+                    tags = _unpack_varints(value)
+                elif n == 3:
+                    geom_type = value
+                elif n == 4:
+                    geometry = _unpack_varints(value)
+            props = {keys[tags[j]]: values[tags[j + 1]] for j in range(0, len(tags) - 1, 2)}
+            features.append((geom_type, _decode_geometry(geometry), props))
+        layers[name] = (extent, features)
+    return layers
+
+
+# ---------------------------------------------------------------------------
+# PMTiles archive
+# ---------------------------------------------------------------------------
+
+def zxy_to_tileid(z, x, y):
+    """Convert z/x/y to a PMTiles Hilbert-curve tile ID."""
+    acc = ((1 << (2 * z)) - 1) // 3  # Tiles in all lower zooms
+    n   = 1 << z
+    d, s = 0, n // 2
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x, y = n - 1 - x, n - 1 - y
+            x, y = y, x
+        s //= 2
+    return acc + d
+
+
+def _decompress(data, compression):
+    if compression in (0, _COMPRESSION_NONE):
+        return bytes(data)
+    if compression == _COMPRESSION_GZIP:
+        return gzip.decompress(data)
+    raise ValueError(f"Unsupported PMTiles compression {compression}")
+
+
+def _parse_header(buf):
+    if bytes(buf[:7]) != b"PMTiles" or buf[7] != 3:
+        raise ValueError("Not a PMTiles v3 archive")
+    (root_offset, root_length, _meta_offset, _meta_length, leaf_offset, _leaf_length,
+     data_offset, _data_length, _addressed, _entries, _contents) = struct.unpack_from("<11Q", buf, 8)
+    _clustered, internal_comp, tile_comp, tile_type, min_zoom, max_zoom = struct.unpack_from("<6B", buf, 96)
+    return {
+        "root_offset":          root_offset,
+        "root_length":          root_length,
+        "leaf_offset":          leaf_offset,
+        "data_offset":          data_offset,
+        "internal_compression": internal_comp,
+        "tile_compression":     tile_comp,
+        "tile_type":            tile_type,
+        "min_zoom":             min_zoom,
+        "max_zoom":             max_zoom,
+    }
+
+
+def _parse_directory(buf):
+    """Return parallel lists (tile_ids, run_lengths, lengths, offsets)."""
+    count, pos = _read_varint(buf, 0)
+    tile_ids, last = [], 0
+    for _ in range(count):
+        delta, pos = _read_varint(buf, pos)
+        last += delta
+        tile_ids.append(last)
+    run_lengths, lengths, offsets = [], [], []
+    for _ in range(count):
+        value, pos = _read_varint(buf, pos)
+        run_lengths.append(value)
+    for _ in range(count):
+        value, pos = _read_varint(buf, pos)
+        lengths.append(value)
+    for i in range(count):
+        value, pos = _read_varint(buf, pos)
+        offsets.append(offsets[i - 1] + lengths[i - 1] if value == 0 and i > 0 else value - 1)
+    return tile_ids, run_lengths, lengths, offsets
+
+
+class PMTilesArchive:
+    """Read-only, memory-mapped PMTiles v3 archive with a small directory cache."""
+
+    def __init__(self, path, max_directories=64):
+        self.path   = path
+        self._file  = open(path, "rb")
+        self._mm    = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header = _parse_header(self._mm[:_HEADER_LEN])
+        if self.header["tile_type"] != _TILE_TYPE_MVT:
+            raise ValueError("Only vector (MVT) PMTiles archives can be rendered")
+        self._directories     = OrderedDict()
+        self._max_directories = max_directories
+        self._lock            = threading.Lock()
+
+    def _directory(self, offset, length):
+        key = (offset, length)
+        with self._lock:
+            directory = self._directories.get(key)
+            if directory is not None:
+                self._directories.move_to_end(key)
+                return directory
+        raw       = _decompress(self._mm[offset:offset + length], self.header["internal_compression"])
+        directory = _parse_directory(raw)
+        with self._lock:
+            self._directories[key] = directory
+            while len(self._directories) > self._max_directories:
+                self._directories.popitem(last=False)
+        return directory
+
+    def get_tile(self, z, x, y):
+        """Return decompressed tile bytes, or None if the tile is not in the archive."""
+        tile_id = zxy_to_tileid(z, x, y)
+        offset, length = self.header["root_offset"], self.header["root_length"]
+        for _ in range(4):  # Spec limits directory depth
+            tile_ids, run_lengths, lengths, offsets = self._directory(offset, length)
+            i = bisect_right(tile_ids, tile_id) - 1
+            if i < 0:
+                return None
+            if run_lengths[i] == 0:  # Leaf directory pointer
+                offset, length = self.header["leaf_offset"] + offsets[i], lengths[i]
+                continue
+            if tile_id - tile_ids[i] >= run_lengths[i]:
+                return None
+            start = self.header["data_offset"] + offsets[i]
+            return _decompress(self._mm[start:start + lengths[i]], self.header["tile_compression"])
+        return None
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+
+_archives      = {}
+_archives_lock = threading.Lock()
+
+
+def open_archive(path):
+    """Return a shared PMTilesArchive for ``path`` (opened once per process)."""
+    with _archives_lock:
+        archive = _archives.get(path)
+        if archive is None:
+            archive = _archives[path] = PMTilesArchive(path)
+        return archive
+
+
+# ---------------------------------------------------------------------------
+# Rasterizer
+# ---------------------------------------------------------------------------
+
+class Canvas:
+    """Minimal RGB raster with scanline polygon fill and PNG output."""
+
+    def __init__(self, width, height, background):
+        self.width  = width
+        self.height = height
+        self.pixels = bytearray(bytes(background) * (width * height))
+
+    def fill_polygon(self, rings, color):
+        """Fill one or more closed rings using the even-odd rule."""
+        edges = []
+        for ring in rings:
+            for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]):
+                if y0 == y1:
+                    continue
+                if y0 > y1:
+                    x0, y0, x1, y1 = x1, y1, x0, y0
+                edges.append((y0, y1, x0, (x1 - x0) / (y1 - y0)))
+        if not edges:
+            return
+
+        row_start = max(0, int(math.ceil(min(e[0] for e in edges) - 0.5)))
+        row_end   = min(self.height - 1, int(math.floor(max(e[1] for e in edges) - 0.5)))
+        pixel     = bytes(color)
+        for row in range(row_start, row_end + 1):
+            yc = row + 0.5
+            xs = sorted(x0 + (yc - y0) * slope for y0, y1, x0, slope in edges if y0 <= yc < y1)
+            base = row * self.width
+            for j in range(0, len(xs) - 1, 2):
+                a = max(0, int(math.ceil(xs[j] - 0.5)))
+                b = min(self.width, int(math.ceil(xs[j + 1] - 0.5)))
+                if b > a:
+                    self.pixels[(base + a) * 3:(base + b) * 3] = pixel * (b - a)
+
+    def fill_circle(self, cx, cy, radius, color, segments=16):
+        self.fill_polygon([[
+            (cx + radius * math.cos(2 * math.pi * k / segments),
+             cy + radius * math.sin(2 * math.pi * k / segments))
+            for k in range(segments)
+        ]], color)
+
+    def stroke(self, points, width, color):
+        """Draw a polyline of the given width (segment quads plus round joins)."""
+        half = width / 2.0
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            dx, dy = x1 - x0, y1 - y0
+            length = math.hypot(dx, dy)
+            if length == 0:
+                continue
+            nx, ny = -dy / length * half, dx / length * half
+            self.fill_polygon([[(x0 + nx, y0 + ny), (x1 + nx, y1 + ny),
+                                (x1 - nx, y1 - ny), (x0 - nx, y0 - ny)]], color)
+        if width >= 3:
+            for x, y in points[1:-1]:
+                self.fill_circle(x, y, half, color, segments=8)
+
+    def to_png(self):
+        row_bytes = self.width * 3
+        raw = b"".join(
+            b"\x00" + bytes(self.pixels[r * row_bytes:(r + 1) * row_bytes])
+            for r in range(self.height)
+        )
+
+        def chunk(tag, data):
+            return (struct.pack(">I", len(data)) + tag + data
+                    + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+        return (
+            b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 6))
+            + chunk(b"IEND", b"")
+        )
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def _world_pixels(lon, lat, zoom, tile_px):
+    n     = 2 ** zoom
+    lat_r = math.radians(max(min(lat, 85.0511), -85.0511))
+    x = (lon + 180.0) / 360.0 * n * tile_px
+    y = (1.0 - math.log(math.tan(lat_r) + 1.0 / math.cos(lat_r)) / math.pi) / 2.0 * n * tile_px
+    return x, y
+
+
+def render_map(archive, lon, lat, zoom=16, size=(500, 500), dark_mode=False):
+    """Rasterize the basemap around (lon, lat) with an incident pin; return PNG bytes."""
+    width, height = size
+    palette   = PALETTES["dark" if dark_mode else "light"]
+    data_zoom = max(archive.header["min_zoom"], min(int(zoom), archive.header["max_zoom"]))
+    tile_px   = TILE_SIZE * 2 ** (zoom - data_zoom)  # Overzoom beyond the archive's max zoom
+
+    center_x, center_y = _world_pixels(lon, lat, data_zoom, tile_px)
+    left, top = center_x - width / 2.0, center_y - height / 2.0
+    last_tile = 2 ** data_zoom - 1
+
+    polygons = {"landuse": [], "water": [], "buildings": []}
+    roads    = []
+    for ty in range(max(0, int(top // tile_px)), min(last_tile, int((top + height) // tile_px)) + 1):
+        for tx in range(max(0, int(left // tile_px)), min(last_tile, int((left + width) // tile_px)) + 1):
+            data = archive.get_tile(data_zoom, tx, ty)
+            if not data:
+                continue
+            origin_x, origin_y = tx * tile_px - left, ty * tile_px - top
+            for layer_name, (extent, features) in decode_tile(data).items():
+                scale = tile_px / extent
+
+                def to_canvas(part):
+                    return [(origin_x + px * scale, origin_y + py * scale) for px, py in part]
+
+                for geom_type, parts, props in features:
+                    if layer_name == "roads" and geom_type == GEOM_LINESTRING:
+                        roads.append((props.get("kind", "minor_road"), [to_canvas(p) for p in parts]))
+                    elif geom_type != GEOM_POLYGON:
+                        continue
+                    elif layer_name == "water":
+                        polygons["water"].append([to_canvas(p) for p in parts])
+                    elif layer_name == "buildings":
+                        polygons["buildings"].append([to_canvas(p) for p in parts])
+                    elif layer_name in ("landuse", "landcover") and props.get("kind") in LANDUSE_KINDS:
+                        polygons["landuse"].append([to_canvas(p) for p in parts])
+
+    canvas = Canvas(width, height, palette["background"])
+    for layer in ("landuse", "water", "buildings"):
+        for rings in polygons[layer]:
+            canvas.fill_polygon(rings, palette[layer])
+
+    road_scale = max(1.0, tile_px / TILE_SIZE)
+    roads.sort(key=lambda r: ROAD_WIDTHS.get(r[0], 3.0))  # Draw major roads on top
+    for kind, parts in roads:
+        road_width = ROAD_WIDTHS.get(kind, 3.0) * road_scale ** 0.5
+        for part in parts:
+            canvas.stroke(part, road_width + 2, palette["casing"])
+    for kind, parts in roads:
+        road_width = ROAD_WIDTHS.get(kind, 3.0) * road_scale ** 0.5
+        color      = palette.get(kind, palette["minor_road"])
+        for part in parts:
+            canvas.stroke(part, road_width, color)
+
+    canvas.fill_circle(width / 2.0, height / 2.0, 10, PIN_OUTLINE)
+    canvas.fill_circle(width / 2.0, height / 2.0, 7, PIN_COLOR)
+    return canvas.to_png()
+
+
+def save_map_image(lon, lat, access_token=None, filename='map.png', zoom=16, session=None,
+                   timeout=None, pmtiles_path=None):
+    """
+    Render and save a static map image from the local PMTiles basemap.
+    Same interface as generate_map.save_map_image; the token, session and
+    timeout are accepted for compatibility and ignored. Always uses the light
+    palette: images are cached by location and style (LOCAL_STYLE) and served
+    as immutable, so the render time must not change the pixels.
+    Returns the full path of the written file.
+    """
+    archive = open_archive(pmtiles_path or DEFAULT_PMTILES_PATH)
+    png     = render_map(archive, lon, lat, zoom=zoom)
+
+    if not os.path.isabs(filename):
+        filename = os.path.join(TARGET_DIR, os.path.basename(filename))
+        os.makedirs(TARGET_DIR, exist_ok=True)
+
+    with open(filename, 'wb') as file:
+        file.write(png)
+    log.info("Map image saved as %s", filename)
+    return filename
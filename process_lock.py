@@ -0,0 +1,74 @@
+# process_lock.py
+"""
+Cross-process singleton lock backed by an OS file lock.
+
+Used to guarantee exactly one monitor process per database, no matter how
+many API workers or entry points are started. The lock is released by the
+OS if the holder dies, so a crashed monitor never leaves a stale lock.
+"""
+
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class SingletonLock:
+    """Non-blocking exclusive lock on ``path``; writes the holder's PID for diagnostics."""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd  = None
+
+    def acquire(self):
+        """Try to take the lock. Returns True on success, False if another process holds it."""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def holder_pid(self):
+        """Return the PID recorded by the current holder, if readable."""
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def __enter__(self):
+        if not self.acquire():
+            raise RuntimeError(f"Lock {self.path} is held by PID {self.holder_pid()}")
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,275 @@
+# profiling.py
+"""
+Opt-in per-request profiling for the Flask API.
+
+A request is profiled when it sends ``X-Profile: <PROFILE_TOKEN>`` or is
+picked by PROFILE_SAMPLE_RATE. While a profile is active, every connection
+opened through ``connect()`` is traced: each statement's SQL, execute+fetch
+time and row count, plus the number of statements SQLite actually ran
+(trigger bodies included). The app's JSON provider adds serialisation time.
+
+Profiled responses carry a ``Server-Timing`` header, recent profiles are
+kept for /api/debug/profiles, and statements slower than
+PROFILE_SLOW_QUERY_MS are logged with their EXPLAIN QUERY PLAN.
+Unprofiled requests pay one context-variable lookup per connection.
+"""
+
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from config import PROFILE_SAMPLE_RATE, PROFILE_SLOW_QUERY_MS, PROFILE_TOKEN
+from logger import get_logger
+
+PROFILE_HEADER = "X-Profile"
+RECENT_PROFILES = 50  # profiles kept for the debug endpoint
+
+log = get_logger(__name__)
+
+_current     = ContextVar("traffic_profile", default=None)
+_recent      = deque(maxlen=RECENT_PROFILES)
+_recent_lock = threading.Lock()
+
+
+class Profile:
+    """Timings collected for one request."""
+
+    def __init__(self, method, path, reason):
+        self.method        = method
+        self.path          = path
+        self.reason        = reason          # "header" or "sampled"
+        self.started       = time.perf_counter()
+        self.queries       = []              # [sql, params, seconds, rows, db_file]
+        self.statements    = 0               # statements SQLite ran, triggers included
+        self.json_seconds  = 0.0
+        self.total_seconds = None
+
+    @property
+    def db_seconds(self):
+        return sum(q[2] for q in self.queries)
+
+    def finish(self):
+        self.total_seconds = time.perf_counter() - self.started
+        return self
+
+    def slow_queries(self, threshold_ms=PROFILE_SLOW_QUERY_MS):
+        return [q for q in self.queries if q[2] * 1000 >= threshold_ms]
+
+    def server_timing(self):
+        """Value for the Server-Timing response header (milliseconds)."""
+        parts = [
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{len(self.queries)} queries"',
+            f"json;dur={self.json_seconds * 1000:.2f}",
+        ]
+        if self.total_seconds is not None:
+            parts.append(f"total;dur={self.total_seconds * 1000:.2f}")
+        return ", ".join(parts)
+
+    def summary(self):
+        """JSON-friendly view; bound parameters are left out (they may hold device ids)."""
+        return {
+            "method":     self.method,
+            "path":       self.path,
+            "reason":     self.reason,
+            "total_ms":   round((self.total_seconds or 0) * 1000, 3),
+            "db_ms":      round(self.db_seconds * 1000, 3),
+            "json_ms":    round(self.json_seconds * 1000, 3),
+            "queries":    len(self.queries),
+            "statements": self.statements,
+            "query_log":  [
+                {"sql": " ".join(sql.split()), "ms": round(seconds * 1000, 3), "rows": rows}
+                for sql, _params, seconds, rows, _db in self.queries
+            ],
+        }
+
+
+def current():
+    """The active request's Profile, or None."""
+    return _current.get()
+
+
+# ---------------------------------------------------------------------------
+# Traced connections
+# ---------------------------------------------------------------------------
+
+class _TracedCursor(sqlite3.Cursor):
+    """Cursor that charges execute and fetch time to the statement that produced the rows."""
+
+    _entry = None
+
+    def _charge(self, started, rows):
+        if self._entry is not None:
+            self._entry[2] += time.perf_counter() - started
+            self._entry[3] += rows
+
+    def execute(self, sql, parameters=()):
+        profile = _current.get()
+        self._entry = None
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            if profile is not None:
+                self._entry = [sql, parameters, time.perf_counter() - started, 0,
+                               self.connection.db_file]
+                profile.queries.append(self._entry)
+
+    def executemany(self, sql, seq_of_parameters):
+        profile = _current.get()
+        self._entry = None
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            if profile is not None:
+                self._entry = [sql, (), time.perf_counter() - started, 0, None]
+                profile.queries.append(self._entry)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._charge(started, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._charge(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._charge(started, len(rows))
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._charge(started, 0)
+            raise
+        self._charge(started, 1)
+        return row
+
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose cursors record into the active Profile."""
+
+    def __init__(self, database, *args, **kwargs):
+        super().__init__(database, *args, **kwargs)
+        self.db_file = database
+        profile = _current.get()
+        if profile is not None:
+            self.set_trace_callback(lambda _sql: setattr(profile, "statements", profile.statements + 1))
+
+    def cursor(self, factory=_TracedCursor):
+        return super().cursor(factory)
+
+    # The C shortcuts bypass Python-level cursor methods, so route them explicitly
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(database, **kwargs):
+    """``sqlite3.connect`` that traces the connection while a request is being profiled."""
+    if _current.get() is not None:
+        kwargs.setdefault("factory", TracedConnection)
+    return sqlite3.connect(database, **kwargs)
+
+
+def _explain(sql, params, db_file):
+    try:
+        with sqlite3.connect(db_file, timeout=5) as conn:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+    return [detail for _id, _parent, _unused, detail in rows]
+
+
+def log_slow_queries(profile, threshold_ms=PROFILE_SLOW_QUERY_MS):
+    """Log each statement over ``threshold_ms`` with its query plan."""
+    for sql, params, seconds, rows, db_file in profile.slow_queries(threshold_ms):
+        is_read = sql.lstrip().upper().startswith(("SELECT", "WITH"))
+        plan    = _explain(sql, params, db_file) if db_file and is_read else []
+        log.warning(
+            "Slow query on %s %s: %.1f ms, %d rows: %s | plan: %s",
+            profile.method, profile.path, seconds * 1000, rows, " ".join(sql.split()), "; ".join(plan),
+            extra={"duration_ms": round(seconds * 1000, 3), "plan": plan},
+        )
+
+
+# ---------------------------------------------------------------------------
+# Flask integration
+# ---------------------------------------------------------------------------
+
+def _should_profile(headers):
+    requested = headers.get(PROFILE_HEADER)
+    if requested is not None and PROFILE_TOKEN and requested == PROFILE_TOKEN:
+        return "header"
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+def authorized(headers):
+    """True when the request carries the configured profile token."""
+    return bool(PROFILE_TOKEN) and headers.get(PROFILE_HEADER) == PROFILE_TOKEN
+
+
+def recent_profiles():
+    with _recent_lock:
+        return [p.summary() for p in reversed(_recent)]
+
+
+def init_app(app):
+    """Install the profiling hooks and a timed JSON provider on ``app``."""
+    from flask import g, request
+    from flask.json.provider import DefaultJSONProvider
+
+    class TimedJSONProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return super().dumps(obj, **kwargs)
+            started = time.perf_counter()
+            try:
+                return super().dumps(obj, **kwargs)
+            finally:
+                profile.json_seconds += time.perf_counter() - started
+
+    app.json_provider_class = TimedJSONProvider
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def _start_profile():
+        reason = _should_profile(request.headers)
+        if reason:
+            g.profile_token = _current.set(Profile(request.method, request.path, reason))
+
+    @app.after_request
+    def _finish_profile(response):
+        profile = _current.get()
+        if profile is None:
+            return response
+        profile.finish()
+        response.headers["Server-Timing"] = profile.server_timing()
+        with _recent_lock:
+            _recent.append(profile)
+        log_slow_queries(profile)
+        return response
+
+    @app.teardown_request
+    def _clear_profile(_exc=None):
+        token = g.pop("profile_token", None)
+        if token is not None:
+            _current.reset(token)
+
+    return app
@@ -6,17 +6,29 @@ Import this module to register all routes on the shared `app` instance.
 
 import sqlite3
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime
 
-import requests
-from dateutil.relativedelta import relativedelta
-from flask import jsonify, request, send_from_directory
+from flask import Response, abort, jsonify, request
+from werkzeug.exceptions import InternalServerError
 
+import metrics
+import profiling
 from config import (
-    app, DB_FILE, TARGET_DIR, COOKIE_NAME, COOKIE_MAX_AGE, db_lock
+    app, METRICS_DIR, TARGET_DIR, COOKIE_NAME, COOKIE_MAX_AGE, STATS_SNAPSHOTS, change_channel,
+    get_like_buffer, get_stats_snapshots, get_suggest_index,
 )
-from db import read_incidents
-from logger import safe_print
+from db import (
+    MAX_USER_COMMENTS, add_comment, connect, is_busy_error, lookups, read_comments, read_incidents,
+    search_incidents, set_like,
+)
+from logger import get_logger
+from static_files import StaticIndex, send_static
+from stats import compute_stats
+from tiles import MVT_MIMETYPE, is_valid_tile, render_incident_tile
+
+log = get_logger(__name__)
+
+profiling.init_app(app)
 
 
 # ---------------------------------------------------------------------------
@@ -27,9 +39,9 @@ def _get_or_create_uuid(req):
     device_uuid = req.cookies.get(COOKIE_NAME)
     if not device_uuid:
         device_uuid = str(uuid.uuid4())
-        safe_print(f"New UUID: {device_uuid}")
+        log.debug("New UUID: %s", device_uuid)
     else:
-        safe_print(f"Reusing UUID: {device_uuid}")
+        log.debug("Reusing UUID: %s", device_uuid)
     return device_uuid
 
 
@@ -67,173 +79,72 @@ def get_incidents():
         locations=locations, sources=sources, active_only=active_only,
         date_filter=date_filter, device_uuid=device_uuid,
     )
+    like_buffer = get_like_buffer()
+    if like_buffer is not None:
+        like_buffer.overlay(incidents, device_uuid)
 
     response = jsonify(incidents)
     return _set_uuid_cookie(response, device_uuid)
 
 
+@app.route("/api/changes")
+def get_changes():
+    """Cheap poll target: the monitor's data version and when it last changed."""
+    version, updated_at = change_channel.state()
+    response = jsonify({"version": version, "updated_at": updated_at})
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@app.route("/api/search")
+def search():
+    """Full-text search: ?q=terms&limit=N&cursor=<next_cursor>&source=X&active_only=true."""
+    query       = request.args.get("q", "").strip()
+    limit       = max(1, min(int(request.args.get("limit", 20)), 100))
+    cursor      = request.args.get("cursor")
+    sources     = request.args.getlist("source")
+    active_only = request.args.get("active_only", "false").lower() == "true"
+
+    if not query:
+        return jsonify({"error": "Missing search query"}), 400
+    try:
+        results, next_cursor = search_incidents(
+            query, limit=limit, cursor=cursor, sources=sources, active_only=active_only,
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    return jsonify({"results": results, "next_cursor": next_cursor})
+
+
+@app.route("/api/suggest")
+def suggest():
+    """Typeahead for filters: ?field=location|neighborhood|type&prefix=fri&limit=N."""
+    field  = request.args.get("field", "location")
+    prefix = request.args.get("prefix", "")
+    limit  = max(1, min(int(request.args.get("limit", 10)), 50))
+
+    try:
+        matches = get_suggest_index().suggest(field, prefix, limit)
+    except KeyError:
+        return jsonify({"error": f"Unknown field: {field}"}), 400
+    response = jsonify({"suggestions": [{"value": v, "count": c} for v, c in matches]})
+    response.headers["Cache-Control"] = "public, max-age=30"
+    return response
+
+
 @app.route("/api/incident_stats")
 def get_incident_stats():
     date_filter = request.args.get("date_filter")
-    sources     = request.args.getlist("source")
+    names       = request.args.getlist("source")
 
-    with sqlite3.connect(DB_FILE, timeout=30) as conn:
-        cur = conn.cursor()
-
-        where_clauses, query_params = [], []
-
-        if sources:
-            ph = ",".join("?" for _ in sources)
-            where_clauses.append(f"source IN ({ph})")
-            query_params.extend(sources)
-
-        if date_filter == "day":
-            where_clauses.append("date = ?")
-            query_params.append(datetime.now().strftime("%Y-%m-%d"))
-        elif date_filter == "week":
-            where_clauses.append("timestamp >= ?")
-            query_params.append((datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d %H:%M:%S"))
-        elif date_filter == "month":
-            where_clauses.append("timestamp >= ?")
-            query_params.append((datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d %H:%M:%S"))
-        elif date_filter == "year":
-            where_clauses.append("timestamp >= ?")
-            query_params.append(
-                (datetime.now() - relativedelta(months=12)).strftime("%Y-%m-%d %H:%M:%S")
-            )
-
-        def make_query(select_part, extra=None):
-            clauses = where_clauses[:]
-            params  = query_params[:]
-            if extra:
-                clauses.append(extra)
-            where = " WHERE " + " AND ".join(clauses) if clauses else ""
-            return f"{select_part}{where}", params
-
-        # ── Stat counters ──────────────────────────────────────────────────
-        today = datetime.now().strftime("%Y-%m-%d")
-        events_today      = _count_with_source(cur, sources, "date = ?",          [today])
-        events_last_hour  = _count_with_source(
-            cur, sources, "timestamp >= ?",
-            [(datetime.now() - timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S")],
-        )
-        q, p = make_query("SELECT COUNT(*) FROM incidents", "active = 1")
-        cur.execute(q, p); events_active = cur.fetchone()[0]
-
-        q, p = make_query("SELECT COUNT(*) FROM incidents")
-        cur.execute(q, p); total_incidents = cur.fetchone()[0]
-
-        q, p = make_query("SELECT type, COUNT(*) as count FROM incidents")
-        cur.execute(q + " GROUP BY type ORDER BY count DESC", p)
-        incidents_by_type = {row[0]: row[1] for row in cur.fetchall()}
-
-        q, p = make_query("SELECT location, COUNT(*) as count FROM incidents",
-                          "location IS NOT NULL AND location != ''")
-        cur.execute(q + " GROUP BY location ORDER BY count DESC LIMIT 10", p)
-        top_locations = {row[0]: row[1] for row in cur.fetchall()}
-
-        # ── Chart data ─────────────────────────────────────────────────────
-        chart_data = _build_chart_data(cur, sources, date_filter)
-
-        # ── Historical hourly average ──────────────────────────────────────
-        historical_avg = _historical_hour_average(cur, sources)
-
-    return jsonify({
-        "eventsToday":                 events_today,
-        "eventsLastHour":              events_last_hour,
-        "eventsActive":                events_active,
-        "totalIncidents":              total_incidents,
-        "incidentsByType":             incidents_by_type,
-        "topLocations":                top_locations,
-        "hourlyData":                  chart_data,
-        "historicalCurrentHourAverage": historical_avg,
-    })
-
-
-def _count_with_source(cur, sources, extra_cond, extra_params):
-    clauses = ([f"source IN ({','.join('?' for _ in sources)})"] if sources else []) + [extra_cond]
-    params  = (list(sources) if sources else []) + extra_params
-    cur.execute(f"SELECT COUNT(*) FROM incidents WHERE {' AND '.join(clauses)}", params)
-    return cur.fetchone()[0]
-
-
-def _range_count(cur, sources, start_str, end_str):
-    clauses = [f"source IN ({','.join('?' for _ in sources)})"] if sources else []
-    params  = list(sources) if sources else []
-    clauses += ["timestamp >= ?", "timestamp < ?"]
-    params  += [start_str, end_str]
-    cur.execute(
-        f"SELECT COUNT(*) FROM incidents WHERE {' AND '.join(clauses)}", params
-    )
-    return cur.fetchone()[0]
-
-
-def _build_chart_data(cur, sources, date_filter):
-    now = datetime.now()
-    if date_filter == "year":
-        return [
-            _range_count(
-                cur, sources,
-                (now.replace(day=1, hour=0, minute=0, second=0, microsecond=0) - relativedelta(months=11 - i)).strftime("%Y-%m-%d %H:%M:%S"),
-                (now.replace(day=1, hour=0, minute=0, second=0, microsecond=0) - relativedelta(months=10 - i)).strftime("%Y-%m-%d %H:%M:%S"),
-            )
-            for i in range(12)
-        ]
-    elif date_filter == "month":
-        base = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        return [
-            _range_count(
-                cur, sources,
-                (base - timedelta(days=29 - i)).strftime("%Y-%m-%d %H:%M:%S"),
-                (base - timedelta(days=28 - i)).strftime("%Y-%m-%d %H:%M:%S"),
-            )
-            for i in range(30)
-        ]
-    elif date_filter == "week":
-        base = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        return [
-            _range_count(
-                cur, sources,
-                (base - timedelta(days=6 - i)).strftime("%Y-%m-%d %H:%M:%S"),
-                (base - timedelta(days=5 - i)).strftime("%Y-%m-%d %H:%M:%S"),
-            )
-            for i in range(7)
-        ]
-    else:  # default: last 24h by hour
-        start24 = now - timedelta(hours=24)
-        return [
-            _range_count(
-                cur, sources,
-                (start24 + timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S"),
-                min(start24 + timedelta(hours=i + 1), now).strftime("%Y-%m-%d %H:%M:%S"),
-            )
-            for i in range(24)
-        ]
-
-
-def _historical_hour_average(cur, sources):
-    now          = datetime.now()
-    hour_str     = now.strftime("%H")
-    dow_str      = now.strftime("%w")
-
-    clauses = [f"source IN ({','.join('?' for _ in sources)})"] if sources else []
-    params  = list(sources) if sources else []
-    clauses += ["strftime('%w', timestamp) = ?", "strftime('%H', timestamp) = ?"]
-    params  += [dow_str, hour_str]
-
-    cur.execute(f"SELECT COUNT(*) FROM incidents WHERE {' AND '.join(clauses)}", params)
-    total = cur.fetchone()[0] or 0
-
-    day_clauses = [f"source IN ({','.join('?' for _ in sources)})"] if sources else []
-    day_params  = (list(sources) if sources else []) + [dow_str]
-    day_clauses.append("strftime('%w', timestamp) = ?")
-
-    cur.execute(
-        f"SELECT COUNT(DISTINCT date(timestamp)) FROM incidents WHERE {' AND '.join(day_clauses)}",
-        day_params,
-    )
-    unique_days = cur.fetchone()[0] or 1
-    return total / unique_days
+    # Served from the monitor's snapshots when a fresh one covers the request
+    stats = get_stats_snapshots().lookup(date_filter, names) if STATS_SNAPSHOTS else None
+    if stats is None:
+        # Filter on lookup ids; an unknown source becomes NULL and matches nothing
+        sources = lookups.ids("source", names)
+        with connect() as conn:
+            stats = compute_stats(conn.cursor(), sources, date_filter)
+    return jsonify(stats)
 
 
 # ---------------------------------------------------------------------------
@@ -242,7 +153,28 @@ def _historical_hour_average(cur, sources):
 
 @app.route("/maps/<filename>")
 def get_map(filename):
-    return send_from_directory(TARGET_DIR, filename)
+    # Map images are never rewritten in place, so they can be cached forever
+    return send_static(TARGET_DIR, filename, immutable=True)
+
+
+# ---------------------------------------------------------------------------
+# Vector tiles
+# ---------------------------------------------------------------------------
+
+@app.route("/tiles/incidents/<int:z>/<int:x>/<int:y>.mvt")
+def get_incident_tile(z, x, y):
+    if not is_valid_tile(z, x, y):
+        abort(404)
+
+    tile = render_incident_tile(
+        z, x, y,
+        sources=request.args.getlist("source"),
+        incident_types=request.args.getlist("type"),
+        active_only=request.args.get("active_only", "false").lower() == "true",
+    )
+    response = app.response_class(tile, mimetype=MVT_MIMETYPE)
+    response.headers["Cache-Control"] = "public, max-age=15"
+    return response
 
 
 # ---------------------------------------------------------------------------
@@ -252,37 +184,21 @@ def get_map(filename):
 @app.route("/api/incidents/<incident_id>/like", methods=["POST", "DELETE"])
 def like_incident(incident_id):
     device_uuid = _get_or_create_uuid(request)
+    liked       = request.method != "DELETE"
 
-    with db_lock:
-        with sqlite3.connect(DB_FILE, timeout=30) as conn:
-            cur = conn.cursor()
-            if request.method == "DELETE":
-                cur.execute("DELETE FROM likes WHERE incident_no = ? AND device_uuid = ?",
-                            (incident_id, device_uuid))
-                cur.execute("UPDATE incidents SET likes = MAX(likes - 1, 0) WHERE incident_no = ?",
-                            (incident_id,))
-            else:
-                cur.execute("SELECT 1 FROM likes WHERE incident_no = ? AND device_uuid = ?",
-                            (incident_id, device_uuid))
-                if cur.fetchone():
-                    return jsonify({"error": "You already liked this post."}), 400
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                cur.execute("INSERT INTO likes (incident_no, device_uuid, timestamp) VALUES (?, ?, ?)",
-                            (incident_id, device_uuid, timestamp))
-                cur.execute("UPDATE incidents SET likes = likes + 1 WHERE incident_no = ?",
-                            (incident_id,))
-            conn.commit()
-
-    with sqlite3.connect(DB_FILE, timeout=30) as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT likes FROM incidents WHERE incident_no = ?", (incident_id,))
-        result = cur.fetchone()
-        likes_count = result[0] if result else 0
+    # Buffered likes are answered optimistically and persisted in the next batch
+    like_buffer = get_like_buffer()
+    if like_buffer is not None:
+        changed, likes_count = like_buffer.set_like(incident_id, device_uuid, liked=liked)
+    else:
+        changed, likes_count = set_like(incident_id, device_uuid, liked=liked)
+    if liked and not changed:
+        return jsonify({"error": "You already liked this post."}), 400
 
     response = jsonify(
         {
             "likes": likes_count,
-            "liked_by_user": request.method != "DELETE",
+            "liked_by_user": liked,
         }
     )
     return _set_uuid_cookie(response, device_uuid)
@@ -302,36 +218,60 @@ def comment_incident(incident_id):
     if not new_comment:
         return jsonify({"error": "Empty comment"}), 400
 
-    with sqlite3.connect(DB_FILE, timeout=30) as conn:
-        conn.execute("PRAGMA foreign_keys = ON")
-        cur = conn.cursor()
-        try:
-            cur.execute(
-                "SELECT COUNT(*) FROM comments WHERE incident_no = ? AND username = ?",
-                (incident_id, username),
-            )
-            if cur.fetchone()[0] >= 2:
-                return jsonify({"error": "You can only leave 2 comments per post."}), 400
-
-            cur.execute(
-                "INSERT INTO comments (incident_no, device_uuid, username, comment, timestamp) VALUES (?, ?, ?, ?, ?)",
-                (incident_id, device_uuid, username, new_comment, timestamp),
-            )
-            conn.commit()
-            cur.execute(
-                "SELECT username, comment, timestamp FROM comments WHERE incident_no = ? ORDER BY timestamp ASC",
-                (incident_id,),
-            )
-            comments = [{"username": r[0] or "Anonymous", "comment": r[1], "timestamp": r[2]}
-                        for r in cur.fetchall()]
-        except sqlite3.IntegrityError:
-            conn.rollback()
-            return jsonify({"error": "Could not process comment."}), 400
-
-    response = jsonify({"comments": comments})
+    comment, comment_count = add_comment(incident_id, device_uuid, username, new_comment, timestamp)
+    if comment is None:
+        return jsonify({"error": f"You can only leave {MAX_USER_COMMENTS} comments per post."}), 400
+
+    response = jsonify({"comment": comment, "comment_count": comment_count})
     return _set_uuid_cookie(response, device_uuid)
 
 
+@app.route("/api/incidents/<incident_id>/comments")
+def get_comments(incident_id):
+    """Keyset-paginated comments: ?limit=N&before=<next_cursor from the previous page>."""
+    limit  = max(1, min(int(request.args.get("limit", 20)), 100))
+    before = request.args.get("before", type=int)
+
+    comments, next_cursor = read_comments(incident_id, limit=limit, before_id=before)
+    return jsonify({"comments": comments, "next_cursor": next_cursor})
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+DB_BUSY_ERRORS = metrics.counter(
+    "traffic_db_busy_errors_total", "Requests that failed because SQLite stayed locked.", ["endpoint"],
+)
+
+
+@app.errorhandler(sqlite3.OperationalError)
+def database_error(error):
+    """A lock that outlived the busy timeout is a 503 the client can retry; anything else is a 500."""
+    if not is_busy_error(error):
+        log.error("Database error on %s: %s", request.path, error)
+        return InternalServerError(original_exception=error)
+    DB_BUSY_ERRORS.inc(endpoint=request.endpoint or "unknown")
+    log.warning("Database busy on %s: %s", request.path, error)
+    response = jsonify({"error": "Database busy, retry shortly"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+
+@app.route("/metrics")
+def get_metrics():
+    """Prometheus text format: this worker's metrics plus the other workers' and the monitor's dumps."""
+    return Response(metrics.exposition(METRICS_DIR), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/api/debug/profiles")
+def get_profiles():
+    """Recent request profiles (newest first); requires the X-Profile token."""
+    if not profiling.authorized(request.headers):
+        abort(404)
+    return jsonify({"profiles": profiling.recent_profiles()})
+
+
 # ---------------------------------------------------------------------------
 # User identity
 # ---------------------------------------------------------------------------
@@ -347,13 +287,12 @@ def check_user():
 # SPA catch-all
 # ---------------------------------------------------------------------------
 
+_app_index = StaticIndex(app.static_folder)
+
+
 @app.route("/", defaults={"path": ""})
 @app.route("/<path:path>")
 def serve_app(path):
-    if path and os.path.exists(os.path.join(app.static_folder, path)):
-        return send_from_directory(app.static_folder, path)
-    return send_from_directory(app.static_folder, "index.html")
-
-
-# Needed for the catch-all route above
-import os  # noqa: E402 (placed after function def to avoid top-level circular risk)
+    if path and path in _app_index:
+        return send_static(app.static_folder, path, index=_app_index)
+    return send_static(app.static_folder, "index.html", index=_app_index)
@@ -13,6 +13,7 @@ from bs4 import BeautifulSoup
 
 from config import CHP_SCRAPE_URL, HEADERS, PARAMS
 from logger import safe_print
+from scrapers import parse_pool, transport
 
 # ── Pre-compiled patterns ──────────────────────────────────────────────────
 _VIEWSTATE_PATTERN = re.compile(
@@ -25,17 +26,14 @@ _EXCLUDED_DETAILS = {"Unit At Scene", "Unit Enroute", "Unit Assigned"}
 def scrape_chp_incidents():
     """Return a list of incident dicts from the CHP live CAD feed."""
     try:
-        response = requests.get(CHP_SCRAPE_URL, headers=HEADERS)
+        response = transport.session().get(CHP_SCRAPE_URL, headers=HEADERS)
         response.raise_for_status()
-        soup     = BeautifulSoup(response.text, "html.parser")
-        table    = soup.find("table", id="gvIncidents")
-        if not table:
+        parsed = parse_pool.run(_parse_incident_table, response.text)
+        if parsed is None:
             safe_print("CHP: No incident table found.")
             return []
 
-        headers   = [th.get_text(strip=True) for th in table.find_all("th")]
-        rows      = table.find_all("tr")[1:]  # Skip header
-        viewstate = _get_viewstate(response.text)
+        headers, rows, viewstate = parsed
         if not viewstate:
             safe_print("CHP: No __VIEWSTATE found.")
             return []
@@ -61,6 +59,24 @@ def scrape_chp_incidents():
 # Private helpers
 # ---------------------------------------------------------------------------
 
+def _parse_incident_table(html_text):
+    """Return (headers, rows of cell text, viewstate), or None if the table is missing.
+
+    Runs in the parse pool, so it only returns plain picklable data.
+    """
+    soup  = BeautifulSoup(html_text, "html.parser")
+    table = soup.find("table", id="gvIncidents")
+    if not table:
+        return None
+
+    headers = [th.get_text(strip=True) for th in table.find_all("th")]
+    rows    = [
+        [cell.get_text(strip=True) for cell in row.find_all("td")]
+        for row in table.find_all("tr")[1:]  # Skip header
+    ]
+    return headers, rows, _get_viewstate(html_text)
+
+
 def _get_viewstate(html_text):
     match = _VIEWSTATE_PATTERN.search(html_text)
     return match.group(1) if match else None
@@ -79,9 +95,9 @@ def _get_incident_details(row_index, viewstate):
             "ddlSearches":          "Choose One",
             "ddlResources":         "Choose One",
         }
-        post = requests.post(CHP_SCRAPE_URL, params=PARAMS, headers=HEADERS, data=data)
+        post = transport.session().post(CHP_SCRAPE_URL, params=PARAMS, headers=HEADERS, data=data)
         post.raise_for_status()
-        return _extract_traffic_info(post.text)
+        return parse_pool.run(_extract_traffic_info, post.text)
     except requests.exceptions.RequestException as e:
         safe_print(f"CHP: Network error for row {row_index}: {e}")
         return {}
@@ -114,8 +130,7 @@ def _extract_traffic_info(response_text):
     return {}
 
 
-def _process_row(idx, row, headers, viewstate):
-    row_data = [cell.get_text(strip=True) for cell in row.find_all("td")]
+def _process_row(idx, row_data, headers, viewstate):
     if "Location" in headers and row_data[headers.index("Location")] == "Media Log":
         return None
 
@@ -0,0 +1,44 @@
+# scrapers/parse_pool.py
+"""
+Optional process pool for CPU-bound HTML parsing.
+
+The monitor process starts the pool so BeautifulSoup work runs outside the
+GIL that the scrape threads share. When no pool is running (dev server,
+scripts, tests) parsers run inline on the calling thread. Functions passed
+to ``run`` must be module-level so they can be pickled. Workers are spawned
+rather than forked because the monitor is multi-threaded when the pool starts.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+_pool = None
+_lock = threading.Lock()
+
+
+def start(max_workers=None):
+    """Start the shared pool (idempotent)."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _pool
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run(fn, *args):
+    """Run ``fn(*args)`` in the pool if one is running, otherwise inline."""
+    pool = _pool
+    if pool is None:
+        return fn(*args)
+    return pool.submit(fn, *args).result()
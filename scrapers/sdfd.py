@@ -4,17 +4,16 @@
 import hashlib
 from datetime import datetime
 
-import requests
-
 from config import SDFD_API_URL, HEADERS
 from logger import safe_print
+from scrapers import transport
 
 
 def scrape_sdfd_incidents():
     """Return a list of incident dicts from the SDFD dispatch API."""
     safe_print("Scraping SDFD incidents...")
     try:
-        response = requests.get(SDFD_API_URL, headers=HEADERS)
+        response = transport.session().get(SDFD_API_URL, headers=HEADERS)
         response.raise_for_status()
         data = response.json()
 
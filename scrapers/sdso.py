@@ -4,10 +4,9 @@
 import time
 from datetime import datetime
 
-import requests
-
 from config import SDSO_API_URL, HEADERS
 from logger import safe_print
+from scrapers import transport
 
 # ── Module-level cache to throttle SDSO requests (max once per 5 min) ──────
 _last_fetch: float = 0
@@ -28,7 +27,7 @@ def scrape_sdso_incidents():
 
     safe_print("Scraping SDSO incidents...")
     try:
-        response = requests.get(SDSO_API_URL, headers=HEADERS)
+        response = transport.session().get(SDSO_API_URL, headers=HEADERS)
         response.raise_for_status()
         data   = response.json()
         events = data.get("Events", [])
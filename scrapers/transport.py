@@ -0,0 +1,181 @@
+# scrapers/transport.py
+"""
+Shared HTTP session for the scrapers, with optional record/replay.
+
+All scrapers fetch through ``session()``, one pooled requests.Session, so
+CHP's per-row POSTs reuse connections. For offline tests and benchmarks the
+session's transport can be swapped:
+
+  record(path)  — requests go to the network as usual and every response
+                  is also written to a fixture directory
+  replay(path)  — responses are served from that directory; a request that
+                  was not recorded fails with ConnectionError, like a
+                  network outage would
+
+Requests are matched on method, URL (including the query string) and a
+hash of the body, so CHP's per-row POSTs replay against the list page
+that was recorded with them.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+_session      = None
+_session_lock = threading.Lock()
+
+POOL_SIZE = 16  # CHP row workers + one connection per scraper
+
+
+def session():
+    """The scrapers' shared requests.Session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _new_session()
+    return _session
+
+
+def _new_session(adapter=None):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    s = requests.Session()
+    adapter = adapter or HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+def _body_hash(body):
+    if body is None:
+        return None
+    if isinstance(body, str):
+        body = body.encode()
+    return hashlib.sha1(body).hexdigest()
+
+
+class FixtureStore:
+    """Recorded responses in a directory: ``index.json`` plus one body file each."""
+
+    INDEX = "index.json"
+
+    def __init__(self, path):
+        self.path    = path
+        self._lock   = threading.Lock()
+        self.entries = {}
+        index = os.path.join(path, self.INDEX)
+        if os.path.exists(index):
+            with open(index) as f:
+                for entry in json.load(f):
+                    self.entries[self.key(entry["method"], entry["url"], entry["body_sha1"])] = entry
+
+    @staticmethod
+    def key(method, url, body_sha1):
+        return f"{method.upper()} {url} {body_sha1 or '-'}"
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, request, status, headers, content):
+        os.makedirs(self.path, exist_ok=True)
+        body_sha1 = _body_hash(request.body)
+        key       = self.key(request.method, request.url, body_sha1)
+        with self._lock:
+            # Re-recording a request rewrites its own file, so names stay 0000..n-1
+            existing = self.entries.get(key)
+            name = existing["file"] if existing else f"{len(self.entries):04d}.body"
+            with open(os.path.join(self.path, name), "wb") as f:
+                f.write(content)
+            self.entries[key] = {
+                "method": request.method, "url": request.url, "body_sha1": body_sha1,
+                "status": status, "headers": headers, "file": name,
+            }
+            with open(os.path.join(self.path, self.INDEX), "w") as f:
+                json.dump(list(self.entries.values()), f, indent=1)
+
+    def lookup(self, request):
+        """(entry, body bytes) for ``request``, or None if it was never recorded."""
+        entry = self.entries.get(self.key(request.method, request.url, _body_hash(request.body)))
+        if entry is None:
+            return None
+        with open(os.path.join(self.path, entry["file"]), "rb") as f:
+            return entry, f.read()
+
+
+def _recording_adapter(store):
+    from requests.adapters import HTTPAdapter
+
+    class RecordingAdapter(HTTPAdapter):
+        """Send for real and write each response to ``store``."""
+
+        def send(self, request, **kwargs):
+            response = super().send(request, **kwargs)
+            keep = {k: v for k, v in response.headers.items() if k.lower() == "content-type"}
+            store.add(request, response.status_code, keep, response.content)
+            return response
+
+    return RecordingAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+
+
+def _replay_adapter(store):
+    import requests
+    from requests.adapters import BaseAdapter
+    from requests.structures import CaseInsensitiveDict
+
+    class ReplayAdapter(BaseAdapter):
+        """Serve responses from ``store`` without touching the network."""
+
+        def __init__(self):
+            super().__init__()
+            self.hits   = 0
+            self.misses = 0
+
+        def send(self, request, **kwargs):
+            found = store.lookup(request)
+            if found is None:
+                self.misses += 1
+                raise requests.exceptions.ConnectionError(f"Not recorded: {request.method} {request.url}")
+            self.hits += 1
+            entry, content = found
+            response = requests.Response()
+            response.status_code = entry["status"]
+            response.headers     = CaseInsensitiveDict(entry["headers"])
+            response.encoding    = requests.utils.get_encoding_from_headers(response.headers)
+            response._content    = content
+            response.url         = request.url
+            response.request     = request
+            response.reason      = "OK" if entry["status"] < 400 else "Error"
+            return response
+
+        def close(self):
+            pass
+
+    return ReplayAdapter()
+
+
+def record(path):
+    """Route the shared session through a recorder writing to ``path``. Returns the store."""
+    global _session
+    store = FixtureStore(path)
+    with _session_lock:
+        _session = _new_session(_recording_adapter(store))
+    return store
+
+
+def replay(path):
+    """Serve the shared session from fixtures in ``path``. Returns the replay adapter."""
+    global _session
+    adapter = _replay_adapter(FixtureStore(path))
+    with _session_lock:
+        _session = _new_session(adapter)
+    return adapter
+
+
+def reset():
+    """Back to a plain network session."""
+    global _session
+    with _session_lock:
+        _session = None
@@ -1,22 +1,38 @@
 import os
 import sqlite3
+import sys
 import random
 from datetime import datetime, timedelta
 import uuid
-import json
 
 # Project root is one directory above scripts/
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
 DB_FILE = os.path.join(PROJECT_ROOT, "traffic_data.db")
 
-def add_mock_data():
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
+import db  # noqa: E402
 
+def add_mock_data():
     now = datetime.now()
     incident_types = ["Traffic Collision", "Traffic Hazard", "Disabled Vehicle", "Fire", "Medical Emergency"]
     locations = ["1-5 N / 1-8 E", "163 S / FRIARS RD", "I-805 S / SR-94", "I-15 N / MIRA MESA BLVD", "SR-52 E / CONVOY ST"]
     cities = ["San Diego", "Chula Vista", "Oceanside", "Escondido", "Carlsbad"]
+    sources = ["CHP", "SDPD", "SDFD"]
+
+    # Add every value to the lookups dictionary before the bulk insert transaction opens
+    db.DB_FILE = DB_FILE
+    db.init_db()
+    lookup = db.lookups.id_for
+    for field, values in (
+        ("type", incident_types), ("source", sources), ("city", cities),
+        ("neighborhood", [f"{city} Neighborhood" for city in cities]),
+        ("location_desc", [f"Near {location}" for location in locations]),
+    ):
+        for value in values:
+            lookup(field, value)
+
+    conn = sqlite3.connect(DB_FILE)
+    cur = conn.cursor()
 
     print("Adding mock data...")
 
@@ -42,7 +58,6 @@ def add_mock_data():
                 hour = 17 # 5 PM rush hour spike
 
             incident_time = target_date.replace(hour=hour, minute=minute, second=second)
-            timestamp_str = incident_time.strftime("%Y-%m-%d %H:%M:%S")
 
             incident_no = f"MOCK-{uuid.uuid4().hex[:8].upper()}"
             city = random.choice(cities)
@@ -50,23 +65,25 @@ def add_mock_data():
             location = random.choice(locations)
             location_desc = f"Near {location}"
             type_val = random.choice(incident_types)
-            details = json.dumps([f"Mock detail 1 for {incident_no}", "Mock detail 2"])
+            details = db.encode_details([f"Mock detail 1 for {incident_no}", "Mock detail 2"])
             description = f"Mock description for {type_val} at {location}"
             latitude = 32.7157 + random.uniform(-0.1, 0.1)
             longitude = -117.1611 + random.uniform(-0.1, 0.1)
             map_filename = "mock_map.png"
             likes = random.randint(0, 10)
             active = 1 if day_offset == 0 and hour >= now.hour - 2 else 0 # make some of today active
-            source = random.choice(["CHP", "SDPD", "SDFD"])
+            source = random.choice(sources)
             geocode_precision = "street"
 
             cur.execute("""
                 INSERT INTO incidents 
-                (incident_no, date, timestamp, city, neighborhood, location, location_desc, type, details, 
-                 description, latitude, longitude, map_filename, likes, comments, active, source, geocode_precision)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (str(incident_no), date_str, timestamp_str, city, neighborhood, location, location_desc, type_val,
-                  details, description, latitude, longitude, map_filename, likes, '[]', active, source, geocode_precision))
+                (incident_no, date, ts_epoch, city_id, neighborhood_id, location, location_desc_id, type_id, details, 
+                 description, latitude, longitude, map_filename, likes, active, source_id, geocode_precision)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (str(incident_no), date_str, db.to_epoch(incident_time), lookup("city", city), lookup("neighborhood", neighborhood),
+                  location, lookup("location_desc", location_desc), lookup("type", type_val),
+                  details, description, latitude, longitude, map_filename, likes, active, lookup("source", source),
+                  geocode_precision))
 
     conn.commit()
     conn.close()
@@ -0,0 +1,392 @@
+"""
+Benchmark the backend hot paths against synthetic databases.
+
+For each requested size a database is generated once (cached as
+bench_<size>.db under --data-dir and reused while the seed matches), then
+each case below runs a fixed number of iterations:
+
+  read_incidents     first page, deep keyset pagination, source/type filters
+  incident_stats     /api/incident_stats for every date_filter, plus building
+                     the monitor's stats snapshots and looking one up
+  chart_buckets      stats chart counts as index range counts per bucket, and
+                     by fetching the window's timestamps once to bin in
+                     Python (NumPy when installed)
+  save_or_update     no-change, update and insert paths (LLM call stubbed out)
+  geocode_cache      GeocodingCache hits and misses
+  likes/comments     set_like toggles and add_comment writes
+
+Write cases undo their own changes so a cached database stays comparable.
+Each size also reports the on-disk footprint of the incident tables (pages,
+bytes and average row payload, from SQLite's dbstat). Results are written
+as JSON; pass --compare with an earlier result file to print per-case
+ratios and exit non-zero when any case regressed past --threshold.
+
+    python scripts/benchmark.py --sizes 10k 1m --out bench.json
+    python scripts/benchmark.py --sizes 10k --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from bisect import bisect_right
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # Optional: the binned chart strategy falls back to bisect
+    np = None
+
+# Project root is one directory above scripts/ — needed for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("GPT_KEY", "benchmark")
+
+import db  # noqa: E402
+import logger  # noqa: E402
+import stats  # noqa: E402
+import synthetic_data  # noqa: E402
+from geocoding import GeocodingCache  # noqa: E402
+
+DATE_FILTERS = [None, "day", "week", "month", "year"]
+
+
+# ---------------------------------------------------------------------------
+# Timing
+# ---------------------------------------------------------------------------
+
+def measure(fn, iterations, warmup=1):
+    """Run ``fn`` ``warmup + iterations`` times; summary of the timed runs in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "n":         iterations,
+        "min_ms":    round(samples[0], 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "p95_ms":    round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "mean_ms":   round(statistics.fmean(samples), 4),
+        "ops_per_s": round(1000 / statistics.fmean(samples), 1) if samples[0] > 0 else None,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Cases
+# ---------------------------------------------------------------------------
+
+def bench_read_incidents(results, iterations):
+    results["read_incidents.first_page"] = measure(lambda: db.read_incidents(limit=20), iterations)
+
+    def paginate(pages=25):
+        cursor = None
+        for _ in range(pages):
+            page = db.read_incidents(limit=20, cursor=cursor)
+            if not page:
+                break
+            cursor = f"{page[-1]['timestamp']}|{page[-1]['incident_no']}"
+
+    results["read_incidents.paginate_25_pages"] = measure(paginate, max(3, iterations // 10))
+    results["read_incidents.source_filter"] = measure(
+        lambda: db.read_incidents(limit=20, sources=["SDFD"]), iterations,
+    )
+    results["read_incidents.type_filter"] = measure(
+        lambda: db.read_incidents(limit=20, incident_types=["Fire", "Hit and Run"]), iterations,
+    )
+    results["read_incidents.active_only"] = measure(
+        lambda: db.read_incidents(limit=20, active_only=True), iterations,
+    )
+
+
+def bench_incident_stats(results, iterations):
+    import routes  # imported lazily: pulls in Flask
+    client = routes.app.test_client()
+
+    def get_stats(date_filter, source=None):
+        params = {k: v for k, v in (("date_filter", date_filter), ("source", source)) if v}
+        response = client.get("/api/incident_stats", query_string=params)
+        assert response.status_code == 200, response.status_code
+
+    for date_filter in DATE_FILTERS:
+        name = f"incident_stats.{date_filter or 'all'}"
+        results[name] = measure(lambda: get_stats(date_filter), max(3, iterations // 5))
+    results["incident_stats.week_source"] = measure(lambda: get_stats("week", "CHP"), max(3, iterations // 5))
+
+    # What the monitor does after a changed cycle, then what the endpoint does with it
+    store = stats.StatsSnapshots()
+    try:
+        results["incident_stats.snapshot_build"] = measure(
+            lambda: store.publish(stats.build_snapshots()), max(3, iterations // 20),
+        )
+        results["incident_stats.snapshot_lookup"] = measure(lambda: store.lookup("week", ["CHP"]), iterations)
+    finally:
+        with db.write_transaction("benchmark") as conn:  # later runs measure per-request stats
+            conn.execute("DELETE FROM stats_snapshots")
+
+
+def _chart_binned(cur, table, sources, edges):
+    """Fetch every timestamp in the window once, then bin them in Python."""
+    clauses = [f"source_id IN ({','.join('?' for _ in sources)})"] if sources else []
+    clauses += ["ts_epoch >= ?", "ts_epoch < ?"]
+    cur.execute(f"SELECT ts_epoch FROM {table} WHERE {' AND '.join(clauses)}", list(sources) + [edges[0], edges[-1]])
+    if np is not None:
+        times = np.fromiter((row[0] for row in cur), dtype=np.int64)
+        return np.histogram(times, bins=edges)[0].tolist()
+    counts = [0] * (len(edges) - 1)
+    for (ts,) in cur:
+        counts[bisect_right(edges, ts) - 1] += 1
+    return counts
+
+
+def bench_chart_buckets(results, iterations):
+    sources = db.lookups.ids("source", ["CHP", "SDFD"])
+    binned  = "binned_numpy" if np is not None else "binned_bisect"
+
+    with db.connect() as conn:
+        cur = conn.cursor()
+        for date_filter in (None, "year"):
+            edges = stats.chart_edges(date_filter, datetime.now())
+            table = db.incident_table(cur, edges[0])
+            for label, chosen in (("all", []), ("source", sources)):
+                strategies = {
+                    "range_counts": lambda: stats.chart_counts(cur, chosen, date_filter),
+                    binned:         lambda: _chart_binned(cur, table, chosen, edges),
+                }
+                counts = {name: fn() for name, fn in strategies.items()}
+                assert len({tuple(c) for c in counts.values()}) == 1, counts
+                for name, fn in strategies.items():
+                    results[f"chart_buckets.{date_filter or 'day'}_{label}.{name}"] = measure(fn, iterations)
+
+
+def _incident_payload(row, **changes):
+    payload = {
+        "No.": row["incident_no"], "Date": row["date"], "Timestamp": row["timestamp"],
+        "City": row["city"], "Neighborhood": row["neighborhood"], "Location": row["location"],
+        "Location Desc.": row["location_desc"], "Type": row["type"], "Source": row["source"],
+        "Details": row["Details"], "Latitude": row["latitude"], "Longitude": row["longitude"],
+        "precision": row["geocode_precision"], "active": row["active"],
+    }
+    payload.update(changes)
+    return payload
+
+
+def bench_save_or_update(results, iterations):
+    import llm  # stub the LLM so inserts measure only the database work
+    original_generate, llm.generate_description = llm.generate_description, lambda data: ("Synthetic.", 2)
+
+    with sqlite3.connect(db.DB_FILE) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = [db.decode_incident(dict(row)) for row in conn.execute(
+            "SELECT * FROM incidents ORDER BY ts_epoch DESC LIMIT ?", (iterations + 1,)
+        )]
+    conn.close()
+    unchanged = [_incident_payload(row) for row in rows]
+    changed   = [_incident_payload(row, Details=row["Details"] + ["BENCH UPDATE"]) for row in rows]
+    today     = datetime.now().strftime("%Y-%m-%d")
+    inserts   = [
+        _incident_payload(rows[0], **{"No.": f"BENCH{i:06d}", "Date": today, "active": 1})
+        for i in range(iterations)
+    ]
+
+    def run_batch(payloads):
+        for payload in payloads:
+            db.save_or_update_incident(payload)
+
+    try:
+        for name, payloads in (("no_change", unchanged), ("update", changed), ("insert", inserts)):
+            start = time.perf_counter()
+            run_batch(payloads)
+            elapsed = time.perf_counter() - start
+            results[f"save_or_update.{name}"] = {
+                "n":         len(payloads),
+                "mean_ms":   round(elapsed * 1000 / len(payloads), 4),
+                "ops_per_s": round(len(payloads) / elapsed, 1),
+            }
+    finally:
+        llm.generate_description = original_generate
+        run_batch(unchanged)  # restore the original details
+        with db.write_transaction("benchmark") as conn:
+            conn.execute("DELETE FROM incidents WHERE incident_no LIKE 'BENCH%'")
+
+
+def bench_geocode_cache(results, iterations):
+    cache = GeocodingCache(db.DB_FILE)
+    with sqlite3.connect(db.DB_FILE) as conn:
+        queries = [row[0] for row in conn.execute("SELECT query FROM geocode_cache LIMIT ?", (iterations,))]
+    conn.close()
+    hits   = iter(queries * 2)
+    misses = iter(f"{i} Nowhere St, San Diego, CA" for i in range(iterations * 2))
+    results["geocode_cache.hit"]  = measure(lambda: cache.get(next(hits)), len(queries) - 1)
+    results["geocode_cache.miss"] = measure(lambda: cache.get(next(misses)), iterations)
+
+
+def bench_likes_comments(results, iterations):
+    with sqlite3.connect(db.DB_FILE) as conn:
+        incident_nos = [row[0] for row in conn.execute(
+            "SELECT incident_no FROM incidents ORDER BY ts_epoch DESC LIMIT ?", (iterations,)
+        )]
+    conn.close()
+
+    # Like then unlike each incident, so the counters end where they started
+    toggles = iter([(no, liked) for no in incident_nos for liked in (True, False)])
+    results["likes.toggle"] = measure(
+        lambda: db.set_like(*_with_device(next(toggles))), len(incident_nos) * 2, warmup=0,
+    )
+
+    targets = iter(incident_nos * 2)
+    now     = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        results["comments.add"] = measure(
+            lambda: db.add_comment(next(targets), "bench-device", "bench", "Benchmark comment", now),
+            len(incident_nos) - 1,
+        )
+    finally:
+        with db.write_transaction("benchmark") as conn:
+            conn.execute("DELETE FROM comments WHERE device_uuid = 'bench-device'")
+
+
+def _with_device(toggle):
+    incident_no, liked = toggle
+    return incident_no, "bench-device", liked
+
+
+CASES = {
+    "read_incidents": bench_read_incidents,
+    "incident_stats": bench_incident_stats,
+    "chart_buckets":  bench_chart_buckets,
+    "save_or_update": bench_save_or_update,
+    "geocode_cache":  bench_geocode_cache,
+    "likes_comments": bench_likes_comments,
+}
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def storage(path):
+    """Pages, bytes and average row payload of the incident tables (via dbstat)."""
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("""
+            SELECT name, COUNT(*), SUM(pgsize), SUM(payload), SUM(CASE WHEN pagetype = 'leaf' THEN ncell END)
+            FROM dbstat WHERE name IN ('incidents', 'incidents_archive', 'lookups') GROUP BY name
+        """).fetchall()
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    conn.close()
+    tables = {
+        name: {"pages": pages, "bytes": size, "avg_row_bytes": round(payload / cells, 1) if cells else None}
+        for name, pages, size, payload, cells in rows
+    }
+    return {"file_pages": page_count, "tables": tables}
+
+
+def prepare_database(size, data_dir, seed, regenerate=False):
+    """Path to a cached synthetic database of ``size``, generating it if needed."""
+    path = os.path.join(data_dir, f"bench_{size}.db")
+    meta = path + ".json"
+    count = synthetic_data.parse_size(size)
+    try:
+        with open(meta) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = {}
+    if regenerate or not os.path.exists(path) or cached.get("seed") != seed or cached.get("incidents") != count:
+        print(f"Generating {count:,} incidents -> {path}", file=sys.stderr)
+        counts = synthetic_data.generate(path, count, seed=seed,
+                                         progress=lambda msg: print(msg, file=sys.stderr))
+        with open(meta, "w") as f:
+            json.dump({"seed": seed, **counts}, f)
+    else:
+        counts = {k: v for k, v in cached.items() if k != "seed"}
+        with synthetic_data.using_db(path):
+            db.init_db()  # migrates databases cached by older versions
+    return path, counts
+
+
+def run(sizes, cases, iterations, data_dir, seed, regenerate=False):
+    report = {
+        "commit":     _git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python":     platform.python_version(),
+        "sqlite":     sqlite3.sqlite_version,
+        "platform":   platform.platform(),
+        "iterations": iterations,
+        "sizes":      {},
+    }
+    for size in sizes:
+        path, counts = prepare_database(size, data_dir, seed, regenerate)
+        results = {}
+        with synthetic_data.using_db(path):
+            for name in cases:
+                print(f"[{size}] {name}...", file=sys.stderr)
+                CASES[name](results, iterations)
+        report["sizes"][size] = {"rows": counts, "storage": storage(path), "results": results}
+    return report
+
+
+def compare(report, baseline, threshold):
+    """Print mean-time ratios against ``baseline``; returns the regressed case names."""
+    regressed = []
+    for size, current in report["sizes"].items():
+        previous = baseline.get("sizes", {}).get(size, {}).get("results", {})
+        for name, result in sorted(current["results"].items()):
+            before = previous.get(name)
+            if not before:
+                continue
+            ratio = result["mean_ms"] / before["mean_ms"] if before["mean_ms"] else float("inf")
+            flag  = "  REGRESSION" if ratio > threshold else ""
+            print(f"{size:>5} {name:<40} {before['mean_ms']:>10.3f} -> {result['mean_ms']:>10.3f} ms"
+                  f"  x{ratio:.2f}{flag}", file=sys.stderr)
+            if flag:
+                regressed.append(f"{size}:{name}")
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the traffic backend hot paths")
+    parser.add_argument("--sizes", nargs="+", default=["10k"], help="10k, 100k, 1m, 10m or row counts")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=PROJECT_ROOT, help="where generated databases are cached")
+    parser.add_argument("--regenerate", action="store_true", help="rebuild cached databases")
+    parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="mean-time ratio that counts as a regression (default 1.25)")
+    args = parser.parse_args()
+
+    logger.configure(stream=sys.stderr, level="WARNING")  # keep stdout for the JSON report
+    report = run(args.sizes, args.cases, args.iterations, args.data_dir, args.seed, args.regenerate)
+    text   = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressed = compare(report, json.load(f), args.threshold)
+        if regressed:
+            print(f"{len(regressed)} case(s) regressed: {', '.join(regressed)}", file=sys.stderr)
+            sys.exit(1)
@@ -1,10 +1,7 @@
 import sqlite3
 import os
 import sys
-import subprocess
 import threading
-import json
-from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Project root is one directory above scripts/ — needed for imports and paths
@@ -12,7 +9,11 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, PROJECT_ROOT)
 
 # Import shared geocoding module (lives at project root)
+from db import decode_details  # noqa: E402
 from geocoding import GeocodingCache, geocode_location, normalize_street  # noqa: E402
+from generate_map import MAPBOX_STYLE  # noqa: E402
+from map_cache import MapImageCache  # noqa: E402
+from map_renderer import MapRenderer  # noqa: E402
 
 BASE_DIR      = PROJECT_ROOT
 DB_FILE       = os.path.join(BASE_DIR, "traffic_data.db")
@@ -22,13 +23,18 @@ MAP_GENERATOR = os.path.join(BASE_DIR, "generate_map.py")
 # Initialize shared geocoding cache
 geo_cache = GeocodingCache(DB_FILE)
 
+# Pooled in-process renderer; set MAP_RENDER_MODE=subprocess to isolate each render
+map_renderer = MapRenderer(
+    os.getenv("MAP_ACCESS_TOKEN"),
+    mode=os.environ.get("MAP_RENDER_MODE", "inprocess").lower(),
+    generator_path=MAP_GENERATOR,
+)
+# Incidents at the same spot share one content-addressed image
+map_cache = MapImageCache(TARGET_DIR, map_renderer, style=MAPBOX_STYLE)
+
 def run_map_generator(incident_no, lat, lon):
-    filename_date_str = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    filename = os.path.join(TARGET_DIR, f"map_{incident_no}_{filename_date_str}.png")
-    cmd = [sys.executable, MAP_GENERATOR, str(lon), str(lat), filename]
     try:
-        subprocess.run(cmd, check=True)
-        return os.path.basename(filename)
+        return map_cache.get_or_render(lat, lon)
     except Exception as e:
         print(f"Map gen error: {e}")
     return None
@@ -41,7 +47,7 @@ def process_incident(row):
     source = row['source']
     location_str = row['location']
     
-    details = json.loads(row['details']) if row['details'] else []
+    details = decode_details(row['details'])
     
     # Build query based on source
     query = ""
@@ -88,7 +94,7 @@ def catchup():
     # Find incidents needing geocoding (SDPD, SDFD sources)
     cur.execute("""
         SELECT incident_no, source, location, details 
-        FROM incidents 
+        FROM incidents_decoded 
         WHERE (latitude IS NULL OR map_filename IS NULL OR map_filename = '') 
         AND source IN ('SDPD', 'SDFD')
     """)
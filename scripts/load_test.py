@@ -0,0 +1,479 @@
+"""
+Load-test the API with simulated dashboard users.
+
+Each virtual user replays the App.svelte access pattern over one
+keep-alive connection:
+
+  open        GET /api/user/check, first page of /api/incidents (15 rows)
+              and /api/incident_stats for the selected time filter
+  poll        every 10 s: first page again; stats again once the
+              client's 30 s stats cache has expired
+  scroll      next pages via the ``timestamp|incident_no`` cursor
+  filter      switch source / time filter / active-only, then reload
+  engage      like and unlike a post, read its comments, post a comment
+
+Users are drawn from a mix of profiles: dashboard viewers that only poll,
+browsers that also scroll and filter, and engaged users that also like
+and comment. Think times can be compressed with --speed to put more load
+through fewer threads.
+
+The report gives throughput plus p50/p95/p99 latency and error rate per
+endpoint. 503 responses are SQLite lock timeouts (see routes.database_error).
+The server's write-retry and busy counters from /metrics are read before
+and after the run, so you can see contention with the monitor's writes.
+--writer-rate adds synthetic monitor-style write transactions against
+--db to provoke that contention when no monitor is running.
+
+    TRAFFIC_DB_FILE=bench_1m.db python scripts/load_test.py --spawn --users 50 --duration 60
+    python scripts/load_test.py --url http://127.0.0.1:5002 --users 200 --speed 5 --out load.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import quote, urlencode, urlsplit
+
+# Project root is one directory above scripts/ — needed for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+PAGE_SIZE     = 15    # App.svelte postsPerPage
+POLL_INTERVAL = 10.0  # App.svelte update interval (seconds)
+STATS_TTL     = 30.0  # App.svelte stats cache lifetime (seconds)
+
+SOURCES      = ["all", "CHP", "SDPD", "SDFD", "SDSO"]
+TIME_FILTERS = ["day", "week", "month", "year"]
+
+# Per-poll-tick probability of each action, per user profile
+PROFILES = {
+    "dashboard": {"scroll": 0.00, "filter": 0.02, "engage": 0.00},
+    "browser":   {"scroll": 0.30, "filter": 0.15, "engage": 0.02},
+    "engaged":   {"scroll": 0.20, "filter": 0.10, "engage": 0.25},
+}
+DEFAULT_MIX = "dashboard=70,browser=20,engaged=10"
+
+# Server counters diffed across the run
+SERVER_COUNTERS = (
+    "traffic_db_busy_errors_total",
+    "traffic_db_write_busy_retries_total",
+    "traffic_db_write_failures_total",
+    "traffic_db_write_lock_wait_seconds_sum",
+)
+
+
+# ---------------------------------------------------------------------------
+# Results
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class Results:
+    """Latencies and outcomes per endpoint, shared by all user threads."""
+
+    def __init__(self):
+        self._lock     = threading.Lock()
+        self.latencies = defaultdict(list)  # endpoint -> [seconds]
+        self.statuses  = defaultdict(lambda: defaultdict(int))
+        self.failures  = defaultdict(int)   # connection errors / timeouts
+
+    def record(self, endpoint, seconds, status):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+    def record_failure(self, endpoint):
+        with self._lock:
+            self.failures[endpoint] += 1
+
+    def report(self, elapsed):
+        endpoints, total, errors, busy = {}, 0, 0, 0
+        for name in sorted(set(self.latencies) | set(self.failures)):
+            values   = sorted(self.latencies.get(name, []))
+            statuses = dict(self.statuses.get(name, {}))
+            failed   = self.failures.get(name, 0) + sum(n for s, n in statuses.items() if s >= 500)
+            count    = len(values) + self.failures.get(name, 0)
+            ms       = lambda v: round(v * 1000, 2) if v is not None else None  # noqa: E731
+            endpoints[name] = {
+                "requests":   count,
+                "rps":        round(count / elapsed, 2),
+                "p50_ms":     ms(percentile(values, 50)),
+                "p95_ms":     ms(percentile(values, 95)),
+                "p99_ms":     ms(percentile(values, 99)),
+                "max_ms":     ms(values[-1] if values else None),
+                "error_rate": round(failed / count, 4) if count else 0.0,
+                "busy_503":   statuses.get(503, 0),
+                "statuses":   {str(s): n for s, n in sorted(statuses.items())},
+            }
+            total  += count
+            errors += failed
+            busy   += statuses.get(503, 0)
+        return {
+            "requests":   total,
+            "rps":        round(total / elapsed, 2),
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "busy_503":   busy,
+            "endpoints":  endpoints,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Virtual user
+# ---------------------------------------------------------------------------
+
+class VirtualUser:
+    """One browser tab running App.svelte, on its own keep-alive connection."""
+
+    def __init__(self, base_url, profile, results, speed, rng, timeout=30):
+        parts         = urlsplit(base_url)
+        self.host     = parts.hostname
+        self.port     = parts.port or 80
+        self.profile  = PROFILES[profile]
+        self.results  = results
+        self.speed    = speed
+        self.rng      = rng
+        self.timeout  = timeout
+        self.conn     = None
+        self.cookie   = None
+        self.source   = "all"
+        self.time_filter = "day"
+        self.active_only = False
+        self.posts       = []
+        self.cursor      = None
+        self.stats_at    = 0.0
+
+    # ── HTTP ──────────────────────────────────────────────────────────────
+
+    def request(self, endpoint, method, path, body=None):
+        headers = {"Accept": "application/json"}
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        if body is not None:
+            body = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        for attempt in (1, 2):  # one reconnect if the server closed the idle connection
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            start = time.perf_counter()
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                payload  = response.read()
+            except (OSError, http.client.HTTPException):
+                self.conn.close()
+                self.conn = None
+                if attempt == 2:
+                    self.results.record_failure(endpoint)
+                    return None, None
+                continue
+            self.results.record(endpoint, time.perf_counter() - start, response.status)
+            cookie = response.getheader("Set-Cookie")
+            if cookie:
+                self.cookie = cookie.split(";", 1)[0]
+            if response.status >= 400 or not payload:
+                return response.status, None
+            try:
+                return response.status, json.loads(payload)
+            except ValueError:
+                return response.status, None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+    # ── App actions ───────────────────────────────────────────────────────
+
+    def _incident_params(self, cursor=None):
+        params = [("limit", PAGE_SIZE)]
+        if cursor:
+            params.append(("cursor", cursor))
+        if self.active_only:
+            params.append(("active_only", "true"))
+        if self.source != "all":
+            params.append(("source", self.source))
+        return urlencode(params)
+
+    def load_incidents(self, endpoint="incidents.first_page"):
+        _status, page = self.request(endpoint, "GET", f"/api/incidents?{self._incident_params()}")
+        if isinstance(page, list):
+            self.posts  = page
+            self.cursor = f"{page[-1]['timestamp']}|{page[-1]['incident_no']}" if page else None
+
+    def load_stats(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.stats_at < STATS_TTL / self.speed:
+            return  # still fresh in the client's stats cache
+        params = {"date_filter": self.time_filter}
+        if self.source != "all":
+            params["source"] = self.source
+        self.request("incident_stats", "GET", f"/api/incident_stats?{urlencode(params)}")
+        self.stats_at = now
+
+    def scroll(self):
+        if not self.cursor:
+            return
+        _status, page = self.request("incidents.next_page", "GET",
+                                     f"/api/incidents?{self._incident_params(self.cursor)}")
+        if isinstance(page, list) and page:
+            self.posts += page
+            self.cursor = f"{page[-1]['timestamp']}|{page[-1]['incident_no']}"
+
+    def change_filter(self):
+        choice = self.rng.random()
+        if choice < 0.5:
+            self.source = self.rng.choice(SOURCES)
+        elif choice < 0.8:
+            self.time_filter = self.rng.choice(TIME_FILTERS)
+        else:
+            self.active_only = not self.active_only
+        self.load_incidents("incidents.filter_change")
+        self.load_stats(force=True)
+
+    def engage(self):
+        if not self.posts:
+            return
+        post = self.rng.choice(self.posts)
+        path = f"/api/incidents/{quote(str(post['incident_no']), safe='')}"
+        self.request("comments.read", "GET", f"{path}/comments?limit=20")
+        if self.rng.random() < 0.7:
+            method = "DELETE" if post.get("liked_by_user") else "POST"
+            status, _body = self.request(f"like.{method.lower()}", method, f"{path}/like")
+            if status == 200:
+                post["liked_by_user"] = method == "POST"
+        else:
+            self.request("comment.post", "POST", f"{path}/comment",
+                         {"comment": "Load test comment", "username": "loadtest"})
+
+    def run(self, stop_at):
+        """Open the dashboard, then act once per (compressed) poll interval until ``stop_at``."""
+        try:
+            self.request("user.check", "GET", "/api/user/check")
+            self.load_incidents()
+            self.load_stats(force=True)
+            # Users open the page at random moments, not in lockstep
+            next_tick = time.monotonic() + self.rng.uniform(0, POLL_INTERVAL / self.speed)
+            while time.monotonic() < stop_at:
+                time.sleep(max(0.0, min(next_tick, stop_at) - time.monotonic()))
+                if time.monotonic() >= stop_at:
+                    break
+                next_tick += POLL_INTERVAL / self.speed
+
+                self.load_incidents("incidents.poll")
+                self.load_stats()
+                if self.rng.random() < self.profile["scroll"]:
+                    for _ in range(self.rng.randint(1, 4)):
+                        self.scroll()
+                if self.rng.random() < self.profile["filter"]:
+                    self.change_filter()
+                if self.rng.random() < self.profile["engage"]:
+                    self.engage()
+        finally:
+            self.close()
+
+
+# ---------------------------------------------------------------------------
+# Server helpers
+# ---------------------------------------------------------------------------
+
+_SAMPLE = re.compile(r"^(\w+)(?:\{[^}]*\})?\s+([0-9.eE+-]+|\+Inf)$")
+
+
+def server_counters(base_url):
+    """Sum of each SERVER_COUNTERS family over all labels/processes, or {} if /metrics is unavailable."""
+    parts = urlsplit(base_url)
+    try:
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+        conn.request("GET", "/metrics")
+        text = conn.getresponse().read().decode()
+        conn.close()
+    except (OSError, http.client.HTTPException):
+        return {}
+    totals = dict.fromkeys(SERVER_COUNTERS, 0.0)
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if match and match.group(1) in totals:
+            totals[match.group(1)] += float(match.group(2))
+    return totals
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(port):
+    """Start the API on ``port`` (gunicorn if installed, else the threaded dev server)."""
+    env = dict(os.environ, BIND=f"127.0.0.1:{port}")
+    try:
+        import gunicorn  # noqa: F401
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "", "wsgi:app"]
+    except ImportError:
+        cmd = [sys.executable, "-c",
+               f"import db, wsgi; db.init_db(); wsgi.app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    proc = subprocess.Popen(cmd, cwd=PROJECT_ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"Server exited with status {proc.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise SystemExit("Server did not start within 60 s")
+
+
+def writer_loop(db_file, rate, hold_ms, stop_at, stats):
+    """Monitor-style write transactions at ``rate``/s, each holding the lock ~``hold_ms``."""
+    import db
+    db.DB_FILE = db_file
+    rng = random.Random(1)
+    with db.connect() as conn:
+        ids = [row[0] for row in conn.execute(
+            "SELECT incident_no FROM incidents ORDER BY ts_epoch DESC LIMIT 500"
+        )]
+    if not ids:
+        return
+    while time.monotonic() < stop_at:
+        start = time.monotonic()
+        try:
+            with db.write_transaction("loadtest_writer") as conn:
+                conn.execute("UPDATE incidents SET active = active WHERE incident_no = ?", (rng.choice(ids),))
+                time.sleep(hold_ms / 1000)
+            stats["ok"] += 1
+        except Exception:
+            stats["failed"] += 1
+        time.sleep(max(0.0, 1 / rate - (time.monotonic() - start)))
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in PROFILES:
+            raise SystemExit(f"Unknown profile {name!r}; choose from {', '.join(PROFILES)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def run(base_url, users, duration, mix, speed, seed=0, writer=None):
+    """Run ``users`` virtual users for ``duration`` seconds. Returns the report dict."""
+    rng      = random.Random(seed)
+    results  = Results()
+    profiles = rng.choices(list(mix), weights=list(mix.values()), k=users)
+    before   = server_counters(base_url)
+    start    = time.monotonic()
+    stop_at  = start + duration
+
+    threads = [
+        threading.Thread(
+            target=VirtualUser(base_url, profile, results, speed, random.Random(rng.random())).run,
+            args=(stop_at,), name=f"user-{i}", daemon=True,
+        )
+        for i, profile in enumerate(profiles)
+    ]
+    writer_stats = {"ok": 0, "failed": 0}
+    if writer:
+        threads.append(threading.Thread(
+            target=writer_loop, args=(*writer, stop_at, writer_stats), name="writer", daemon=True,
+        ))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=duration + 60)
+    elapsed = time.monotonic() - start
+
+    after  = server_counters(base_url)
+    report = {
+        "url":      base_url,
+        "users":    users,
+        "profiles": {name: profiles.count(name) for name in mix},
+        "speed":    speed,
+        "duration": round(elapsed, 2),
+        **results.report(elapsed),
+        "server":   {name: after[name] - before.get(name, 0.0) for name in after} if after else None,
+    }
+    if writer:
+        import db
+        snapshot = db.write_stats.snapshot()
+        report["writer"] = {**writer_stats, **{k: snapshot[k] for k in (
+            "busy_retries", "wait_avg_ms", "wait_max_ms", "hold_avg_ms",
+        )}}
+    return report
+
+
+def print_summary(report):
+    print(f"{report['users']} users ({report['profiles']}), speed x{report['speed']}, "
+          f"{report['duration']} s: {report['requests']} requests, {report['rps']} req/s, "
+          f"error rate {report['error_rate']:.2%}, {report['busy_503']} busy (503)", file=sys.stderr)
+    print(f"{'endpoint':<26}{'req':>7}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'err':>8}", file=sys.stderr)
+    for name, row in report["endpoints"].items():
+        print(f"{name:<26}{row['requests']:>7}{row['rps']:>8.1f}"
+              f"{row['p50_ms'] or 0:>9.1f}{row['p95_ms'] or 0:>9.1f}{row['p99_ms'] or 0:>9.1f}"
+              f"{row['error_rate']:>8.2%}", file=sys.stderr)
+    if report.get("server"):
+        print("server: " + ", ".join(f"{k}={v:g}" for k, v in report["server"].items()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the traffic API with simulated users")
+    parser.add_argument("--url", default="http://127.0.0.1:5002")
+    parser.add_argument("--spawn", action="store_true",
+                        help="start a local API server (uses TRAFFIC_DB_FILE) on a free port")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"profile weights (default {DEFAULT_MIX})")
+    parser.add_argument("--speed", type=float, default=1.0, help="divide think times by this factor")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--writer-rate", type=float, default=0,
+                        help="synthetic monitor write transactions per second (needs --db)")
+    parser.add_argument("--writer-hold-ms", type=float, default=20)
+    parser.add_argument("--db", default=os.environ.get("TRAFFIC_DB_FILE"), help="database for --writer-rate")
+    parser.add_argument("--out", help="write the JSON report here")
+    args = parser.parse_args()
+
+    writer = None
+    if args.writer_rate > 0:
+        if not args.db:
+            raise SystemExit("--writer-rate needs --db (or TRAFFIC_DB_FILE)")
+        writer = (args.db, args.writer_rate, args.writer_hold_ms)
+
+    server, url = None, args.url
+    if args.spawn:
+        port   = _free_port()
+        server = spawn_server(port)
+        url    = f"http://127.0.0.1:{port}"
+    try:
+        report = run(url, args.users, args.duration, parse_mix(args.mix), args.speed, args.seed, writer)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print_summary(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
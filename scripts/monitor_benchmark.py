@@ -0,0 +1,226 @@
+"""
+Record live scraper responses, then replay them through full monitor cycles.
+
+  record  fetch every source once per cycle (CHP list page and per-row
+          POSTs, SDPD HTML, SDFD and SDSO JSON) and save the responses
+          under FIXTURES/cycle_NNN/
+  run     replay those fixtures through monitor.run_cycle() against a
+          fresh database, with deterministic geocoder, LLM and map stubs,
+          and report end-to-end cycle time plus a per-stage breakdown
+
+Replaying the recorded cycles in order reproduces the real churn between
+them (new incidents, detail updates, incidents closing), and every run
+of the same fixtures does identical work. Stubs can add a fixed latency
+(--geocode-ms, --llm-ms) to model the network calls they replace.
+
+    python scripts/monitor_benchmark.py record --fixtures fixtures/ --cycles 3 --interval 60
+    python scripts/monitor_benchmark.py run --fixtures fixtures/ --cycles 6 --out cycle.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+# Project root is one directory above scripts/ — needed for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("GPT_KEY", "benchmark")
+
+META_FILE = "meta.json"
+
+
+def _cycle_dirs(fixtures):
+    dirs = sorted(
+        os.path.join(fixtures, name) for name in os.listdir(fixtures)
+        if name.startswith("cycle_") and os.path.isdir(os.path.join(fixtures, name))
+    )
+    if not dirs:
+        raise SystemExit(f"No recorded cycles under {fixtures}; run `record` first.")
+    return dirs
+
+
+# ---------------------------------------------------------------------------
+# Record
+# ---------------------------------------------------------------------------
+
+def record(fixtures, cycles, interval):
+    from config import SDSO_API_URL
+    from monitor import _scrapers
+    from scrapers import sdso, transport
+
+    os.makedirs(fixtures, exist_ok=True)
+    with open(os.path.join(fixtures, META_FILE), "w") as f:
+        json.dump({"sdso_api_url": SDSO_API_URL, "recorded_at": time.time()}, f)
+
+    for cycle in range(cycles):
+        store = transport.record(os.path.join(fixtures, f"cycle_{cycle:03d}"))
+        sdso._last_fetch = 0  # bypass the 5-minute SDSO cache
+        for name, scrape in _scrapers().items():
+            print(f"cycle {cycle}: {name}: {len(scrape())} incidents", file=sys.stderr)
+        print(f"cycle {cycle}: {len(store)} responses recorded", file=sys.stderr)
+        if cycle + 1 < cycles:
+            time.sleep(interval)
+    transport.reset()
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+class Stubs:
+    """Deterministic stand-ins for the geocoder, LLM and map renderer."""
+
+    def __init__(self, geocode_ms=0.0, llm_ms=0.0):
+        self.geocode_ms = geocode_ms
+        self.llm_ms     = llm_ms
+        self._lock      = threading.Lock()
+        self.calls      = {"geocode": 0, "llm": 0, "map": 0}
+
+    def _count(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+
+    def geocode_location(self, query):
+        self._count("geocode")
+        time.sleep(self.geocode_ms / 1000)
+        digest = hashlib.md5(query.lower().encode()).digest()
+        return {
+            "Latitude":  32.55 + digest[0] / 255 * 0.65,
+            "Longitude": -117.30 + digest[1] / 255 * 0.40,
+            "precision": "street",
+        }
+
+    def generate_description(self, data):
+        self._count("llm")
+        time.sleep(self.llm_ms / 1000)
+        return f"{data.get('Type') or 'Incident'} at {data.get('Location') or 'unknown location'}.", 2
+
+    def run_map_generator(self, incident):
+        self._count("map")
+        incident["MapFilename"] = f"stub_{incident.get('Latitude', 0):.4f}_{incident.get('Longitude', 0):.4f}.png"
+
+    def install(self):
+        import llm
+        import monitor
+        monitor.geocode_location     = self.geocode_location
+        monitor.generate_description = self.generate_description
+        monitor.run_map_generator    = self.run_map_generator
+        llm.generate_description     = self.generate_description  # save_or_update imports it lazily
+
+
+def run(fixtures, cycles, geocode_ms, llm_ms, parse_workers):
+    """Replay ``cycles`` monitor cycles (looping over the recorded ones). Returns the report."""
+    import db
+    import monitor
+    from scrapers import parse_pool, sdso, transport
+
+    with open(os.path.join(fixtures, META_FILE)) as f:
+        meta = json.load(f)
+    sdso.SDSO_API_URL = meta.get("sdso_api_url")
+    recorded = _cycle_dirs(fixtures)
+
+    db.init_db()
+    stubs = Stubs(geocode_ms, llm_ms)
+    stubs.install()
+    monitor._last_map_eviction = monitor._last_archive = time.time()  # housekeeping is not under test
+    if parse_workers:
+        parse_pool.start(parse_workers)
+
+    active_set, results = monitor.ActiveSet(), []
+    try:
+        for cycle in range(cycles):
+            adapter = transport.replay(recorded[cycle % len(recorded)])
+            sdso._last_fetch = 0
+            calls_before  = dict(stubs.calls)
+            writes_before = db.write_stats.snapshot()["transactions"]
+
+            start = time.perf_counter()
+            changed, timings = monitor.run_cycle(active_set)
+            total = time.perf_counter() - start
+
+            results.append({
+                "cycle":        cycle,
+                "fixture":      os.path.basename(recorded[cycle % len(recorded)]),
+                "total_ms":     round(total * 1000, 2),
+                "changed":      changed,
+                "stages_ms":    {k: round(v * 1000, 2) for k, v in sorted(timings.items())},
+                "stub_calls":   {k: v - calls_before[k] for k, v in stubs.calls.items()},
+                "transactions": db.write_stats.snapshot()["transactions"] - writes_before,
+                "replay":       {"hits": adapter.hits, "misses": adapter.misses},
+            })
+            print(f"cycle {cycle}: {total * 1000:.0f} ms, {changed} changed", file=sys.stderr)
+    finally:
+        parse_pool.shutdown()
+        transport.reset()
+
+    return {
+        "fixtures":      os.path.abspath(fixtures),
+        "cycles":        results,
+        "summary":       _summarise(results),
+        "geocode_ms":    geocode_ms,
+        "llm_ms":        llm_ms,
+        "parse_workers": parse_workers,
+    }
+
+
+def _summarise(results):
+    """Mean and max per stage; the first cycle (cold DB, every incident new) is reported apart."""
+    def stats(rows):
+        if not rows:
+            return {}
+        stages = sorted({name for row in rows for name in row["stages_ms"]})
+        return {
+            "total_ms": {"mean": round(statistics.fmean(r["total_ms"] for r in rows), 2),
+                         "max":  max(r["total_ms"] for r in rows)},
+            "stages_ms": {
+                name: round(statistics.fmean(r["stages_ms"].get(name, 0.0) for r in rows), 2)
+                for name in stages
+            },
+        }
+
+    return {"first_cycle": stats(results[:1]), "steady_state": stats(results[1:])}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record/replay monitor cycle benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="save live responses from every source")
+    rec.add_argument("--fixtures", required=True)
+    rec.add_argument("--cycles", type=int, default=1)
+    rec.add_argument("--interval", type=float, default=60, help="seconds between recorded cycles")
+
+    rep = sub.add_parser("run", help="replay recorded cycles through the monitor")
+    rep.add_argument("--fixtures", required=True)
+    rep.add_argument("--cycles", type=int, default=5)
+    rep.add_argument("--geocode-ms", type=float, default=0.0, help="simulated geocoder latency")
+    rep.add_argument("--llm-ms", type=float, default=0.0, help="simulated LLM latency")
+    rep.add_argument("--parse-workers", type=int, default=0, help="HTML parse processes (0 = inline)")
+    rep.add_argument("--db", help="database to run against (default: a fresh temporary file)")
+    rep.add_argument("--out", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.fixtures, args.cycles, args.interval)
+        raise SystemExit(0)
+
+    # config derives every path from the database location, so set it before importing
+    workdir = tempfile.TemporaryDirectory()
+    os.environ["TRAFFIC_DB_FILE"] = args.db or os.path.join(workdir.name, "monitor_bench.db")
+
+    import logger
+    logger.configure(stream=sys.stderr, level="WARNING")
+    report = run(args.fixtures, args.cycles, args.geocode_ms, args.llm_ms, args.parse_workers)
+    text   = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    workdir.cleanup()
@@ -0,0 +1,58 @@
+"""
+Write .gz (and .br, if the brotli package is installed) siblings next to the
+compressible files in the built Svelte app, so the Flask static layer can
+serve them without compressing per request. Run after `npm run build`.
+"""
+
+import gzip
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip alone still covers every browser
+    brotli = None
+
+# Project root is one directory above scripts/
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIST_DIR     = os.path.join(PROJECT_ROOT, "traffic-app", "dist")
+sys.path.insert(0, PROJECT_ROOT)
+
+from static_files import COMPRESSIBLE  # noqa: E402  (the server only looks for these)
+
+MIN_SIZE     = 1024  # Not worth compressing tiny files
+
+
+def _write_if_smaller(path, data, original_size):
+    if len(data) >= original_size:
+        return False
+    with open(path, "wb") as f:
+        f.write(data)
+    return True
+
+
+def precompress(root=DIST_DIR):
+    written = 0
+    for dirpath, _dirs, filenames in os.walk(root):
+        for name in filenames:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < MIN_SIZE:
+                continue
+
+            written += _write_if_smaller(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0), len(data))
+            if brotli is not None:
+                written += _write_if_smaller(path + ".br", brotli.compress(data, quality=11), len(data))
+    return written
+
+
+if __name__ == "__main__":
+    root = sys.argv[1] if len(sys.argv) > 1 else DIST_DIR
+    if not os.path.isdir(root):
+        print(f"Build directory not found: {root}. Run `npm run build` first.")
+        sys.exit(1)
+    count = precompress(root)
+    print(f"Wrote {count} precompressed files under {root}" + ("" if brotli else " (brotli not installed: gzip only)"))
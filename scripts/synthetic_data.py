@@ -0,0 +1,273 @@
+"""
+Generate a realistic synthetic traffic database for benchmarks.
+
+Rows follow the shape of real data: sources and incident types are skewed
+the way the scrapers see them, timestamps cluster around rush hours,
+locations repeat (a few hundred freeway interchanges and streets carry most
+incidents), a minority of incidents collect likes and comments, and the
+geocode cache holds one row per distinct location query.
+
+Bulk loading bypasses the per-row triggers: counters are written directly,
+then the full-text and spatial indexes are rebuilt once by init_db().
+
+    python scripts/synthetic_data.py --incidents 1m --out bench_1m.db
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# Project root is one directory above scripts/ — needed for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import db  # noqa: E402
+from geocoding import GeocodingCache  # noqa: E402
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+SOURCES = [("CHP", 0.50), ("SDPD", 0.30), ("SDFD", 0.15), ("SDSO", 0.05)]
+TYPES = [
+    ("Traffic Collision", 0.32), ("Traffic Hazard", 0.18), ("Disabled Vehicle", 0.14),
+    ("Medical Emergency", 0.10), ("Fire", 0.05), ("Debris from Vehicle", 0.05),
+    ("Road Conditions", 0.04), ("Construction", 0.04), ("Maintenance", 0.03),
+    ("Hit and Run", 0.03), ("Animal Hazard", 0.02),
+]
+FREEWAYS = ["I-5", "I-8", "I-15", "I-805", "SR-52", "SR-54", "SR-56", "SR-94", "SR-125", "SR-163"]
+STREETS = [
+    "Friars Rd", "Mira Mesa Blvd", "Convoy St", "Genesee Ave", "Balboa Ave", "Clairemont Mesa Blvd",
+    "University Ave", "El Cajon Blvd", "Imperial Ave", "Garnet Ave", "Rosecrans St", "Sports Arena Blvd",
+    "Carmel Mountain Rd", "Black Mountain Rd", "Palomar Airport Rd", "La Jolla Village Dr",
+    "Washington St", "Market St", "Broadway", "Euclid Ave", "Federal Blvd", "Camino Del Rio S",
+]
+CITIES = {
+    "San Diego": ["Mission Valley", "Kearny Mesa", "Clairemont", "North Park", "Pacific Beach",
+                  "Mira Mesa", "Rancho Bernardo", "Point Loma", "Downtown", "City Heights"],
+    "Chula Vista": ["Eastlake", "Otay Ranch", "Downtown Chula Vista"],
+    "Oceanside": ["Fire Mountain", "Mission San Luis Rey"],
+    "Escondido": ["Old Escondido", "Felicita"],
+    "Carlsbad": ["La Costa", "Carlsbad Village"],
+    "El Cajon": ["Fletcher Hills", "Granite Hills"],
+}
+DETAIL_LINES = [
+    "2 VEHS INVOLVED", "BLKG #2 LN", "1141 ENRT", "TOW REQ", "VEH ON RHS", "MAJOR INJ", "MINOR INJ",
+    "UNK INJ", "CT NOTIFIED", "SIG ALERT ISSUED", "ALL LNS OPEN", "DEBRIS IN LNS", "FIRE ON SCENE",
+    "RP ADV", "PER RP", "LANES BLOCKED", "ENGINE ON SCENE", "VEH ROLLED OVER",
+]
+USERNAMES = ["commuter", "sdlocal", "roadwatch", "night_owl", "cyclist", "bus_rider", "truckdriver"]
+
+# Relative incident volume per hour of day: overnight lull, morning and evening peaks
+HOUR_WEIGHTS = [2, 1.5, 1, 1, 1.5, 3, 6, 9, 8, 6, 5, 5, 5.5, 5.5, 6, 7.5, 9, 9, 7, 5, 4, 3.5, 3, 2.5]
+
+LAT_RANGE = (32.55, 33.20)
+LON_RANGE = (-117.30, -116.90)
+
+LIKE_RATE     = 0.20  # share of incidents with at least one like
+COMMENT_RATE  = 0.05  # share of incidents with at least one comment
+DEVICE_POOL   = 50_000
+BATCH_SIZE    = 20_000
+
+
+def parse_size(text):
+    """'10k' / '1m' / '2500' -> incident count."""
+    text = str(text).lower().replace("_", "")
+    if text in SIZES:
+        return SIZES[text]
+    if text[-1:] in ("k", "m"):
+        return int(float(text[:-1]) * (1_000 if text[-1] == "k" else 1_000_000))
+    return int(text)
+
+
+def default_days(incidents):
+    """History length giving ~300 incidents/day, clamped to 7 days .. 10 years."""
+    return max(7, min(3650, incidents // 300))
+
+
+@contextmanager
+def using_db(path):
+    """Point db.py at ``path`` for the duration of the block."""
+    previous, db.DB_FILE = db.DB_FILE, path
+    try:
+        yield path
+    finally:
+        db.DB_FILE = previous
+
+
+class _Vocabulary:
+    """Weighted choices drawn from one seeded RNG."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.locations = [f"{fwy} {d} / {street}" for fwy in FREEWAYS for d in "NSEW" for street in STREETS]
+        self.locations += [f"{a} {d} / {b} {e}" for a in FREEWAYS for b in FREEWAYS if a != b
+                           for d, e in (("N", "E"), ("S", "W"))]
+        # Zipf-like popularity: a small set of interchanges carries most incidents
+        self.location_weights = [1 / (i + 1) ** 0.9 for i in range(len(self.locations))]
+        rng.shuffle(self.locations)
+        self.places = [(city, hood) for city, hoods in CITIES.items() for hood in hoods]
+
+    def pick(self, options):
+        values, weights = zip(*options)
+        return self.rng.choices(values, weights)[0]
+
+    def location(self):
+        return self.rng.choices(self.locations, self.location_weights)[0]
+
+    def timestamp(self, start, days):
+        day  = start + timedelta(days=self.rng.randrange(days))
+        hour = self.rng.choices(range(24), HOUR_WEIGHTS)[0]
+        return day.replace(hour=hour, minute=self.rng.randrange(60), second=self.rng.randrange(60))
+
+
+def _encode_vocabulary(conn, vocab):
+    """Add every value the generator can emit to ``lookups``; returns {(field, value): id}."""
+    values  = [("source", source) for source, _w in SOURCES] + [("type", name) for name, _w in TYPES]
+    values += [("city", city) for city in CITIES] + [("neighborhood", hood) for _c, hood in vocab.places]
+    values += [("location_desc", f"Near {location}") for location in vocab.locations]
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO lookups (field, value) VALUES (?, ?)", values)
+    return {(field, value): lookup_id for lookup_id, field, value in conn.execute(
+        "SELECT id, field, value FROM lookups"
+    )}
+
+
+def _incident_rows(vocab, ids, count, days, now, likes_out, comments_out):
+    """Yield incident tuples; like/comment rows for each incident go to the out lists."""
+    rng   = vocab.rng
+    start = (now - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    active_after = now - timedelta(hours=2)
+    for i in range(count):
+        ts = vocab.timestamp(start, days)
+        if ts > now:
+            ts = now - timedelta(seconds=rng.randrange(1, 7200))
+        source   = vocab.pick(SOURCES)
+        type_val = vocab.pick(TYPES)
+        location = vocab.location()
+        city, neighborhood = rng.choice(vocab.places)
+        incident_no = f"{source}{ts:%y%m%d}{i:08d}"
+        details  = rng.sample(DETAIL_LINES, rng.randint(1, 4))
+        likes    = rng.randint(1, 6) if rng.random() < LIKE_RATE else 0
+        comments = rng.randint(1, 3) if rng.random() < COMMENT_RATE else 0
+        for device in rng.sample(range(DEVICE_POOL), likes):
+            likes_out.append((f"device-{device:05d}", incident_no, f"{ts:%Y-%m-%d %H:%M:%S}"))
+        for n in range(comments):
+            comments_out.append((f"device-{rng.randrange(DEVICE_POOL):05d}", incident_no,
+                                 rng.choice(USERNAMES), f"Comment {n + 1} on {type_val.lower()}",
+                                 f"{ts + timedelta(minutes=5 * (n + 1)):%Y-%m-%d %H:%M:%S}"))
+        yield (
+            incident_no, f"{ts:%Y-%m-%d}", db.to_epoch(ts), ids["city", city],
+            ids["neighborhood", neighborhood], location, ids["location_desc", f"Near {location}"],
+            ids["type", type_val], db.encode_details(details),
+            f"{type_val} reported at {location} in {neighborhood}. {details[0].capitalize()}.",
+            rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE), "", likes,
+            1 if ts >= active_after else 0, ids["source", source],
+            rng.choice(["street", "intersection", "city"]), rng.randint(1, 5), comments,
+        )
+
+
+_INSERT_INCIDENT = """
+    INSERT OR IGNORE INTO incidents
+    (incident_no, date, ts_epoch, city_id, neighborhood_id, location, location_desc_id, type_id,
+     details, description, latitude, longitude, map_filename, likes, active, source_id,
+     geocode_precision, severity, comment_count)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _drop_derived(conn):
+    """Drop triggers and trigger-maintained indexes; init_db() recreates and backfills them."""
+    triggers = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")]
+    for name in triggers:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for table in ("incidents_rtree", "incidents_fts", "incidents_archive_fts"):
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def generate(path, incidents, days=None, seed=0, archive_after_days=None, progress=print):
+    """Create ``path`` with ``incidents`` synthetic incidents plus likes, comments and geocode rows.
+
+    Returns a dict of row counts. An existing file at ``path`` is replaced.
+    """
+    days = days or default_days(incidents)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    rng, now = random.Random(seed), datetime.now().replace(microsecond=0)
+    vocab    = _Vocabulary(rng)
+    started  = time.perf_counter()
+
+    with using_db(path):
+        db.init_db()
+    GeocodingCache(path)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous = OFF")
+    _drop_derived(conn)
+    likes, comments = [], []
+    rows = _incident_rows(vocab, _encode_vocabulary(conn, vocab), incidents, days, now, likes, comments)
+    done = 0
+    while done < incidents:
+        batch = [row for _, row in zip(range(BATCH_SIZE), rows)]
+        with conn:
+            conn.executemany(_INSERT_INCIDENT, batch)
+            conn.executemany("INSERT OR IGNORE INTO likes VALUES (?, ?, ?)", likes)
+            conn.executemany(
+                "INSERT INTO comments (device_uuid, incident_no, username, comment, timestamp) "
+                "VALUES (?, ?, ?, ?, ?)", comments,
+            )
+        done += len(batch)
+        likes.clear()
+        comments.clear()
+        if progress and (done % (BATCH_SIZE * 25) == 0 or done == incidents):
+            progress(f"  {done:,}/{incidents:,} incidents ({time.perf_counter() - started:.0f}s)")
+
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO geocode_cache VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (hashlib.md5(q.lower().strip().encode()).hexdigest(), q,
+                 rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE), "intersection", now.isoformat())
+                for q in (f"{loc}, San Diego, CA" for loc in vocab.locations)
+            ),
+        )
+    conn.close()
+
+    if progress:
+        progress("  rebuilding indexes...")
+    with using_db(path):
+        db.init_db()
+        if archive_after_days:
+            db.archive_incidents(archive_after_days, batch_size=10_000)
+
+    with sqlite3.connect(path) as conn:
+        counts = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("incidents", "incidents_archive", "likes", "comments", "geocode_cache")
+        }
+    counts["days"] = days
+    counts["seconds"] = round(time.perf_counter() - started, 1)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic traffic database")
+    parser.add_argument("--incidents", default="10k", help="row count: 10k, 100k, 1m, 10m or a number")
+    parser.add_argument("--days", type=int, help="history length (default: ~300 incidents/day)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--archive-after", type=int, metavar="DAYS",
+                        help="move closed incidents older than DAYS to incidents_archive")
+    parser.add_argument("--out", help="database path (default: bench_<size>.db in the project root)")
+    args = parser.parse_args()
+
+    count = parse_size(args.incidents)
+    out   = args.out or os.path.join(PROJECT_ROOT, f"bench_{args.incidents}.db")
+    print(f"Generating {count:,} incidents into {out}...")
+    print(json.dumps(generate(out, count, args.days, args.seed, args.archive_after), indent=2))
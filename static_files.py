@@ -0,0 +1,117 @@
+# static_files.py
+"""
+Static file serving for the built Svelte app and generated map images.
+
+- Fingerprinted build assets (assets/index-<hash>.js) and map PNGs never
+  change once written, so they are sent with a one-year immutable
+  Cache-Control and repeat visits never reach the server.
+- Everything else (index.html, icons) gets an ETag and must revalidate.
+- Precompressed .br / .gz siblings produced by scripts/precompress_static.py
+  are served when the client accepts them. Only COMPRESSIBLE types can have
+  them, so map PNGs are served without looking for siblings.
+- Files go out through Werkzeug's wsgi.file_wrapper (sendfile under
+  gunicorn) or X-Sendfile when USE_X_SENDFILE is enabled.
+- The build directory is indexed in memory so lookups don't stat the disk
+  on every request.
+"""
+
+import mimetypes
+import os
+import re
+import threading
+import time
+
+from flask import abort, request, send_file
+from werkzeug.security import safe_join
+
+IMMUTABLE_CACHE   = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE  = "no-cache"
+DEFAULT_CACHE     = "public, max-age=3600"
+
+# Vite emits "<name>-<8+ char hash>.<ext>"
+_FINGERPRINTED    = re.compile(r"-[A-Za-z0-9_-]{8,}\.(?:js|css|woff2?|png|jpe?g|svg|webp|avif)$")
+_ENCODINGS        = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE      = (".js", ".css", ".html", ".svg", ".json", ".txt", ".pbf", ".webmanifest")
+_RESCAN_INTERVAL  = 5.0  # seconds between re-indexing the build dir on a miss
+
+
+class StaticIndex:
+    """In-memory listing of a static directory, refreshed lazily on misses."""
+
+    def __init__(self, root):
+        self.root       = root
+        self._files     = frozenset()
+        self._scanned   = 0.0
+        self._lock      = threading.Lock()
+
+    def _scan(self):
+        files = set()
+        for dirpath, _dirs, filenames in os.walk(self.root):
+            rel_dir = os.path.relpath(dirpath, self.root)
+            for name in filenames:
+                rel = name if rel_dir == "." else f"{rel_dir}/{name}".replace(os.sep, "/")
+                files.add(rel)
+        self._files   = frozenset(files)
+        self._scanned = time.monotonic()
+
+    def __contains__(self, relpath):
+        if relpath in self._files:
+            return True
+        with self._lock:
+            if time.monotonic() - self._scanned > _RESCAN_INTERVAL:
+                self._scan()
+        return relpath in self._files
+
+
+def cache_control_for(relpath, immutable=False):
+    if immutable or _FINGERPRINTED.search(relpath):
+        return IMMUTABLE_CACHE
+    if relpath.endswith(".html"):
+        return REVALIDATE_CACHE
+    return DEFAULT_CACHE
+
+
+def _pick_encoding(relpath, variants):
+    """Return (served_relpath, content_encoding) honouring Accept-Encoding."""
+    accepted = request.accept_encodings
+    for encoding, suffix in variants:
+        if accepted[encoding]:
+            return relpath + suffix, encoding
+    return relpath, None
+
+
+def send_static(root, relpath, index=None, immutable=False):
+    """Send ``root/relpath`` with caching headers, ETag and precompressed variants.
+
+    Args:
+        root:      directory to serve from.
+        relpath:   path relative to root (already routed, may be untrusted).
+        index:     optional StaticIndex used instead of stat() for existence checks.
+        immutable: force the immutable Cache-Control (content-addressed files).
+    """
+    def has_file(path):
+        if index is not None:
+            return path in index
+        full = safe_join(root, path)
+        return full is not None and os.path.isfile(full)
+
+    if not has_file(relpath):
+        abort(404)
+
+    # Each sibling is checked once; other types never have any
+    variants = []
+    if relpath.endswith(COMPRESSIBLE):
+        variants = [(encoding, suffix) for encoding, suffix in _ENCODINGS if has_file(relpath + suffix)]
+    served, encoding = _pick_encoding(relpath, variants)
+    full_path = safe_join(root, served)
+    if full_path is None:
+        abort(404)
+
+    mimetype = mimetypes.guess_type(relpath)[0] or "application/octet-stream"
+    response = send_file(full_path, mimetype=mimetype, conditional=True, etag=True)
+    response.headers["Cache-Control"] = cache_control_for(relpath, immutable)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    if variants:
+        response.vary.add("Accept-Encoding")
+    return response
@@ -0,0 +1,390 @@
+# stats.py
+"""
+Incident statistics behind /api/incident_stats, computed per request or
+precomputed by the monitor as snapshots.
+
+Every figure in the response adds up across sources: counts, type and
+location tallies and chart buckets sum, and the historical average comes
+from per-source counts and sets of days. So a snapshot build reads each
+tier a handful of times grouped by source_id, then assembles the response
+for every date_filter and every subset of the known sources from those
+partials. Snapshots go to the ``stats_snapshots`` table; API workers keep
+them in memory and fall back to computing per request while none is fresh.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import combinations
+
+from dateutil.relativedelta import relativedelta
+
+import db
+from db import (
+    SECONDS_PER_DAY, connect, hour_of_week, incident_table, lookups, to_day, to_epoch,
+    write_transaction,
+)
+
+DATE_FILTERS     = (None, "day", "week", "month", "year")
+TOP_LOCATIONS    = 10
+_CHECK_INTERVAL  = 5.0  # seconds an API worker may serve snapshots before looking for a newer build
+
+
+def _date_clause(date_filter, now):
+    """(SQL condition, params, since) for ``date_filter``; (None, [], None) means all time."""
+    if date_filter == "day":
+        today = to_day(now)
+        return "day = ?", [today], today * SECONDS_PER_DAY
+    span = {
+        "week":  timedelta(days=7),
+        "month": timedelta(days=30),
+        "year":  relativedelta(months=12),
+    }.get(date_filter)
+    if span is None:
+        return None, [], None
+    since = to_epoch(now - span)
+    return "ts_epoch >= ?", [since], since
+
+
+def _source_clause(sources):
+    return [f"source_id IN ({','.join('?' for _ in sources)})"] if sources else []
+
+
+def _top_locations(counts):
+    """The TOP_LOCATIONS busiest locations, ties broken by name."""
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return dict(ranked[:TOP_LOCATIONS])
+
+
+# ---------------------------------------------------------------------------
+# Per-request computation
+# ---------------------------------------------------------------------------
+
+def compute_stats(cur, sources, date_filter, now=None):
+    """The /api/incident_stats response for source ids ``sources`` (empty = all)."""
+    now   = now or datetime.now()
+    today = to_day(now)
+
+    where_clauses = _source_clause(sources)
+    query_params  = list(sources or [])
+    clause, params, since = _date_clause(date_filter, now)
+    if clause:
+        where_clauses.append(clause)
+        query_params.extend(params)
+
+    # Only union in the archive when the range reaches archived dates
+    table = incident_table(cur, since)
+
+    def make_query(select_part, extra=None):
+        clauses = where_clauses[:]
+        if extra:
+            clauses.append(extra)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return f"{select_part}{where}", query_params[:]
+
+    # ── Stat counters ──────────────────────────────────────────────────────
+    hour_ago  = to_epoch(now - timedelta(hours=1))
+    events_today      = _count_with_source(
+        cur, incident_table(cur, today * SECONDS_PER_DAY), sources, "day = ?", [today],
+    )
+    events_last_hour  = _count_with_source(
+        cur, incident_table(cur, hour_ago), sources, "ts_epoch >= ?", [hour_ago],
+    )
+    q, p = make_query(f"SELECT COUNT(*) FROM {table}", "active = 1")
+    cur.execute(q, p); events_active = cur.fetchone()[0]
+
+    q, p = make_query(f"SELECT COUNT(*) FROM {table}")
+    cur.execute(q, p); total_incidents = cur.fetchone()[0]
+
+    q, p = make_query(f"SELECT type_id, COUNT(*) as count FROM {table}")
+    cur.execute(q + " GROUP BY type_id ORDER BY count DESC", p)
+    incidents_by_type = {lookups.value(row[0]): row[1] for row in cur.fetchall()}
+
+    q, p = make_query(f"SELECT location, COUNT(*) as count FROM {table}",
+                      "location IS NOT NULL AND location != ''")
+    cur.execute(q + f" GROUP BY location ORDER BY count DESC, location LIMIT {TOP_LOCATIONS}", p)
+    top_locations = {row[0]: row[1] for row in cur.fetchall()}
+
+    return {
+        "eventsToday":                 events_today,
+        "eventsLastHour":              events_last_hour,
+        "eventsActive":                events_active,
+        "totalIncidents":              total_incidents,
+        "incidentsByType":             incidents_by_type,
+        "topLocations":                top_locations,
+        "hourlyData":                  chart_counts(cur, sources, date_filter, now),
+        "historicalCurrentHourAverage": _historical_hour_average(cur, sources, now),
+        "generatedAt":                 time.time(),
+    }
+
+
+def _count_with_source(cur, table, sources, extra_cond, extra_params):
+    clauses = _source_clause(sources) + [extra_cond]
+    params  = list(sources or []) + extra_params
+    cur.execute(f"SELECT COUNT(*) FROM {table} WHERE {' AND '.join(clauses)}", params)
+    return cur.fetchone()[0]
+
+
+def chart_edges(date_filter, now):
+    """Epoch-second bucket boundaries for the chart: one more edge than buckets."""
+    if date_filter == "year":
+        first = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0) - relativedelta(months=11)
+        return [to_epoch(first + relativedelta(months=i)) for i in range(13)]
+    if date_filter in ("month", "week"):
+        days  = 30 if date_filter == "month" else 7
+        first = to_day(now) - (days - 1)
+        return [(first + i) * SECONDS_PER_DAY for i in range(days + 1)]
+    end = to_epoch(now)  # default: last 24h by hour, the final bucket ending now
+    return [end - (24 - i) * 3600 for i in range(25)]
+
+
+def chart_counts(cur, sources, date_filter, now=None):
+    """Bucket counts for the chart.
+
+    Each bucket is a range count on the ``ts_epoch`` index (``(source_id,
+    ts_epoch)`` when filtered by source) that never reads the rows; fetching
+    the window's timestamps to bin in Python reads every row and is about
+    ten times slower.
+    """
+    edges  = chart_edges(date_filter, now or datetime.now())
+    tables = _tier_tables(incident_table(cur, edges[0]))
+    where  = " AND ".join(_source_clause(sources) + ["ts_epoch >= ?", "ts_epoch < ?"])
+    count  = " + ".join(f"(SELECT COUNT(*) FROM {table} WHERE {where})" for table in tables)
+    counts = []
+    for start, end in zip(edges, edges[1:]):
+        cur.execute(f"SELECT {count}", (list(sources or []) + [start, end]) * len(tables))
+        counts.append(cur.fetchone()[0])
+    return counts
+
+
+def _historical_hour_average(cur, sources, now):
+    """Mean incidents in this hour of the week, over the days of this weekday that had any."""
+    hour         = hour_of_week(now)
+    weekday      = hour - hour % 24  # this weekday's first hour_of_week
+
+    # Equality and range on the leading column of the (hour_of_week, source_id, day) index
+    clauses = _source_clause(sources) + ["hour_of_week = ?"]
+    params  = list(sources or []) + [hour]
+
+    tiers = _tier_tables(incident_table(cur))  # all-time average spans both tiers
+    cur.execute(*_union_days(tiers, clauses, params, "COUNT(*)"))
+    total = cur.fetchone()[0] or 0
+
+    # Unary + keeps the planner on the hour-of-week range rather than (source_id, ts_epoch)
+    day_clauses = [f"+{clause}" for clause in _source_clause(sources)]
+    day_params  = list(sources or []) + [weekday, weekday + 23]
+    day_clauses.append("hour_of_week BETWEEN ? AND ?")
+
+    cur.execute(*_union_days(tiers, day_clauses, day_params, "COUNT(DISTINCT day)"))
+    unique_days = cur.fetchone()[0] or 1
+    return total / unique_days
+
+
+def _tier_tables(table):
+    """The tables behind ``table`` (incidents_all unions the live and archive tiers)."""
+    return ("incidents", "incidents_archive") if table == "incidents_all" else (table,)
+
+
+def _union_days(tables, clauses, params, aggregate):
+    """(SQL, params) aggregating ``day`` over the matching rows of ``tables``.
+
+    Selecting only ``day`` from each tier keeps the reads inside the
+    hour-of-week index; going through the incidents_all view would pull
+    every column of every matching row.
+    """
+    where = " AND ".join(clauses)
+    union = " UNION ALL ".join(f"SELECT day FROM {table} WHERE {where}" for table in tables)
+    return f"SELECT {aggregate} FROM ({union})", params * len(tables)
+
+
+# ---------------------------------------------------------------------------
+# Snapshots
+# ---------------------------------------------------------------------------
+
+class _Partials:
+    """Per-source_id tallies for every date_filter, read in one grouped pass per tier."""
+
+    def __init__(self, cur, now):
+        self.totals    = {f: Counter() for f in DATE_FILTERS}
+        self.active    = {f: Counter() for f in DATE_FILTERS}
+        self.types     = {f: {} for f in DATE_FILTERS}  # source_id -> Counter(type_id)
+        self.places    = {f: {} for f in DATE_FILTERS}  # source_id -> Counter(location)
+        self.last_hour = Counter()
+        self.hour      = Counter()  # incidents in this hour of the week
+        self.days      = {}         # source_id -> days of this weekday with any incident
+        self.charts    = {}         # (date_filter, source_id or None for all) -> buckets
+
+        windows = [_date_clause(f, now) for f in DATE_FILTERS]
+        sums    = ", ".join(f"SUM({clause})" if clause else "COUNT(*)" for clause, _p, _s in windows)
+        params  = [param for _c, window_params, _s in windows for param in window_params]
+        hour    = hour_of_week(now)
+        weekday = hour - hour % 24
+
+        for table in _tier_tables(incident_table(cur)):
+            cur.execute(
+                f"SELECT source_id, type_id, active, SUM(ts_epoch >= ?), {sums} FROM {table} "
+                "GROUP BY source_id, type_id, active",
+                [to_epoch(now - timedelta(hours=1))] + params,
+            )
+            for source_id, type_id, active, last_hour, *counts in cur.fetchall():
+                self.last_hour[source_id] += last_hour
+                for date_filter, count in zip(DATE_FILTERS, counts):
+                    self.totals[date_filter][source_id] += count
+                    if active == 1:
+                        self.active[date_filter][source_id] += count
+                    self.types[date_filter].setdefault(source_id, Counter())[type_id] += count
+
+            cur.execute(
+                f"SELECT source_id, location, {sums} FROM {table} "
+                "WHERE location IS NOT NULL AND location != '' GROUP BY source_id, location",
+                params,
+            )
+            for source_id, location, *counts in cur.fetchall():
+                for date_filter, count in zip(DATE_FILTERS, counts):
+                    self.places[date_filter].setdefault(source_id, Counter())[location] += count
+
+            cur.execute(
+                f"SELECT source_id, day, SUM(hour_of_week = ?) FROM {table} "
+                "WHERE hour_of_week BETWEEN ? AND ? GROUP BY source_id, day",
+                (hour, weekday, weekday + 23),
+            )
+            for source_id, day, count in cur.fetchall():
+                self.hour[source_id] += count
+                self.days.setdefault(source_id, set()).add(day)
+
+        self.source_ids = sorted(sid for sid in self.totals[None] if sid is not None)
+        for date_filter in (None, "week", "month", "year"):  # "day" charts the last 24h, like None
+            self.charts[date_filter, None] = chart_counts(cur, [], date_filter, now)
+            for source_id in self.source_ids:
+                self.charts[date_filter, source_id] = chart_counts(cur, [source_id], date_filter, now)
+
+    def stats(self, date_filter, source_ids, generated_at):
+        """Assemble the response for ``source_ids`` (None = every row, whatever its source)."""
+        def chosen(per_source):
+            return [value for sid, value in per_source.items() if source_ids is None or sid in source_ids]
+
+        types, places = Counter(), Counter()
+        for counts in chosen(self.types[date_filter]):
+            types.update(counts)
+        for counts in chosen(self.places[date_filter]):
+            places.update(counts)
+        chart_filter = None if date_filter == "day" else date_filter
+        chart = self.charts[chart_filter, None]
+        if source_ids is not None:
+            chart = [0] * len(chart)
+            for sid in source_ids:
+                chart = [total + count for total, count in zip(chart, self.charts[chart_filter, sid])]
+        days = set().union(*chosen(self.days))
+        return {
+            "eventsToday":                 sum(chosen(self.totals["day"])),
+            "eventsLastHour":              sum(chosen(self.last_hour)),
+            "eventsActive":                sum(chosen(self.active[date_filter])),
+            "totalIncidents":              sum(chosen(self.totals[date_filter])),
+            "incidentsByType":             {lookups.value(t): n for t, n in types.most_common() if n},
+            "topLocations":                _top_locations(+places),
+            "hourlyData":                  chart,
+            "historicalCurrentHourAverage": sum(chosen(self.hour)) / (len(days) or 1),
+            "generatedAt":                 generated_at,
+        }
+
+
+def build_snapshots(now=None):
+    """Stats for every date_filter and source subset, as {(date_filter, sources): stats}.
+
+    ``sources`` is None for the unfiltered stats, otherwise a frozenset of
+    source names (the empty set matches nothing, like an unknown source).
+    """
+    now, generated_at = now or datetime.now(), time.time()
+    with connect() as conn:
+        partials = _Partials(conn.cursor(), now)
+    names = {lookups.value(sid): sid for sid in partials.source_ids}
+
+    snapshots = {}
+    for date_filter in DATE_FILTERS:
+        snapshots[date_filter, None] = partials.stats(date_filter, None, generated_at)
+        for size in range(len(names) + 1):
+            for subset in combinations(sorted(names), size):
+                snapshots[date_filter, frozenset(subset)] = partials.stats(
+                    date_filter, {names[name] for name in subset}, generated_at,
+                )
+    return snapshots
+
+
+def _encode_key(date_filter, sources):
+    return date_filter or "", "*" if sources is None else ",".join(sorted(sources))
+
+
+def _decode_key(date_filter, sources):
+    return date_filter or None, None if sources == "*" else frozenset(filter(None, sources.split(",")))
+
+
+class StatsSnapshots:
+    """The latest snapshots in memory, shared across processes through ``stats_snapshots``.
+
+    The monitor publishes a full set after building it. Readers reload the
+    table when the change version moves, or, at most every _CHECK_INTERVAL
+    seconds, when a newer build has landed. Snapshots older than ``max_age``
+    are not served, so a stopped monitor means per-request stats, not old ones.
+    """
+
+    def __init__(self, change_channel=None, max_age=300):
+        self.change_channel = change_channel
+        self.max_age        = max_age
+        self._lock          = threading.Lock()
+        self._db_file       = None
+        self._stats         = {}
+        self._built_at      = None
+        self._version       = None
+        self._checked_at    = 0.0
+
+    def publish(self, snapshots):
+        """Store a build from build_snapshots() (monitor side). Returns how many were written."""
+        built_at = max((stats["generatedAt"] for stats in snapshots.values()), default=time.time())
+        rows = [
+            (*_encode_key(date_filter, sources), json.dumps(stats), built_at)
+            for (date_filter, sources), stats in snapshots.items()
+        ]
+        with write_transaction("stats_snapshots") as conn:
+            conn.execute("DELETE FROM stats_snapshots")
+            conn.executemany(
+                "INSERT INTO stats_snapshots (date_filter, sources, stats, built_at) VALUES (?, ?, ?, ?)", rows,
+            )
+        with self._lock:
+            self._db_file, self._stats, self._built_at = db.DB_FILE, snapshots, built_at
+        return len(rows)
+
+    def lookup(self, date_filter, sources):
+        """The snapshot for one request (source names, empty = all), or None if none is fresh."""
+        self._refresh()
+        with self._lock:
+            stats, built_at = self._stats, self._built_at
+        if built_at is None or time.time() - built_at > self.max_age:
+            return None
+        if date_filter not in DATE_FILTERS:
+            date_filter = None  # unknown filters mean all time, as in compute_stats
+        known = {name for (_f, subset) in stats if subset for name in subset}
+        key   = frozenset(name for name in sources if name in known) if sources else None
+        return stats.get((date_filter, key))
+
+    def _refresh(self):
+        version = self.change_channel.version() if self.change_channel is not None else None
+        now     = time.monotonic()
+        if self._db_file == db.DB_FILE and version == self._version and now - self._checked_at < _CHECK_INTERVAL:
+            return
+        with self._lock:
+            if self._db_file != db.DB_FILE:
+                self._stats, self._built_at = {}, None
+            self._db_file, self._version, self._checked_at = db.DB_FILE, version, now
+            try:
+                with connect() as conn:
+                    latest = conn.execute("SELECT MAX(built_at) FROM stats_snapshots").fetchone()[0]
+                    if latest is None or latest == self._built_at:
+                        return
+                    rows = conn.execute("SELECT date_filter, sources, stats FROM stats_snapshots").fetchall()
+            except sqlite3.Error:
+                return  # keep what we have; the caller computes stats itself if that is nothing
+            self._stats    = {_decode_key(f, s): json.loads(stats) for f, s, stats in rows}
+            self._built_at = latest
@@ -0,0 +1,132 @@
+# suggest.py
+"""
+In-memory typeahead index for the location, neighborhood and type filters.
+
+Each field keeps its distinct values in a sorted array of lowercase keys,
+one key per word start ("i-5 n / friars rd", "friars rd", "rd"), so a
+prefix lookup is two bisects plus a scan of the matching slice. Values
+are ranked by how many incidents use them.
+
+The index is built once from both incident tiers and then extended
+incrementally: those three columns are only written when a row is
+inserted, so whenever the monitor publishes a new change version the
+index reads just the live rows past the highest rowid it has seen.
+Rows the monitor later archives were already counted.
+"""
+
+import heapq
+import re
+import sqlite3
+import threading
+from bisect import bisect_left, insort
+
+SUGGEST_FIELDS = ("location", "neighborhood", "type")
+
+_WORD_START = re.compile(r"(?:^|(?<=[\s/(,-]))\w", re.UNICODE)
+_MEMO_SIZE  = 512  # cached (prefix, k) lookups per field, cleared on change
+
+
+def _prefix_keys(value):
+    """Lowercase keys for every word start in ``value``."""
+    text = value.lower()
+    return {text[m.start():] for m in _WORD_START.finditer(text)} or {text}
+
+
+class PrefixIndex:
+    """Distinct values with counts, searchable by word prefix."""
+
+    def __init__(self):
+        self._keys   = []  # sorted (key, value) pairs
+        self._counts = {}  # value -> occurrences
+        self._memo   = {}
+
+    def __len__(self):
+        return len(self._counts)
+
+    def add(self, value, count=1):
+        value = (value or "").strip()
+        if not value:
+            return
+        if value not in self._counts:
+            self._counts[value] = 0
+            for key in _prefix_keys(value):
+                insort(self._keys, (key, value))
+        self._counts[value] += count
+        self._memo.clear()
+
+    def top(self, prefix, k=10):
+        """Up to ``k`` (value, count) pairs whose words start with ``prefix``, most frequent first."""
+        prefix = prefix.strip().lower()
+        memo_key = (prefix, k)
+        hit = self._memo.get(memo_key)
+        if hit is not None:
+            return hit
+
+        lo = bisect_left(self._keys, (prefix,))
+        hi = bisect_left(self._keys, (prefix + "\U0010ffff",), lo)
+        values = {value for _key, value in self._keys[lo:hi]}
+        result = heapq.nsmallest(k, ((-self._counts[v], v) for v in values))
+        result = [(v, -negative) for negative, v in result]
+
+        if len(self._memo) >= _MEMO_SIZE:
+            self._memo.clear()
+        self._memo[memo_key] = result
+        return result
+
+
+class SuggestIndex:
+    """Prefix indexes for SUGGEST_FIELDS, kept current from the change channel."""
+
+    def __init__(self, db_file, change_channel=None):
+        self.db_file        = db_file
+        self.change_channel = change_channel
+        self._lock          = threading.Lock()
+        self._fields        = {field: PrefixIndex() for field in SUGGEST_FIELDS}
+        self._last_rowid    = 0
+        self._version       = None
+        self._built         = False
+
+    def refresh(self):
+        """Index rows added since the last refresh if the monitor published a change."""
+        version = self.change_channel.version() if self.change_channel is not None else None
+        if version is not None and version == self._version:
+            return 0
+        with self._lock:
+            if version is not None and version == self._version:
+                return 0
+            added = self._load_new_rows()
+            self._version = version
+            return added
+
+    def suggest(self, field, prefix, k=10):
+        """Top-``k`` values of ``field`` matching ``prefix``, as (value, count) pairs."""
+        if field not in self._fields:
+            raise KeyError(field)
+        self.refresh()
+        with self._lock:
+            return self._fields[field].top(prefix, k)
+
+    def _load_new_rows(self):
+        columns = ", ".join(SUGGEST_FIELDS)
+        with sqlite3.connect(self.db_file, timeout=30) as conn:
+            cur = conn.cursor()
+            archived = []
+            if not self._built:
+                cur.execute(f"SELECT {columns} FROM incidents_archive_decoded")
+                archived = cur.fetchall()
+            cur.execute(
+                f"SELECT id, {columns} FROM incidents_decoded WHERE id > ? ORDER BY id",
+                (self._last_rowid,),
+            )
+            rows = cur.fetchall()
+        for values in archived:
+            self._add(values)
+        for rowid, *values in rows:
+            self._add(values)
+            self._last_rowid = rowid
+        self._built = True
+        return len(archived) + len(rows)
+
+    def _add(self, values):
+        for field, value in zip(SUGGEST_FIELDS, values):
+            self._fields[field].add(value)
@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+import db
+import monitor
+
+
+class TestActiveSet(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._orig_db = db.DB_FILE
+        db.DB_FILE = monitor.DB_FILE = os.path.join(self.tmpdir.name, "active.db")
+        db.init_db()
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.executemany(
+                "INSERT INTO incidents (incident_no, date, active) VALUES (?, '2026-10-19', ?)",
+                [("A1", 1), ("A2", 1), ("A3", 1), ("OLD", 0)],
+            )
+
+    def tearDown(self):
+        db.DB_FILE = monitor.DB_FILE = self._orig_db
+        self.tmpdir.cleanup()
+
+    def _active(self):
+        with sqlite3.connect(db.DB_FILE) as conn:
+            return {r[0] for r in conn.execute("SELECT incident_no FROM incidents WHERE active = 1")}
+
+    def test_only_transitions_are_reported(self):
+        active_set = monitor.ActiveSet()
+        self.assertEqual(active_set.closed({"A1", "A2", "NEW"}), {"A3"})
+        active_set.update({"A1", "A2", "NEW"})
+        self.assertEqual(active_set.closed({"A1", "A2", "NEW"}), set())
+        self.assertEqual(active_set.closed({"A2"}), {"A1", "NEW"})
+
+    def test_mark_inactive_touches_only_closed_rows(self):
+        self.assertEqual(monitor._mark_inactive({"A3"}), 1)
+        self.assertEqual(self._active(), {"A1", "A2"})
+        self.assertEqual(monitor._mark_inactive({"A3", "OLD"}), 0)
+        self.assertEqual(monitor._mark_inactive(set()), 0)
+
+    def test_mark_inactive_chunks_large_sets(self):
+        closed = {f"X{i}" for i in range(monitor._IN_CHUNK * 2 + 1)} | {"A1"}
+        self.assertEqual(monitor._mark_inactive(closed), 1)
+        self.assertEqual(self._active(), {"A2", "A3"})
+
+    def test_final_descriptions_only_for_closed_incidents(self):
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.execute("UPDATE incidents SET details = ?", ('["[08:00] 2 veh tc"]',))
+        with mock.patch.object(monitor, "generate_description", return_value=("Cleared.", 1)) as gen:
+            self.assertEqual(monitor._generate_final_descriptions({"A2", "OLD"}), 1)
+        self.assertEqual(gen.call_count, 1)
+        with sqlite3.connect(db.DB_FILE) as conn:
+            desc = conn.execute("SELECT description FROM incidents WHERE incident_no = 'A2'").fetchone()[0]
+        self.assertEqual(desc, "Cleared.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+import db
+
+
+def _days_ago(days):
+    return datetime.now() - timedelta(days=days)
+
+
+class TestArchiveTier(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._orig_db = db.DB_FILE
+        db.DB_FILE = os.path.join(self.tmpdir.name, "archive.db")
+        db.init_db()
+
+    def tearDown(self):
+        db.DB_FILE = self._orig_db
+        self.tmpdir.cleanup()
+
+    def _insert(self, incident_no, days_ago, active=0, location="Friars Rd"):
+        when = _days_ago(days_ago)
+        type_id = db.lookups.id_for("type", "Traffic Collision")
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.execute(
+                "INSERT INTO incidents (incident_no, date, ts_epoch, location, type_id, active) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (incident_no, when.strftime("%Y-%m-%d"), db.to_epoch(when), location, type_id, active),
+            )
+
+    def _count(self, table):
+        with sqlite3.connect(db.DB_FILE) as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_moves_only_old_closed_incidents(self):
+        self._insert("OLD", 40)
+        self._insert("OLD-ACTIVE", 40, active=1)
+        self._insert("NEW", 1)
+
+        self.assertEqual(db.archive_incidents(30, batch_size=1), 1)
+        with sqlite3.connect(db.DB_FILE) as conn:
+            live = {r[0] for r in conn.execute("SELECT incident_no FROM incidents")}
+            cold = {r[0] for r in conn.execute("SELECT incident_no FROM incidents_archive")}
+        self.assertEqual(live, {"OLD-ACTIVE", "NEW"})
+        self.assertEqual(cold, {"OLD"})
+        self.assertEqual(self._count("incidents_all"), 3)
+
+    def test_table_selection_follows_the_requested_range(self):
+        self._insert("OLD", 40)
+        with sqlite3.connect(db.DB_FILE) as conn:
+            self.assertEqual(db.incident_table(conn.cursor()), "incidents")
+        db.archive_incidents(30)
+        with sqlite3.connect(db.DB_FILE) as conn:
+            cur = conn.cursor()
+            self.assertEqual(db.incident_table(cur, db.to_epoch(_days_ago(7))), "incidents")
+            self.assertEqual(db.incident_table(cur, db.to_epoch(_days_ago(365))), "incidents_all")
+            self.assertEqual(db.incident_table(cur), "incidents_all")
+
+    def test_feed_pages_continue_into_the_archive(self):
+        for i in range(5):
+            self._insert(f"OLD{i}", 40 + i)
+        for i in range(3):
+            self._insert(f"NEW{i}", 1 + i)
+        db.archive_incidents(30)
+
+        seen, cursor = [], None
+        while True:
+            page = db.read_incidents(limit=3, cursor=cursor)
+            if not page:
+                break
+            seen.extend(inc["incident_no"] for inc in page)
+            cursor = f"{page[-1]['timestamp']}|{page[-1]['incident_no']}"
+        self.assertEqual(seen, [f"NEW{i}" for i in range(3)] + [f"OLD{i}" for i in range(5)])
+
+    def test_archived_rows_stay_searchable_and_likeable(self):
+        self._insert("OLD", 40, location="Mission Gorge Rd")
+        self._insert("NEW", 1, location="Mission Valley")
+        db.archive_incidents(30)
+
+        results, _ = db.search_incidents("mission")
+        self.assertEqual(sorted(r["incident_no"] for r in results), ["NEW", "OLD"])
+
+        self.assertEqual(db.set_like("OLD", "dev-1"), (True, 1))
+        with sqlite3.connect(db.DB_FILE) as conn:
+            likes = conn.execute("SELECT likes FROM incidents_archive WHERE incident_no = 'OLD'").fetchone()[0]
+        self.assertEqual(likes, 1)
+
+    def test_live_matches_rank_before_archived_ones(self):
+        # "gorge" is rare in the archive index and in every live row, so the
+        # archived match has by far the better bm25 score of the two indexes
+        self._insert("OLD", 40, location="Mission Gorge Rd")
+        for i in range(3):
+            self._insert(f"OLD-FRIARS{i}", 40)
+            self._insert(f"NEW{i}", 1, location="Mission Gorge Rd")
+        db.archive_incidents(30)
+
+        first, cursor = db.search_incidents("gorge", limit=2)
+        rest, _ = db.search_incidents("gorge", limit=2, cursor=cursor)
+        order = [r["incident_no"] for r in first + rest]
+        self.assertEqual(sorted(order[:3]), ["NEW0", "NEW1", "NEW2"])
+        self.assertEqual(order[3:], ["OLD"])
+
+    def test_rearchiving_a_row_replaces_its_search_entry(self):
+        self._insert("OLD", 40, location="Mission Gorge Rd")
+        db.archive_incidents(30)
+        self._insert("OLD", 40, location="Mission Valley")  # scraped again after archiving
+        db.archive_incidents(30)
+
+        self.assertEqual(self._count("incidents_archive"), 1)
+        self.assertEqual(db.search_incidents("gorge")[0], [])
+        self.assertEqual([r["location"] for r in db.search_incidents("mission")[0]], ["Mission Valley"])
+        with sqlite3.connect(db.DB_FILE) as conn:
+            stale = conn.execute("SELECT rowid FROM incidents_archive_fts WHERE incidents_archive_fts MATCH 'gorge'")
+            self.assertEqual(stale.fetchall(), [])
+
+    def test_archived_maps_stay_referenced(self):
+        self._insert("OLD", 40)
+        self._insert("NEW", 1)
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.execute("UPDATE incidents SET map_filename = incident_no || '.png'")
+        db.archive_incidents(30)
+        self.assertEqual(db.referenced_map_filenames(), {"OLD.png", "NEW.png"})
+
+    def test_search_pagination_spans_both_tiers(self):
+        for i in range(4):
+            self._insert(f"OLD{i}", 40)
+            self._insert(f"NEW{i}", 1)
+        db.archive_incidents(30)
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = db.search_incidents("friars", limit=3, cursor=cursor)
+            seen.extend(r["incident_no"] for r in page)
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 8)
+        self.assertEqual(len(set(seen)), 8)
+
+    def test_restart_leaves_unchanged_views_alone(self):
+        statements, connect = [], db.connect
+
+        def traced(*args, **kwargs):
+            conn = connect(*args, **kwargs)
+            conn.set_trace_callback(statements.append)
+            return conn
+
+        with mock.patch.object(db, "connect", traced):
+            db.init_db()
+        self.assertIn("BEGIN IMMEDIATE", statements)
+        self.assertEqual([s for s in statements if " VIEW " in s], [])  # incidents_all and *_decoded
+
+
+if __name__ == "__main__":
+    unittest.main()
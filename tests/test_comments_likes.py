@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+import db
+
+
+class TestCommentsAndLikes(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._orig_db = db.DB_FILE
+        db.DB_FILE = os.path.join(self.tmpdir.name, "social.db")
+        db.init_db()
+        type_id = db.lookups.id_for("type", "Traffic Collision")
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.execute(
+                "INSERT INTO incidents (incident_no, date, ts_epoch, type_id) "
+                "VALUES ('A1', '2026-10-19', ?, ?)", (db.to_epoch("2026-10-19 08:00:00"), type_id),
+            )
+
+    def tearDown(self):
+        db.DB_FILE = self._orig_db
+        self.tmpdir.cleanup()
+
+    def _incident(self):
+        with sqlite3.connect(db.DB_FILE) as conn:
+            return conn.execute("SELECT likes, comment_count FROM incidents WHERE incident_no = 'A1'").fetchone()
+
+    def test_like_toggle_is_idempotent(self):
+        self.assertEqual(db.set_like("A1", "dev-1"), (True, 1))
+        self.assertEqual(db.set_like("A1", "dev-1"), (False, 1))
+        self.assertEqual(db.set_like("A1", "dev-2"), (True, 2))
+
+        self.assertEqual(db.set_like("A1", "dev-1", liked=False), (True, 1))
+        self.assertEqual(db.set_like("A1", "dev-1", liked=False), (False, 1))
+        self.assertEqual(self._incident()[0], 1)
+
+    def test_comment_limit_and_counter(self):
+        first, count = db.add_comment("A1", "dev-1", "sam", "first", "2026-10-19 08:01:00")
+        self.assertEqual((first["comment"], count), ("first", 1))
+        db.add_comment("A1", "dev-1", "sam", "second", "2026-10-19 08:02:00")
+
+        rejected, count = db.add_comment("A1", "dev-1", "sam", "third", "2026-10-19 08:03:00")
+        self.assertIsNone(rejected)
+        self.assertEqual(count, 2)
+        self.assertEqual(self._incident()[1], 2)
+
+    def test_keyset_pagination_and_preview(self):
+        for i in range(7):
+            db.add_comment("A1", f"dev-{i}", f"user{i}", f"c{i}", f"2026-10-19 08:0{i}:00")
+
+        page, cursor = db.read_comments("A1", limit=3)
+        self.assertEqual([c["comment"] for c in page], ["c4", "c5", "c6"])
+        page, cursor = db.read_comments("A1", limit=3, before_id=cursor)
+        self.assertEqual([c["comment"] for c in page], ["c1", "c2", "c3"])
+        page, cursor = db.read_comments("A1", limit=3, before_id=cursor)
+        self.assertEqual([c["comment"] for c in page], ["c0"])
+        self.assertIsNone(cursor)
+
+        incident = db.read_incidents(limit=1)[0]
+        self.assertEqual(incident["comment_count"], 7)
+        self.assertEqual([c["comment"] for c in incident["comments"]], ["c4", "c5", "c6"])
+
+    def test_comment_count_backfilled_on_migration(self):
+        # A text-layout table from before comment_count existed
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.execute("DROP TRIGGER comments_count_ai")
+            conn.execute("DROP TRIGGER comments_count_ad")
+            conn.execute("DROP VIEW incidents_all")
+            conn.execute("DROP TABLE incidents")
+            conn.execute(
+                "CREATE TABLE incidents (incident_no TEXT, date TEXT, timestamp TEXT, type TEXT, "
+                "details TEXT, likes INTEGER DEFAULT 0, PRIMARY KEY (incident_no, date))"
+            )
+            conn.execute(
+                "INSERT INTO incidents VALUES "
+                "('A1', '2026-10-19', '2026-10-19 08:00:00', 'Traffic Collision', '[]', 0)"
+            )
+            conn.execute("INSERT INTO comments (incident_no, username, comment) VALUES ('A1', 'x', 'y')")
+        db.init_db()
+        self.assertEqual(self._incident()[1], 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
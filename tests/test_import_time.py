@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Modules the scripts and unit tests import; none of them may pull in the
+# LLM client, Flask, HTTP/HTML libraries or geocoders at import time.
+LIGHT_MODULES  = ["config", "logger", "db", "tiles", "notify", "process_lock", "map_cache"]
+HEAVY_PACKAGES = {"openai", "flask", "flask_cors", "requests", "bs4", "geopy", "pytz"}
+IMPORT_BUDGET_US = 250_000  # generous: ~25 ms on a laptop
+
+
+def _import_profile(modules, env):
+    """Import ``modules`` in a fresh interpreter; return (cumulative µs per module, loaded packages)."""
+    code = (
+        f"import {', '.join(modules)}, sys\n"
+        "print(' '.join(sorted({m.split('.')[0] for m in sys.modules})))\n"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, cum, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cum.isdigit():
+            cumulative[name] = int(cum)
+    return cumulative, set(proc.stdout.split())
+
+
+class TestImportTime(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmpdir.name, "traffic_data.db")
+        self.env = {**os.environ, "TRAFFIC_DB_FILE": self.db_file}
+        self.env.pop("GPT_KEY", None)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_core_modules_import_light_and_fast(self):
+        cumulative, loaded = _import_profile(LIGHT_MODULES, self.env)
+
+        self.assertEqual(loaded & HEAVY_PACKAGES, set())
+        total = sum(cumulative.get(name, 0) for name in LIGHT_MODULES)
+        self.assertLess(total, IMPORT_BUDGET_US, f"core imports took {total / 1000:.1f} ms")
+
+    def test_import_does_not_touch_database(self):
+        _import_profile(LIGHT_MODULES, self.env)
+        self.assertFalse(os.path.exists(self.db_file))
+
+    def test_lazy_attributes_still_resolve(self):
+        code = "import config; assert config.app is config.get_app(); print(config.app.name)"
+        proc = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, env=self.env, capture_output=True, text=True,
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertEqual(proc.stdout.strip(), "config")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
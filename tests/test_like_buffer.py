@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+import db
+from like_buffer import LikeBuffer
+
+
+class TestLikeBuffer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._orig_db = db.DB_FILE
+        db.DB_FILE = os.path.join(self.tmpdir.name, "likes.db")
+        db.init_db()
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.execute(
+                "INSERT INTO incidents (incident_no, date, ts_epoch, details) "
+                "VALUES ('A1', '2026-10-19', ?, '[]')", (db.to_epoch("2026-10-19 08:00:00"),),
+            )
+        # Long interval: the tests drive flushes explicitly
+        self.buffer = LikeBuffer(db.DB_FILE, flush_interval=3600)
+
+    def tearDown(self):
+        self.buffer.close()
+        db.DB_FILE = self._orig_db
+        self.tmpdir.cleanup()
+
+    def _persisted(self):
+        with sqlite3.connect(db.DB_FILE) as conn:
+            likes = conn.execute("SELECT likes FROM incidents WHERE incident_no = 'A1'").fetchone()[0]
+            rows = conn.execute("SELECT COUNT(*) FROM likes").fetchone()[0]
+        return likes, rows
+
+    def test_optimistic_counts_before_flush(self):
+        self.assertEqual(self.buffer.set_like("A1", "dev-1"), (True, 1))
+        self.assertEqual(self.buffer.set_like("A1", "dev-2"), (True, 2))
+        self.assertEqual(self.buffer.set_like("A1", "dev-1"), (False, 2))
+        self.assertEqual(self._persisted(), (0, 0))
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(self._persisted(), (2, 2))
+        self.assertEqual(self.buffer.set_like("A1", "dev-3"), (True, 3))
+
+    def test_toggles_between_flushes_collapse(self):
+        self.buffer.set_like("A1", "dev-1")
+        self.buffer.set_like("A1", "dev-1", liked=False)
+        self.buffer.set_like("A1", "dev-2")
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self._persisted(), (1, 1))
+
+        self.assertEqual(self.buffer.set_like("A1", "dev-2", liked=False), (True, 0))
+        self.buffer.flush()
+        self.assertEqual(self._persisted(), (0, 0))
+
+    def test_overlay_reflects_pending_state(self):
+        self.buffer.set_like("A1", "dev-1")
+        incidents = [{"incident_no": "A1", "likes": 0, "liked_by_user": False}]
+        self.buffer.overlay(incidents, "dev-1")
+        self.assertEqual(incidents[0], {"incident_no": "A1", "likes": 1, "liked_by_user": True})
+
+    def test_failed_flush_is_retried(self):
+        self.buffer.set_like("A1", "dev-1")
+        good_file, self.buffer.db_file = self.buffer.db_file, os.path.join(self.tmpdir.name, "missing", "x.db")
+        self.assertEqual(self.buffer.flush(), 0)
+        self.buffer.db_file = good_file
+        self.assertEqual(self.buffer.set_like("A1", "dev-1"), (False, 1))
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self._persisted(), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
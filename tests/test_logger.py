@@ -0,0 +1,98 @@
+import io
+import json
+import logging
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+import logger
+
+
+class _Counted:
+    formatted = 0
+
+    def __str__(self):
+        _Counted.formatted += 1
+        return "counted"
+
+
+class TestLogger(unittest.TestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+        logger.configure(stream=self.stream, level="INFO")
+
+    def tearDown(self):
+        logger.configure(stream=sys.stdout, level=logger.LOG_LEVEL)
+
+    def _output(self):
+        logger.flush()
+        return self.stream.getvalue()
+
+    def test_safe_print_still_logs_at_info(self):
+        logger.safe_print("Monitor", "started", 3)
+        self.assertIn("INFO  traffic: Monitor started 3", self._output())
+
+    def test_disabled_levels_skip_formatting(self):
+        log = logger.get_logger("tests.levels")
+        _Counted.formatted = 0
+        log.debug("value %s", _Counted())
+        self.assertEqual(_Counted.formatted, 0)
+        log.info("value %s", _Counted())
+        output = self._output()
+        self.assertGreater(_Counted.formatted, 0)
+        self.assertIn("traffic.tests.levels: value counted", output)
+        self.assertEqual(output.count("value counted"), 1)
+
+    def test_sampling_keeps_every_nth_occurrence(self):
+        log = logger.get_logger("tests.sampling")
+        for i in range(10):
+            log.info("cache hit %d", i, extra={"sample": 5})
+        output = self._output()
+        self.assertIn("cache hit 0", output)
+        self.assertIn("cache hit 5", output)
+        self.assertEqual(output.count("cache hit"), 2)
+
+    def test_monitor_errors_are_errors_and_per_incident_messages_sampled(self):
+        import monitor
+        with mock.patch.object(monitor, "archive_incidents", side_effect=OSError("disk full")), \
+                mock.patch.object(monitor, "ARCHIVE_AFTER_DAYS", 30), mock.patch.object(monitor, "_last_archive", 0.0):
+            self.assertEqual(monitor._maybe_archive(), 0)
+        for _ in range(monitor._PER_INCIDENT["sample"]):  # any run of N holds exactly one kept record
+            monitor.process_and_save_incident({"Source": "CHP"})
+        output = self._output()
+        self.assertIn("ERROR traffic.monitor: Archive error: disk full", output)
+        self.assertEqual(output.count("No incident number found"), 1)
+
+    def test_json_formatter_includes_extra_fields(self):
+        record = logging.LogRecord("traffic.db", logging.INFO, __file__, 1, "saved %s", ("A1",), None)
+        record.incident_no = "A1"
+        record.source      = "CHP"
+        entry = json.loads(logger.JsonFormatter().format(record))
+        self.assertEqual(entry["msg"], "saved A1")
+        self.assertEqual(entry["level"], "INFO")
+        self.assertEqual(entry["logger"], "traffic.db")
+        self.assertEqual((entry["incident_no"], entry["source"]), ("A1", "CHP"))
+        self.assertNotIn("args", entry)
+
+    def test_logging_from_many_threads_does_not_lose_records(self):
+        import threading
+        log = logger.get_logger("tests.threads")
+
+        def worker(n):
+            for i in range(100):
+                log.info("t%d-%d", n, i)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self._output().count("traffic.tests.threads"), 800)
+
+
+if __name__ == "__main__":
+    unittest.main()
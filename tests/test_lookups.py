@@ -0,0 +1,155 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+import db
+import routes
+
+# The text layout used before dictionary encoding
+LEGACY_COLUMNS = """
+    incident_no TEXT, date TEXT, timestamp TEXT, city TEXT, neighborhood TEXT, location TEXT,
+    location_desc TEXT, type TEXT, details TEXT, description TEXT, latitude REAL, longitude REAL,
+    map_filename TEXT, likes INTEGER DEFAULT 0, comments TEXT DEFAULT '[]', active INTEGER DEFAULT 1,
+    source TEXT DEFAULT 'CHP', geocode_precision TEXT DEFAULT 'unknown', severity INTEGER DEFAULT NULL,
+    comment_count INTEGER DEFAULT 0, PRIMARY KEY (incident_no, date)
+"""
+
+
+def _legacy_row(incident_no, date, incident_type, neighborhood, details):
+    return (incident_no, date, f"{date} 08:00:00", "San Diego", neighborhood, "I-5 N / Friars Rd",
+            "Near Friars Rd", incident_type, details, "Two cars.", 32.76, -117.19, "", 0, "[]", 0, "CHP")
+
+
+class TestLegacyMigration(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir   = tempfile.TemporaryDirectory()
+        self._orig_db = db.DB_FILE
+        db.DB_FILE    = os.path.join(self.tmpdir.name, "legacy.db")
+        with sqlite3.connect(db.DB_FILE) as conn:
+            for table in ("incidents", "incidents_archive"):
+                conn.execute(f"CREATE TABLE {table} ({LEGACY_COLUMNS})")
+            insert = ("INSERT INTO {} (incident_no, date, timestamp, city, neighborhood, location, "
+                      "location_desc, type, details, description, latitude, longitude, map_filename, likes, "
+                      "comments, active, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+            conn.executemany(insert.format("incidents"), [
+                _legacy_row("A1", "2026-10-19", "Trfc Collision-1179", "Mission Valley",
+                            '["[8:01 AM] 2 VEHS", "[8:05 AM] BLKG #2 LN"]'),
+                _legacy_row("A2", "2026-10-19", "Request CalTrans Notify", "Mission Valley", "[]"),
+            ])
+            conn.execute(insert.format("incidents_archive"),
+                         _legacy_row("OLD", "2025-01-02", "Traffic Hazard", "Kearny Mesa", '["DEBRIS"]'))
+            conn.execute("CREATE VIEW incidents_all AS SELECT * FROM incidents UNION ALL SELECT * FROM incidents_archive")
+            conn.execute(
+                "CREATE VIRTUAL TABLE incidents_fts USING fts5(location, type, content='incidents', content_rowid='rowid')"
+            )
+            conn.execute("INSERT INTO incidents_fts (incidents_fts) VALUES ('rebuild')")
+        conn.close()
+        db.init_db()
+
+    def tearDown(self):
+        db.DB_FILE = self._orig_db
+        self.tmpdir.cleanup()
+
+    def test_tables_are_rebuilt_encoded(self):
+        with sqlite3.connect(db.DB_FILE) as conn:
+            for table in ("incidents", "incidents_archive"):
+                columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                self.assertTrue({"type_id", "source_id", "city_id", "neighborhood_id"} <= columns)
+                self.assertFalse({"type", "source", "comments"} & columns)
+            stored = conn.execute("SELECT details FROM incidents WHERE incident_no = 'A1'").fetchone()[0]
+        conn.close()
+        self.assertEqual(stored, "[8:01 AM] 2 VEHS\n[8:05 AM] BLKG #2 LN")
+
+    def test_reads_decode_names_and_normalise_types(self):
+        incidents = db.read_incidents(limit=10)
+        self.assertEqual([inc["incident_no"] for inc in incidents], ["A1", "OLD"])  # CalTrans row dropped
+        first = incidents[0]
+        self.assertEqual((first["type"], first["source"], first["city"]), ("Traffic Collision", "CHP", "San Diego"))
+        self.assertEqual(first["Details"], ["[8:01 AM] 2 VEHS", "[8:05 AM] BLKG #2 LN"])
+        self.assertNotIn("type_id", first)
+
+    def test_search_index_is_rebuilt_through_decoded_view(self):
+        results, _cursor = db.search_incidents("kearny")
+        self.assertEqual([row["incident_no"] for row in results], ["OLD"])
+        results, _cursor = db.search_incidents("collision")
+        self.assertEqual(results[0]["neighborhood"], "Mission Valley")
+        self.assertIn("<mark>Collision</mark>", results[0]["snippet"])
+
+
+class TestLookups(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir   = tempfile.TemporaryDirectory()
+        self._orig_db = db.DB_FILE
+        db.DB_FILE    = os.path.join(self.tmpdir.name, "lookups.db")
+        db.init_db()
+        self.client = routes.app.test_client()
+
+    def tearDown(self):
+        db.DB_FILE = self._orig_db
+        self.tmpdir.cleanup()
+
+    def _save(self, incident_no, incident_type="Trfc Collision-1183", source="SDPD"):
+        with mock.patch("llm.generate_description", return_value=("Desc.", 2)):
+            return db.save_or_update_incident({
+                "No.": incident_no, "Date": "2026-10-19", "Timestamp": "2026-10-19 08:00:00",
+                "Type": incident_type, "Source": source, "Neighborhood": "North Park",
+                "Location": "University Ave", "Details": ["Cross Street: 30th St"],
+            })
+
+    def _lookup_count(self):
+        with sqlite3.connect(db.DB_FILE) as conn:
+            return conn.execute("SELECT COUNT(*) FROM lookups").fetchone()[0]
+
+    def test_repeated_values_share_one_lookup_row(self):
+        self.assertTrue(self._save("S1"))
+        count = self._lookup_count()
+        self.assertTrue(self._save("S2"))
+        self.assertEqual(self._lookup_count(), count)
+        incident = db.read_incidents(limit=1, sources=["SDPD"])[0]
+        self.assertEqual((incident["type"], incident["neighborhood"]), ("Traffic Collision", "North Park"))
+        self.assertFalse(self._save("S3", incident_type="Request CalTrans Notify"))
+
+    def test_row_archived_between_read_and_write_is_reinserted(self):
+        self._save("S1")
+        real = db._incident_updates
+
+        def archive_meanwhile(*args):  # runs on the unlocked read, before the write lock
+            with sqlite3.connect(db.DB_FILE) as conn:
+                conn.execute("DELETE FROM incidents WHERE incident_no = 'S1'")
+            conn.close()
+            return real(*args)
+
+        with mock.patch.object(db, "_incident_updates", side_effect=archive_meanwhile), \
+                mock.patch("llm.generate_description", side_effect=AssertionError("kept description")):
+            self.assertTrue(db.save_or_update_incident({
+                "No.": "S1", "Date": "2026-10-19", "Timestamp": "2026-10-19 08:00:00",
+                "Type": "Trfc Collision-1183", "Source": "SDPD", "Neighborhood": "North Park",
+                "Location": "University Ave", "Details": ["Cross Street: 30th St", "Cleared"],
+            }))
+        incident = db.read_incidents(limit=1, sources=["SDPD"])[0]
+        self.assertEqual((incident["incident_no"], incident["neighborhood"]), ("S1", "North Park"))
+
+    def test_unknown_filter_values_match_nothing(self):
+        self._save("S1")
+        self.assertEqual(db.read_incidents(sources=["NOPE"]), [])
+        stats = self.client.get("/api/incident_stats?source=NOPE").get_json()
+        self.assertEqual(stats["totalIncidents"], 0)
+        stats = self.client.get("/api/incident_stats?source=SDPD").get_json()
+        self.assertEqual(stats["incidentsByType"], {"Traffic Collision": 1})
+
+    def test_values_added_by_another_process_are_picked_up(self):
+        db.lookups.ids("type", ["Fire"])  # warm the cache
+        with sqlite3.connect(db.DB_FILE) as conn:
+            lookup_id = conn.execute("INSERT INTO lookups (field, value) VALUES ('type', 'Fire')").lastrowid
+        self.assertEqual(db.lookups.value(lookup_id), "Fire")
+        self.assertEqual(db.lookups.ids("type", ["Fire", "Flood"]), [lookup_id, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import map_cache
+from map_cache import MapImageCache, cache_filename
+
+
+class FakeRenderer:
+    def __init__(self, size=100):
+        self.calls = []
+        self.size = size
+
+    def render(self, lon, lat, filename, zoom=16):
+        self.calls.append((lon, lat, zoom))
+        with open(filename, "wb") as f:
+            f.write(b"\0" * self.size)
+        return filename
+
+
+class TestMapImageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.renderer = FakeRenderer()
+        self.cache = MapImageCache(self.tmpdir.name, self.renderer, style="test-style", max_bytes=250)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_nearby_coordinates_share_one_image(self):
+        a = self.cache.get_or_render(32.715700, -117.161100)
+        b = self.cache.get_or_render(32.715710, -117.161090)
+        self.assertEqual(a, b)
+        self.assertEqual(len(self.renderer.calls), 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["hit_ratio"], 0.5)
+
+    def test_key_includes_zoom_and_style(self):
+        base = cache_filename(32.7157, -117.1611, 16, "a")
+        self.assertNotEqual(base, cache_filename(32.7157, -117.1611, 15, "a"))
+        self.assertNotEqual(base, cache_filename(32.7157, -117.1611, 16, "b"))
+        self.assertNotEqual(base, cache_filename(32.7200, -117.1611, 16, "a"))
+
+    def test_evict_removes_old_orphans_and_trims_lru(self):
+        names = [self.cache.get_or_render(32.70 + i * 0.01, -117.16) for i in range(4)]
+        old = time.time() - map_cache.ORPHAN_GRACE_S - 60
+        for i, name in enumerate(names):
+            os.utime(os.path.join(self.tmpdir.name, name), (old + i, old + i))
+
+        # names[0] is an orphan; the other three (300 bytes) exceed the 250 byte budget
+        evicted = self.cache.evict(referenced=set(names[1:]))
+
+        remaining = sorted(os.listdir(self.tmpdir.name))
+        self.assertEqual(remaining, sorted(names[2:]))
+        self.assertEqual(evicted, [names[1]])
+        self.assertEqual(self.cache.stats()["disk_bytes"], 200)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,57 @@
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import map_renderer
+from map_renderer import MapRenderer
+
+
+class TestMapRenderer(unittest.TestCase):
+    def setUp(self):
+        self.renderer = MapRenderer("token", max_workers=2)
+
+    def tearDown(self):
+        self.renderer.shutdown()
+
+    def test_identical_requests_are_coalesced(self):
+        release = threading.Event()
+        calls = []
+
+        def fake_save(lon, lat, token, filename, **kwargs):
+            calls.append(filename)
+            release.wait(5)
+            return filename
+
+        with mock.patch.object(map_renderer, "save_map_image", side_effect=fake_save):
+            first  = self.renderer.submit(-117.1611, 32.7157, "/tmp/a.png")
+            second = self.renderer.submit(-117.1611, 32.7157, "/tmp/b.png")
+            other  = self.renderer.submit(-117.2000, 32.7157, "/tmp/c.png")
+            release.set()
+
+            self.assertIs(first, second)
+            self.assertEqual(second.result(timeout=5), "/tmp/a.png")
+            self.assertEqual(other.result(timeout=5), "/tmp/c.png")
+        self.assertEqual(sorted(calls), ["/tmp/a.png", "/tmp/c.png"])
+
+    def test_pooled_session_is_reused(self):
+        with mock.patch.object(map_renderer, "save_map_image", side_effect=lambda *a, **k: a[3]) as save:
+            self.renderer.render(-117.1, 32.7, "/tmp/a.png")
+            self.renderer.render(-117.2, 32.8, "/tmp/b.png")
+        sessions = {call.kwargs["session"] for call in save.call_args_list}
+        self.assertEqual(len(sessions), 1)
+
+    def test_missing_token_raises(self):
+        renderer = MapRenderer(None)
+        try:
+            with self.assertRaises(RuntimeError):
+                renderer.render(-117.1, 32.7, "/tmp/a.png")
+        finally:
+            renderer.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,149 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+import metrics
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = metrics.Registry()
+        self.tmpdir   = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_counter_and_histogram_exposition(self):
+        rows = self.registry.counter("t_rows_total", "Rows.", ["source"])
+        rows.inc(3, source="CHP")
+        rows.inc(source="CHP")
+        latency = self.registry.histogram("t_seconds", "Latency.", buckets=(0.1, 1.0))
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(5)
+
+        text = metrics.render([({"process": "monitor"}, self.registry.snapshot())])
+        self.assertIn("# TYPE t_rows_total counter", text)
+        self.assertIn('t_rows_total{process="monitor",source="CHP"} 4', text)
+        self.assertIn('t_seconds_bucket{process="monitor",le="0.1"} 1', text)
+        self.assertIn('t_seconds_bucket{process="monitor",le="1.0"} 2', text)
+        self.assertIn('t_seconds_bucket{process="monitor",le="+Inf"} 3', text)
+        self.assertIn('t_seconds_count{process="monitor"} 3', text)
+        self.assertIn('t_seconds_sum{process="monitor"} 5.55', text)
+
+    def test_instruments_are_shared_by_name(self):
+        a = self.registry.counter("t_total", "T.")
+        self.assertIs(self.registry.counter("t_total", "T."), a)
+
+    def test_collectors_and_label_escaping(self):
+        self.registry.collector(lambda: [("t_gauge", "gauge", "G.", [({"path": 'a"b'}, 2)])])
+        self.registry.collector(lambda: 1 / 0)  # ignored
+        text = metrics.render([({"process": "api"}, self.registry.snapshot())])
+        self.assertIn('t_gauge{process="api",path="a\\"b"} 2', text)
+
+    def test_families_from_two_processes_are_merged(self):
+        self.registry.counter("t_total", "T.").inc()
+        other = metrics.Registry()
+        other.counter("t_total", "T.").inc(2)
+        text = metrics.render([({"process": "api"}, self.registry.snapshot()), ({"process": "monitor"}, other.snapshot())])
+        self.assertEqual(text.count("# TYPE t_total counter"), 1)
+        self.assertIn('t_total{process="api"} 1', text)
+        self.assertIn('t_total{process="monitor"} 2', text)
+
+    def _dump_as(self, name, pid, role):
+        path = os.path.join(self.tmpdir.name, name)
+        self.registry.dump(path)
+        with open(path) as f:
+            state = json.load(f)
+        state["pid"], state["role"] = pid, role
+        with open(path, "w") as f:
+            json.dump(state, f)
+        return path
+
+    def test_exposition_merges_the_dumps_of_live_processes(self):
+        self.registry.counter("t_dumped_total", "D.").inc(7)
+        # Our own dump is skipped (same process already reports live values)
+        self._dump_as("api-self.json", os.getpid(), "api")
+        self.assertNotIn("t_dumped_total", metrics.exposition(self.tmpdir.name))
+
+        other  = os.getppid()
+        exited = subprocess.Popen([sys.executable, "-c", ""])
+        exited.wait()
+        self._dump_as("api-other.json", other, "api")
+        gone = self._dump_as("api-exited.json", exited.pid, "api")
+        text = metrics.exposition(self.tmpdir.name)
+        self.assertIn(f't_dumped_total{{process="api",pid="{other}"}} 7', text)
+        self.assertIn(f'traffic_metrics_snapshot_age_seconds{{process="api",pid="{other}"}}', text)
+        self.assertNotIn(f'pid="{exited.pid}"', text)
+        self.assertFalse(os.path.exists(gone))  # a recycled worker's dump is cleaned up
+        self.assertIsInstance(metrics.exposition(os.path.join(self.tmpdir.name, "missing")), str)
+
+    def test_publish_names_the_dump_after_the_process(self):
+        metrics.publish(os.path.join(self.tmpdir.name, "dumps"))
+        name = f"{metrics.process_role}-{os.getpid()}.json"
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir.name, "dumps", name)))
+
+    def test_recording_is_cheap(self):
+        counter   = self.registry.counter("t_hot_total", "Hot.", ["source"])
+        histogram = self.registry.histogram("t_hot_seconds", "Hot.", ["source"])
+        start = time.perf_counter()
+        for _ in range(20000):
+            counter.inc(source="CHP")
+            histogram.observe(0.02, source="CHP")
+        per_pair = (time.perf_counter() - start) / 20000
+        self.assertLess(per_pair, 20e-6)
+        self.assertEqual(counter.value(source="CHP"), 20000)
+
+
+class TestWriteMetrics(unittest.TestCase):
+    def test_write_transactions_are_timed(self):
+        import db
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "m.db")
+            before = db.DB_WRITE_HOLD.count(label="metrics_test")
+            with db.write_transaction("metrics_test", db_file=path) as conn:
+                conn.execute("CREATE TABLE t (x)")
+            self.assertEqual(db.DB_WRITE_HOLD.count(label="metrics_test"), before + 1)
+            self.assertGreater(db.DB_WRITE_WAIT.count(label="metrics_test"), 0)
+
+
+class TestBusyErrors(unittest.TestCase):
+    def setUp(self):
+        import db
+        import routes
+        self.routes = routes
+        self.client = routes.app.test_client()
+        # The stats snapshots are read through db.connect(), not the patched routes.connect
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        patch = mock.patch.object(db, "DB_FILE", os.path.join(self.tmpdir.name, "busy.db"))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def _get_stats(self, error):
+        with mock.patch.object(self.routes, "connect", side_effect=error):
+            return self.client.get("/api/incident_stats")
+
+    def test_locked_database_is_a_retryable_503(self):
+        before   = self.routes.DB_BUSY_ERRORS.value(endpoint="get_incident_stats")
+        response = self._get_stats(sqlite3.OperationalError("database is locked"))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "1")
+        self.assertEqual(self.routes.DB_BUSY_ERRORS.value(endpoint="get_incident_stats"), before + 1)
+
+    def test_other_database_errors_are_500(self):
+        response = self._get_stats(sqlite3.OperationalError("no such table: incidents"))
+        self.assertEqual(response.status_code, 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
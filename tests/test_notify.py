@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import notify
+from notify import ChangeChannel
+
+
+class TestChangeChannel(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "traffic.db.changes")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_missing_file_is_version_zero(self):
+        self.assertEqual(ChangeChannel(self.path).state(), (0, None))
+
+    def test_reader_sees_publisher_after_throttle(self):
+        monitor, api = ChangeChannel(self.path), ChangeChannel(self.path)
+        self.assertEqual(api.version(), 0)
+
+        self.assertEqual(monitor.publish(), 1)
+        self.assertEqual(monitor.publish(), 2)
+
+        # Within the read interval the API worker keeps its cached value
+        self.assertEqual(api.version(), 0)
+        with mock.patch.object(notify, "_READ_INTERVAL", 0):
+            self.assertEqual(api.version(), 2)
+            self.assertIsNotNone(api.state()[1])
+
+    def test_corrupt_file_reads_as_zero(self):
+        with open(self.path, "w") as f:
+            f.write("{not json")
+        self.assertEqual(ChangeChannel(self.path).version(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,60 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+from scrapers import parse_pool
+from scrapers.chp import _parse_incident_table
+from scrapers.sdpd import _parse_sdpd_table
+
+SDPD_HTML = """
+<table id="myDataTable"><thead><tr><th>Date</th></tr></thead><tbody>
+<tr><td>2026-10-19 08:15:00</td><td>TRAFFIC ACCIDENT</td><td>Central</td><td>Downtown</td><td>100 BROADWAY</td></tr>
+<tr><td>short row</td></tr>
+</tbody></table>
+"""
+
+CHP_HTML = """
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="abc123" />
+<table id="gvIncidents">
+<tr><th>No.</th><th>Time</th><th>Type</th><th>Location</th></tr>
+<tr><td>0101</td><td>8:15 AM</td><td>Trfc Collision</td><td>I5 N / Main St</td></tr>
+</table>
+"""
+
+
+class TestParsers(unittest.TestCase):
+    def test_sdpd_table(self):
+        incidents = _parse_sdpd_table(SDPD_HTML)
+        self.assertEqual(len(incidents), 1)
+        self.assertEqual(incidents[0]["Location"], "100 BROADWAY")
+        self.assertEqual(incidents[0]["Date"], "2026-10-19")
+        self.assertTrue(incidents[0]["No."].startswith("SDPD-"))
+
+    def test_missing_tables(self):
+        self.assertIsNone(_parse_sdpd_table("<html></html>"))
+        self.assertIsNone(_parse_incident_table("<html></html>"))
+
+    def test_chp_table(self):
+        headers, rows, viewstate = _parse_incident_table(CHP_HTML)
+        self.assertEqual(headers, ["No.", "Time", "Type", "Location"])
+        self.assertEqual(rows, [["0101", "8:15 AM", "Trfc Collision", "I5 N / Main St"]])
+        self.assertEqual(viewstate, "abc123")
+
+
+class TestParsePool(unittest.TestCase):
+    def tearDown(self):
+        parse_pool.shutdown()
+
+    def test_runs_inline_without_pool(self):
+        self.assertEqual(parse_pool.run(_parse_sdpd_table, SDPD_HTML), _parse_sdpd_table(SDPD_HTML))
+
+    def test_pool_matches_inline(self):
+        parse_pool.start(1)
+        self.assertEqual(parse_pool.run(_parse_sdpd_table, SDPD_HTML), _parse_sdpd_table(SDPD_HTML))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,168 @@
+import gzip
+import math
+import os
+import struct
+import sys
+import tempfile
+import unittest
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pmtiles_map
+from pmtiles_map import PMTilesArchive, decode_tile, render_map, zxy_to_tileid
+
+
+# ---------------------------------------------------------------------------
+# Fixture builders (just enough of MVT + PMTiles v3 to exercise the reader)
+# ---------------------------------------------------------------------------
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte, value = value & 0x7F, value >> 7
+        out.append(byte | (0x80 if value else 0))
+        if not value:
+            return bytes(out)
+
+
+def _msg(number, payload):
+    return _varint((number << 3) | 2) + _varint(len(payload)) + payload
+
+
+def _zz(v):
+    return (v << 1) ^ (v >> 31)
+
+
+def _geometry(points, close):
+    cmds = [(1 << 3) | 1, _zz(points[0][0]), _zz(points[0][1])]
+    cmds.append((len(points) - 1 << 3) | 2)
+    px, py = points[0]
+    for x, y in points[1:]:
+        cmds.extend([_zz(x - px), _zz(y - py)])
+        px, py = x, y
+    if close:
+        cmds.append((1 << 3) | 7)
+    return cmds
+
+
+def _layer(name, geom_type, points, kind=None):
+    tags = [0, 0] if kind else []
+    feature = (
+        _msg(2, b"".join(_varint(t) for t in tags))
+        + _varint(3 << 3) + _varint(geom_type)
+        + _msg(4, b"".join(_varint(c) for c in _geometry(points, geom_type == 3)))
+    )
+    body = _varint(15 << 3) + _varint(2) + _msg(1, name.encode()) + _msg(2, feature)
+    if kind:
+        body += _msg(3, b"kind") + _msg(4, _msg(1, kind.encode()))
+    return _msg(3, body + _varint(5 << 3) + _varint(4096))
+
+
+def _directory(entries):
+    out = _varint(len(entries))
+    last = 0
+    for tile_id, *_ in entries:
+        out += _varint(tile_id - last)
+        last = tile_id
+    out += b"".join(_varint(run) for _, run, _, _ in entries)
+    out += b"".join(_varint(length) for _, _, length, _ in entries)
+    out += b"".join(_varint(offset + 1) for _, _, _, offset in entries)
+    return gzip.compress(out)
+
+
+def build_archive(path, z, x, y, tile):
+    tile_data = gzip.compress(tile)
+    root = _directory([(zxy_to_tileid(z, x, y), 1, len(tile_data), 0)])
+    root_offset = 127
+    data_offset = root_offset + len(root)
+    header = b"PMTiles" + bytes([3]) + struct.pack(
+        "<11Q", root_offset, len(root), 0, 0, data_offset, 0, data_offset, len(tile_data), 1, 1, 1,
+    ) + struct.pack("<6B", 1, 2, 2, 1, z, z) + struct.pack("<4i", 0, 0, 0, 0) + bytes([z]) + struct.pack("<2i", 0, 0)
+    assert len(header) == 127
+    with open(path, "wb") as f:
+        f.write(header + root + tile_data)
+
+
+def _png_pixels(png):
+    """Decode our own (unfiltered, RGB) PNG output back into rows."""
+    pos, idat = 8, b""
+    while pos < len(png):
+        length, = struct.unpack(">I", png[pos:pos + 4])
+        tag = png[pos + 4:pos + 8]
+        if tag == b"IHDR":
+            width, height = struct.unpack(">II", png[pos + 8:pos + 16])
+        elif tag == b"IDAT":
+            idat += png[pos + 8:pos + 8 + length]
+        pos += 12 + length
+    raw = zlib.decompress(idat)
+    stride = width * 3 + 1
+    return width, height, [raw[r * stride + 1:(r + 1) * stride] for r in range(height)]
+
+
+class TestPMTilesMap(unittest.TestCase):
+    Z, X, Y = 14, 2860, 6614  # Downtown San Diego
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "test.pmtiles")
+        tile = (
+            _layer("water", 3, [(0, 0), (4096, 0), (4096, 2048), (0, 2048)])
+            + _layer("roads", 2, [(0, 2600), (4096, 2600)], kind="highway")
+        )
+        build_archive(self.path, self.Z, self.X, self.Y, tile)
+        self.archive = PMTilesArchive(self.path)
+
+    def tearDown(self):
+        self.archive.close()
+        self.tmpdir.cleanup()
+
+    def test_tileid_matches_spec_examples(self):
+        self.assertEqual(zxy_to_tileid(0, 0, 0), 0)
+        self.assertEqual(zxy_to_tileid(1, 0, 0), 1)
+        self.assertEqual(zxy_to_tileid(1, 0, 1), 2)
+        self.assertEqual(zxy_to_tileid(1, 1, 1), 3)
+        self.assertEqual(zxy_to_tileid(1, 1, 0), 4)
+        self.assertEqual(zxy_to_tileid(2, 0, 0), 5)
+
+    def test_reads_and_decodes_tile(self):
+        self.assertIsNone(self.archive.get_tile(self.Z, self.X + 1, self.Y))
+        layers = decode_tile(self.archive.get_tile(self.Z, self.X, self.Y))
+        extent, features = layers["roads"]
+        self.assertEqual(extent, 4096)
+        geom_type, parts, props = features[0]
+        self.assertEqual(geom_type, pmtiles_map.GEOM_LINESTRING)
+        self.assertEqual(parts, [[(0, 2600), (4096, 2600)]])
+        self.assertEqual(props, {"kind": "highway"})
+
+    def test_render_map_draws_water_road_and_pin(self):
+        # Centre of the fixture tile at its own zoom
+        n = 2 ** self.Z
+        lon = (self.X + 0.5) / n * 360.0 - 180.0
+        lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (self.Y + 0.5) / n))))
+
+        png = render_map(self.archive, lon, lat, zoom=self.Z, size=(200, 200))
+        self.assertTrue(png.startswith(b"\x89PNG"))
+        width, height, rows = _png_pixels(png)
+        self.assertEqual((width, height), (200, 200))
+
+        def pixel(x, y):
+            return tuple(rows[y][x * 3:x * 3 + 3])
+
+        palette = pmtiles_map.PALETTES["light"]
+        self.assertEqual(pixel(10, 10), palette["water"])
+        self.assertEqual(pixel(10, 169), palette["highway"])  # 2600 / 4096 * 512 - 156
+        self.assertEqual(pixel(100, 100), pmtiles_map.PIN_COLOR)
+
+    def test_save_map_image_writes_png(self):
+        out = os.path.join(self.tmpdir.name, "out.png")
+        written = pmtiles_map.save_map_image(-117.16, 32.71, filename=out, zoom=16, pmtiles_path=self.path)
+        self.assertEqual(written, out)
+        with open(out, "rb") as f:
+            png = f.read()
+        _, _, rows = _png_pixels(png)
+        self.assertEqual(tuple(rows[0][:3]), pmtiles_map.PALETTES["light"]["background"])  # day or night
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
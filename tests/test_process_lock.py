@@ -0,0 +1,66 @@
+import os
+import signal
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+from monitor import MonitorSupervisor
+from process_lock import SingletonLock
+
+
+class TestSingletonLock(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "monitor.lock")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_second_holder_is_refused_until_release(self):
+        first, second = SingletonLock(self.path), SingletonLock(self.path)
+        self.assertTrue(first.acquire())
+        self.assertEqual(first.holder_pid(), os.getpid())
+        self.assertFalse(second.acquire())
+
+        first.release()
+        self.assertTrue(second.acquire())
+        second.release()
+
+    def test_context_manager_raises_when_held(self):
+        with SingletonLock(self.path):
+            with self.assertRaises(RuntimeError):
+                with SingletonLock(self.path):
+                    pass
+
+
+class TestMonitorSupervisor(unittest.TestCase):
+    def test_restarts_a_monitor_that_exits(self):
+        supervisor = MonitorSupervisor([sys.executable, "-c", "pass"], poll_interval=0.01, restart_delay=0.01)
+        supervisor.start()
+        self.addCleanup(supervisor.stop)
+        deadline = time.monotonic() + 10
+        while supervisor.restarts < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertGreaterEqual(supervisor.restarts, 2)
+
+    def test_exit_is_seen_after_another_handler_reaped_it(self):
+        supervisor = MonitorSupervisor([sys.executable, "-c", "pass"], poll_interval=60)
+        supervisor.start()
+        self.addCleanup(supervisor.stop)
+        os.waitpid(supervisor._proc.pid, 0)  # What gunicorn's SIGCHLD handler does
+        self.assertIsNotNone(supervisor._proc.poll())
+
+    def test_stop_sends_sigterm(self):
+        supervisor = MonitorSupervisor([sys.executable, "-c", "import time; time.sleep(60)"], poll_interval=0.01)
+        supervisor.start()
+        supervisor.stop(timeout=10)
+        self.assertEqual(supervisor._proc.returncode, -signal.SIGTERM)
+        self.assertEqual(supervisor.restarts, 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
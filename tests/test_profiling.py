@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+import db
+import profiling
+import routes
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir    = tempfile.TemporaryDirectory()
+        self._orig_db  = db.DB_FILE
+        db.DB_FILE     = os.path.join(self.tmpdir.name, "t.db")
+        db.init_db()
+        self.client = routes.app.test_client()
+        token = mock.patch.object(profiling, "PROFILE_TOKEN", "secret")
+        token.start()
+        self.addCleanup(token.stop)
+
+    def tearDown(self):
+        db.DB_FILE = self._orig_db
+        self.tmpdir.cleanup()
+
+    def test_unprofiled_request_has_no_header(self):
+        response = self.client.get("/api/incidents")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Server-Timing", response.headers)
+        self.assertIsNone(profiling.current())
+
+    def test_header_profiles_request_and_debug_endpoint_lists_it(self):
+        response = self.client.get("/api/incidents", headers={"X-Profile": "secret"})
+        timing = response.headers["Server-Timing"]
+        self.assertIn("db;dur=", timing)
+        self.assertIn("json;dur=", timing)
+        self.assertIn("total;dur=", timing)
+
+        self.assertEqual(self.client.get("/api/debug/profiles").status_code, 404)
+        profiles = self.client.get("/api/debug/profiles", headers={"X-Profile": "secret"}).get_json()["profiles"]
+        latest = profiles[0]
+        self.assertEqual(latest["path"], "/api/incidents")
+        self.assertGreaterEqual(latest["queries"], 1)
+        self.assertTrue(latest["query_log"][0]["sql"].startswith("SELECT * FROM incidents"))
+
+    def test_wrong_token_is_not_profiled(self):
+        response = self.client.get("/api/incidents", headers={"X-Profile": "guess"})
+        self.assertNotIn("Server-Timing", response.headers)
+
+    def test_traced_connection_counts_rows_and_trigger_statements(self):
+        profile = profiling.Profile("GET", "/x", "test")
+        type_id = db.lookups.id_for("type", "Crash")
+        token = profiling._current.set(profile)
+        try:
+            with db.connect() as conn:
+                conn.execute(
+                    "INSERT INTO incidents (incident_no, ts_epoch, date, type_id, location) "
+                    "VALUES ('1', ?, '2024-01-01', ?, 'Main St')", (db.to_epoch("2024-01-01 00:00:00"), type_id),
+                )
+                rows = list(conn.execute("SELECT incident_no FROM incidents"))
+        finally:
+            profiling._current.reset(token)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(len(profile.queries), 2)
+        self.assertEqual(profile.queries[1][3], 1)
+        self.assertGreater(profile.statements, 2)  # FTS trigger body runs too
+
+    def test_slow_queries_are_logged_with_plan(self):
+        profile = profiling.Profile("GET", "/x", "test")
+        profile.queries.append(["SELECT * FROM incidents WHERE incident_no = ?", ("1",), 0.2, 0, db.DB_FILE])
+        with self.assertLogs("traffic.profiling", level="WARNING") as logs:
+            profiling.log_slow_queries(profile, threshold_ms=100)
+        self.assertIn("plan:", logs.output[0])
+        self.assertIn("incidents", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
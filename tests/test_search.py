@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+import db
+
+
+class TestFullTextSearch(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._orig_db = db.DB_FILE
+        db.DB_FILE = os.path.join(self.tmpdir.name, "search.db")
+        db.init_db()
+
+    def tearDown(self):
+        db.DB_FILE = self._orig_db
+        self.tmpdir.cleanup()
+
+    def _insert(self, incident_no, location, description="", source="CHP", active=1):
+        type_id, source_id = db.lookups.id_for("type", "Traffic Collision"), db.lookups.id_for("source", source)
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.execute(
+                "INSERT INTO incidents (incident_no, date, ts_epoch, location, type_id, description, "
+                "source_id, active) VALUES (?, '2026-10-19', ?, ?, ?, ?, ?, ?)",
+                (incident_no, db.to_epoch("2026-10-19 08:00:00"), location, type_id, description,
+                 source_id, active),
+            )
+
+    def test_prefix_match_with_highlighted_snippet(self):
+        self._insert("A1", "I-5 N / <Friars> Rd")
+        self._insert("A2", "SR-163 S / Washington St")
+
+        results, next_cursor = db.search_incidents("fria")
+        self.assertEqual([r["incident_no"] for r in results], ["A1"])
+        self.assertIsNone(next_cursor)
+        self.assertIn("&lt;<mark>Friars</mark>&gt;", results[0]["snippet"])
+
+    def test_location_hit_outranks_description_hit(self):
+        self._insert("A1", "Mission Gorge Rd", "crash near the stadium")
+        self._insert("A2", "Stadium Way", "minor collision")
+
+        results, _ = db.search_incidents("stadium")
+        self.assertEqual([r["incident_no"] for r in results], ["A2", "A1"])
+
+    def test_keyset_pagination_covers_every_match_once(self):
+        for i in range(7):
+            self._insert(f"A{i}", f"Friars Rd exit {i}")
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = db.search_incidents("friars", limit=3, cursor=cursor)
+            seen.extend(r["incident_no"] for r in page)
+            if cursor is None:
+                break
+        self.assertEqual(sorted(seen), [f"A{i}" for i in range(7)])
+
+    def test_index_follows_updates_and_deletes(self):
+        self._insert("A1", "Friars Rd")
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.execute("UPDATE incidents SET location = 'Mission Gorge Rd' WHERE incident_no = 'A1'")
+        self.assertEqual(db.search_incidents("friars")[0], [])
+        self.assertEqual(len(db.search_incidents("gorge")[0]), 1)
+
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.execute("DELETE FROM incidents WHERE incident_no = 'A1'")
+        self.assertEqual(db.search_incidents("gorge")[0], [])
+
+    def test_filters_and_unsafe_input(self):
+        self._insert("A1", "Friars Rd", source="CHP", active=1)
+        self._insert("A2", "Friars Rd", source="SDPD", active=0)
+
+        self.assertEqual([r["incident_no"] for r in db.search_incidents("friars", sources=["SDPD"])[0]], ["A2"])
+        self.assertEqual([r["incident_no"] for r in db.search_incidents("friars", active_only=True)[0]], ["A1"])
+        self.assertEqual(db.search_incidents('" OR * NEAR('), ([], None))
+        self.assertEqual(len(db.search_incidents('friars" OR')[0]), 0)
+
+    def test_existing_rows_are_backfilled(self):
+        with sqlite3.connect(db.DB_FILE) as conn:
+            for trigger in ("incidents_fts_ai", "incidents_fts_au", "incidents_fts_ad"):
+                conn.execute(f"DROP TRIGGER {trigger}")
+            conn.execute("DROP TABLE incidents_fts")
+        self._insert("A1", "Friars Rd")
+        db.init_db()
+        self.assertEqual(len(db.search_incidents("friars")[0]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
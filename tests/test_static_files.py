@@ -0,0 +1,87 @@
+import gzip
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from static_files import IMMUTABLE_CACHE, REVALIDATE_CACHE, StaticIndex, send_static
+
+
+class TestStaticFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        root = self.tmpdir.name
+        os.makedirs(os.path.join(root, "assets"))
+        self.js = b"console.log('hello');" * 100
+        with open(os.path.join(root, "assets", "index-DCLaRuTv.js"), "wb") as f:
+            f.write(self.js)
+        with open(os.path.join(root, "assets", "index-DCLaRuTv.js.gz"), "wb") as f:
+            f.write(gzip.compress(self.js))
+        with open(os.path.join(root, "index.html"), "wb") as f:
+            f.write(b"<html></html>")
+        os.makedirs(os.path.join(root, "maps"))
+        with open(os.path.join(root, "maps", "abc123.png"), "wb") as f:
+            f.write(b"\x89PNG map")
+
+        app = Flask(__name__)
+        index = StaticIndex(root)
+
+        @app.route("/maps/<path:filename>")
+        def serve_map(filename):
+            return send_static(os.path.join(root, "maps"), filename, immutable=True)
+
+        @app.route("/<path:path>")
+        def serve(path):
+            if path in index:
+                return send_static(root, path, index=index)
+            return send_static(root, "index.html", index=index)
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_fingerprinted_asset_is_immutable_and_precompressed(self):
+        resp = self.client.get("/assets/index-DCLaRuTv.js", headers={"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["Cache-Control"], IMMUTABLE_CACHE)
+        self.assertEqual(resp.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", resp.headers["Vary"])
+        self.assertIn("javascript", resp.headers["Content-Type"])
+        self.assertEqual(gzip.decompress(resp.data), self.js)
+        resp.close()
+
+    def test_identity_when_client_does_not_accept_gzip(self):
+        resp = self.client.get("/assets/index-DCLaRuTv.js", headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("Content-Encoding", resp.headers)
+        self.assertEqual(resp.data, self.js)
+        resp.close()
+
+    def test_etag_revalidation_and_spa_fallback(self):
+        resp = self.client.get("/some/client/route")
+        self.assertEqual(resp.headers["Cache-Control"], REVALIDATE_CACHE)
+        etag = resp.headers["ETag"]
+        resp.close()
+
+        resp = self.client.get("/index.html", headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, 304)
+        resp.close()
+
+    def test_map_images_skip_the_precompressed_lookup(self):
+        with mock.patch("static_files.os.path.isfile", wraps=os.path.isfile) as isfile:
+            resp = self.client.get("/maps/abc123.png", headers={"Accept-Encoding": "br, gzip"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["Cache-Control"], IMMUTABLE_CACHE)
+        self.assertNotIn("Content-Encoding", resp.headers)
+        self.assertNotIn("Vary", resp.headers)
+        self.assertEqual(isfile.call_count, 1)  # the PNG itself; no .br/.gz siblings
+        resp.close()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+import db
+import monitor
+import routes
+import stats
+
+ROWS = [  # (incident_no, age, source, type, location, active)
+    ("C1", timedelta(minutes=20), "CHP", "Traffic Collision", "I-5 N / Friars Rd", 1),
+    ("C2", timedelta(hours=5), "CHP", "Traffic Hazard", "I-5 N / Friars Rd", 0),
+    ("C3", timedelta(days=3), "CHP", "Traffic Collision", "SR-163 S / Genesee Ave", 0),
+    ("P1", timedelta(minutes=40), "SDPD", "Hit and Run", "100 Broadway", 1),
+    ("P2", timedelta(days=20), "SDPD", "Hit and Run", "I-5 N / Friars Rd", 0),
+    ("F1", timedelta(days=7 * 6), "SDFD", "Fire", "", 0),
+    ("F2", timedelta(days=400), "SDFD", "Fire", "1 Main St", 0),
+]
+
+
+class TestStatsSnapshots(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir   = tempfile.TemporaryDirectory()
+        self._orig_db = db.DB_FILE
+        db.DB_FILE    = os.path.join(self.tmpdir.name, "stats.db")
+        db.init_db()
+        self.now = datetime.now()
+        rows = [
+            (incident_no, (self.now - age).strftime("%Y-%m-%d"), db.to_epoch(self.now - age),
+             db.lookups.id_for("source", source), db.lookups.id_for("type", incident_type), location, active)
+            for incident_no, age, source, incident_type, location, active in ROWS
+        ]
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.executemany(
+                "INSERT INTO incidents (incident_no, date, ts_epoch, source_id, type_id, location, active) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows,
+            )
+        conn.close()
+        self.store  = stats.StatsSnapshots()
+        self.client = routes.app.test_client()
+        patch = mock.patch.object(routes, "get_stats_snapshots", return_value=self.store)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        db.DB_FILE = self._orig_db
+        self.tmpdir.cleanup()
+
+    def test_every_snapshot_matches_the_per_request_stats(self):
+        snapshots = stats.build_snapshots(self.now)
+        self.assertEqual(len(snapshots), 5 * (1 + 2 ** 3))  # unfiltered + every subset of 3 sources
+        with db.connect() as conn:
+            cur = conn.cursor()
+            for (date_filter, sources), snapshot in snapshots.items():
+                ids = db.lookups.ids("source", sorted(sources)) if sources is not None else []
+                expected = stats.compute_stats(cur, ids or ([None] if sources is not None else []),
+                                               date_filter, self.now)
+                expected.pop("generatedAt"), snapshot.pop("generatedAt")
+                self.assertEqual(snapshot, expected, (date_filter, sources))
+
+    def test_endpoint_serves_the_published_snapshot(self):
+        self.store.publish(stats.build_snapshots())
+        reader = stats.StatsSnapshots()  # another worker: loads from stats_snapshots
+        with mock.patch.object(routes, "get_stats_snapshots", return_value=reader):
+            chp = db.lookups.id_for("source", "CHP")
+            with sqlite3.connect(db.DB_FILE) as conn:  # arrives after the build
+                conn.execute(
+                    "INSERT INTO incidents (incident_no, date, ts_epoch, source_id, active) VALUES ('NEW', ?, ?, ?, 1)",
+                    (self.now.strftime("%Y-%m-%d"), db.to_epoch(self.now), chp),
+                )
+            conn.close()
+            week = self.client.get("/api/incident_stats?date_filter=week&source=CHP&source=SDPD").get_json()
+            self.assertEqual((week["totalIncidents"], week["eventsActive"]), (4, 2))  # without NEW
+            self.assertEqual(week["topLocations"],
+                             {"100 Broadway": 1, "I-5 N / Friars Rd": 2, "SR-163 S / Genesee Ave": 1})
+            self.assertLessEqual(time.time() - week["generatedAt"], 60)
+            nothing = self.client.get("/api/incident_stats?source=NOPE").get_json()
+            self.assertEqual((nothing["totalIncidents"], sum(nothing["hourlyData"])), (0, 0))
+
+    def test_stale_or_missing_snapshots_fall_back_to_live_stats(self):
+        live = self.client.get("/api/incident_stats?date_filter=week").get_json()
+        self.assertEqual(live["totalIncidents"], 4)
+
+        snapshots = stats.build_snapshots()
+        for snapshot in snapshots.values():
+            snapshot["generatedAt"] -= self.store.max_age + 1
+        self.store.publish(snapshots)
+        self.assertIsNone(self.store.lookup("week", []))
+
+    def test_monitor_rebuilds_after_changes(self):
+        with mock.patch.object(monitor, "get_stats_snapshots", return_value=self.store), \
+                mock.patch.object(monitor, "_last_stats_build", time.time()):
+            monitor._maybe_build_stats(changed=0)
+            self.assertIsNone(self.store.lookup(None, []))
+            monitor._maybe_build_stats(changed=2)
+        self.assertEqual(self.store.lookup(None, [])["totalIncidents"], len(ROWS))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+import db
+from notify import ChangeChannel
+from suggest import PrefixIndex, SuggestIndex
+
+
+class TestPrefixIndex(unittest.TestCase):
+    def test_ranks_by_frequency_and_matches_word_starts(self):
+        index = PrefixIndex()
+        index.add("I-5 N / Friars Rd", 3)
+        index.add("Friars Rd", 5)
+        index.add("Fairmount Ave", 1)
+
+        self.assertEqual(index.top("fri"), [("Friars Rd", 5), ("I-5 N / Friars Rd", 3)])
+        self.assertEqual(index.top("F", k=1), [("Friars Rd", 5)])
+        self.assertEqual(index.top("i-5"), [("I-5 N / Friars Rd", 3)])
+        self.assertEqual(index.top("zzz"), [])
+
+    def test_memoised_results_are_invalidated_on_add(self):
+        index = PrefixIndex()
+        index.add("Friars Rd")
+        self.assertEqual(index.top("fri"), [("Friars Rd", 1)])
+        index.add("Friars Rd")
+        self.assertEqual(index.top("fri"), [("Friars Rd", 2)])
+
+    def test_lookup_is_fast_on_a_large_index(self):
+        index = PrefixIndex()
+        for i in range(20000):
+            index.add(f"Street {i} / Ave {i % 97}", 1 + i % 13)
+
+        start = time.perf_counter()
+        for i in range(200):
+            index.top(f"street {i}")
+        per_lookup = (time.perf_counter() - start) / 200
+        self.assertLess(per_lookup, 0.001)
+
+
+class TestSuggestIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._orig_db = db.DB_FILE
+        db.DB_FILE = os.path.join(self.tmpdir.name, "suggest.db")
+        db.init_db()
+        self.channel = ChangeChannel(db.DB_FILE + ".changes")
+
+    def tearDown(self):
+        db.DB_FILE = self._orig_db
+        self.tmpdir.cleanup()
+
+    def _insert(self, incident_no, location, neighborhood, incident_type):
+        neighborhood_id = db.lookups.id_for("neighborhood", neighborhood)
+        type_id         = db.lookups.id_for("type", incident_type)
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.execute(
+                "INSERT INTO incidents (incident_no, date, location, neighborhood_id, type_id) "
+                "VALUES (?, '2026-10-19', ?, ?, ?)",
+                (incident_no, location, neighborhood_id, type_id),
+            )
+
+    def test_builds_then_picks_up_published_rows(self):
+        self._insert("A1", "Friars Rd", "Mission Valley", "Traffic Collision")
+        self._insert("A2", "Friars Rd", "Mission Hills", "Traffic Hazard")
+        index = SuggestIndex(db.DB_FILE, self.channel)
+
+        self.assertEqual(index.suggest("location", "fr"), [("Friars Rd", 2)])
+        self.assertEqual(index.suggest("neighborhood", "mission"),
+                         [("Mission Hills", 1), ("Mission Valley", 1)])
+
+        self._insert("A3", "Friars Rd", "Mission Valley", "Traffic Collision")
+        self.assertEqual(index.suggest("location", "fr"), [("Friars Rd", 2)])  # not published yet
+
+        self.channel.publish()
+        self.assertEqual(index.suggest("location", "fr"), [("Friars Rd", 3)])
+        self.assertEqual(index.suggest("type", "traffic c"), [("Traffic Collision", 2)])
+
+    def test_unknown_field_raises(self):
+        index = SuggestIndex(db.DB_FILE, self.channel)
+        with self.assertRaises(KeyError):
+            index.suggest("description", "a")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+import db
+import tiles
+from notify import ChangeChannel
+
+
+def _read_varint(buf, pos):
+    result, shift = 0, 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(buf):
+    """Yield (field_number, wire_type, value) for a protobuf message."""
+    pos = 0
+    while pos < len(buf):
+        key, pos = _read_varint(buf, pos)
+        number, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = _read_varint(buf, pos)
+        elif wire == 2:
+            length, pos = _read_varint(buf, pos)
+            value = buf[pos:pos + length]
+            pos += length
+        elif wire == 1:
+            value = buf[pos:pos + 8]
+            pos += 8
+        else:
+            raise ValueError(f"unsupported wire type {wire}")
+        yield number, wire, value
+
+
+def _layer_features(tile):
+    layer = next(v for n, _, v in _fields(tile) if n == 3)
+    keys = [v.decode() for n, _, v in _fields(layer) if n == 3]
+    features = [v for n, _, v in _fields(layer) if n == 2]
+    return keys, features
+
+
+class TestTileMath(unittest.TestCase):
+    def test_varint_and_zigzag(self):
+        self.assertEqual(tiles.encode_varint(1), b"\x01")
+        self.assertEqual(tiles.encode_varint(300), b"\xac\x02")
+        self.assertEqual(tiles.zigzag(0), 0)
+        self.assertEqual(tiles.zigzag(-1), 1)
+        self.assertEqual(tiles.zigzag(1), 2)
+
+    def test_projection_round_trip(self):
+        z, lon, lat = 12, -117.1611, 32.7157
+        n = 2 ** z
+        x = int((lon + 180) / 360 * n)
+        min_lon, min_lat, max_lon, max_lat = tiles.tile_bounds(z, x, 1653)
+        self.assertTrue(min_lon <= lon <= max_lon)
+        px, py = tiles.project(lon, lat, z, x, 1653)
+        self.assertTrue(0 <= px <= tiles.TILE_EXTENT)
+        self.assertTrue(0 <= py <= tiles.TILE_EXTENT)
+
+    def test_cluster_points_merges_nearby(self):
+        points = [(100, 100, {"active": True, "severity": 2}),
+                  (110, 120, {"active": False, "severity": 4}),
+                  (3000, 3000, {"active": True})]
+        clustered = tiles.cluster_points(points, z=10)
+        self.assertEqual(len(clustered), 2)
+        cluster = next(p for p in clustered if p[2].get("cluster"))
+        self.assertEqual(cluster[2]["point_count"], 2)
+        self.assertEqual(cluster[2]["active_count"], 1)
+        self.assertEqual(cluster[2]["max_severity"], 4)
+
+        # No clustering past CLUSTER_MAX_ZOOM
+        self.assertEqual(len(tiles.cluster_points(points, z=tiles.CLUSTER_MAX_ZOOM + 1)), 3)
+
+    def test_tile_cache_evicts_lru(self):
+        cache = tiles.TileCache(max_entries=2)
+        cache.put("a", b"1")
+        cache.put("b", b"2")
+        cache.get("a")
+        cache.put("c", b"3")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), b"1")
+
+
+class TestRenderIncidentTile(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._orig_db = db.DB_FILE
+        db.DB_FILE = os.path.join(self.tmpdir.name, "tiles.db")
+        db.init_db()
+        tiles.tile_cache.clear()
+        self.channel = ChangeChannel(os.path.join(self.tmpdir.name, "tiles.db.changes"))
+        patch = mock.patch.object(tiles, "change_channel", self.channel)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        db.DB_FILE = self._orig_db
+        self.tmpdir.cleanup()
+
+    def _insert(self, incident_no, lat, lon):
+        type_id, source_id = db.lookups.id_for("type", "Traffic Collision"), db.lookups.id_for("source", "CHP")
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.execute(
+                "INSERT INTO incidents (incident_no, date, ts_epoch, type_id, source_id, latitude, longitude) "
+                "VALUES (?, '2026-01-01', ?, ?, ?, ?, ?)",
+                (incident_no, db.to_epoch("2026-01-01 12:00:00"), type_id, source_id, lat, lon),
+            )
+
+    def test_downtown_incidents_cluster_into_one_feature(self):
+        for i in range(5):
+            self._insert(f"DT-{i}", 32.7157 + i * 0.0001, -117.1611)
+        self._insert("FAR", 33.2, -117.3)
+
+        z = 10
+        x = int((-117.1611 + 180) / 360 * 2 ** z)
+        tile = tiles.render_incident_tile(z, x, 413)
+        keys, features = _layer_features(tile)
+        self.assertEqual(len(features), 1)
+        self.assertIn("point_count", keys)
+
+        # Same data version → served from cache
+        hits = tiles.tile_cache.hits
+        self.assertEqual(tiles.render_incident_tile(z, x, 413), tile)
+        self.assertEqual(tiles.tile_cache.hits, hits + 1)
+
+    def test_cache_follows_the_change_channel_not_every_commit(self):
+        self._insert("DT", 32.7157, -117.1611)
+        z, x, y = 10, int((-117.1611 + 180) / 360 * 2 ** 10), 413
+        tile = tiles.render_incident_tile(z, x, y)
+
+        self.assertEqual(db.set_like("DT", "dev-1"), (True, 1))  # commits, but tiles carry no likes
+        hits = tiles.tile_cache.hits
+        tiles.render_incident_tile(z, x, y)
+        self.assertEqual(tiles.tile_cache.hits, hits + 1)
+
+        self._insert("DT-2", 32.7158, -117.1611)
+        self.channel.publish()
+        self.assertNotEqual(tiles.render_incident_tile(z, x, y), tile)
+
+    def test_coordinate_updates_follow_spatial_index(self):
+        self._insert("MOVE", 32.7157, -117.1611)
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.execute("UPDATE incidents SET latitude = 40.0, longitude = -100.0 WHERE incident_no = 'MOVE'")
+        rows = db.incidents_in_bbox(-117.2, 32.7, -117.1, 32.8)
+        self.assertEqual(rows, [])
+        rows = db.incidents_in_bbox(-100.1, 39.9, -99.9, 40.1)
+        self.assertEqual([r["incident_no"] for r in rows], ["MOVE"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
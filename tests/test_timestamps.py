@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+import db
+import routes
+
+
+class TestEpochColumns(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir   = tempfile.TemporaryDirectory()
+        self._orig_db = db.DB_FILE
+        db.DB_FILE    = os.path.join(self.tmpdir.name, "epoch.db")
+        db.init_db()
+        self.client = routes.app.test_client()
+
+    def tearDown(self):
+        db.DB_FILE = self._orig_db
+        self.tmpdir.cleanup()
+
+    def _insert(self, when, incident_no, source="CHP"):
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.execute(
+                "INSERT INTO incidents (incident_no, date, ts_epoch, source_id, active) VALUES (?, ?, ?, ?, 0)",
+                (incident_no, when.strftime("%Y-%m-%d"), db.to_epoch(when), db.lookups.id_for("source", source)),
+            )
+
+    def test_derived_columns_match_the_wall_clock(self):
+        when = datetime(2026, 10, 18, 23, 59, 30)  # a Sunday
+        self._insert(when, "A1")
+        with sqlite3.connect(db.DB_FILE) as conn:
+            row = conn.execute(
+                "SELECT timestamp, day, hour_of_week, date(day * 86400, 'unixepoch') FROM incidents"
+            ).fetchone()
+        self.assertEqual(row, ("2026-10-18 23:59:30", db.to_day(when), 23, "2026-10-18"))
+        self.assertEqual(db.hour_of_week(when), 23)
+        self.assertIsNone(db.to_epoch("not a time"))
+
+    def test_historical_average_over_matching_weekdays(self):
+        now = datetime.now()
+        for weeks_ago, count in ((1, 20), (2, 10), (3, 30)):
+            for n in range(count):
+                self._insert(now - timedelta(days=7 * weeks_ago), f"W{weeks_ago}-{n}")
+        for n in range(15):  # same weekday as week 1, different hour
+            self._insert(now - timedelta(days=7) + timedelta(hours=1 if now.hour == 0 else -1), f"HR-{n}")
+        for n in range(25):  # same hour, different weekday
+            self._insert(now - timedelta(days=6), f"DAY-{n}")
+        self._insert(now - timedelta(days=7), "SDPD-1", source="SDPD")
+
+        stats = self.client.get("/api/incident_stats?date_filter=day&source=CHP").get_json()
+        self.assertEqual(stats["historicalCurrentHourAverage"], 20.0)
+
+    def test_chart_buckets_place_each_incident(self):
+        now = datetime.now()
+        rows = {
+            "H1": (now - timedelta(minutes=30), "CHP"),
+            "H2": (now - timedelta(hours=2, minutes=30), "SDPD"),
+            "D2": (now - timedelta(days=2), "CHP"),
+            "M4": (now - timedelta(days=40), "CHP"),
+            "OLD": (now - relativedelta(months=13), "CHP"),
+        }
+        for incident_no, (when, source) in rows.items():
+            self._insert(when, incident_no, source)
+
+        def bucket(date_filter, when):
+            if date_filter == "year":
+                return 11 - ((now.year - when.year) * 12 + now.month - when.month)
+            if date_filter in ("month", "week"):
+                days = 30 if date_filter == "month" else 7
+                return days - 1 - (db.to_day(now) - db.to_day(when))
+            return 23 - int((now - when).total_seconds() // 3600)
+
+        for date_filter, size in ((None, 24), ("week", 7), ("month", 30), ("year", 12)):
+            for source in (None, "CHP"):
+                expected = [0] * size
+                for when, row_source in rows.values():
+                    index = bucket(date_filter, when)
+                    if 0 <= index < size and source in (None, row_source):
+                        expected[index] += 1
+                query = {k: v for k, v in (("date_filter", date_filter), ("source", source)) if v}
+                stats = self.client.get("/api/incident_stats", query_string=query).get_json()
+                self.assertEqual(stats["hourlyData"], expected, (date_filter, source))
+
+    def test_time_filters_search_the_integer_indexes(self):
+        with sqlite3.connect(db.DB_FILE) as conn:
+            for query, params, index in (
+                ("SELECT COUNT(*) FROM incidents WHERE hour_of_week = ? AND source_id IN (?, ?)", (32, 1, 2),
+                 "idx_incidents_how"),
+                ("SELECT COUNT(DISTINCT day) FROM incidents WHERE hour_of_week BETWEEN ? AND ?", (24, 47),
+                 "idx_incidents_how"),
+                ("SELECT COUNT(*) FROM incidents WHERE ts_epoch >= ? AND ts_epoch < ?", (0, 3600),
+                 "idx_incidents_ts_epoch"),
+                ("SELECT COUNT(*) FROM incidents WHERE source_id IN (?, ?) AND ts_epoch >= ? AND ts_epoch < ?",
+                 (1, 2, 0, 3600), "idx_incidents_source_ts"),
+                ("SELECT COUNT(*) FROM incidents WHERE day = ?", (20745,), "idx_incidents_day"),
+            ):
+                plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+                self.assertIn("SEARCH incidents USING", plan, query)
+                self.assertIn(f"INDEX {index} ", plan, query)
+
+
+class TestTextTimestampMigration(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir   = tempfile.TemporaryDirectory()
+        self._orig_db = db.DB_FILE
+        db.DB_FILE    = os.path.join(self.tmpdir.name, "text_times.db")
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.execute("""
+                CREATE TABLE incidents (
+                    incident_no TEXT, date TEXT, timestamp TEXT, type_id INTEGER, location TEXT,
+                    details TEXT, active INTEGER DEFAULT 1, source_id INTEGER, comment_count INTEGER DEFAULT 0,
+                    PRIMARY KEY (incident_no, date)
+                )
+            """)
+            conn.execute("CREATE INDEX idx_incidents_timestamp ON incidents(timestamp)")
+            conn.executemany(
+                "INSERT INTO incidents (incident_no, date, timestamp, location, details) VALUES (?, ?, ?, ?, ?)",
+                [(f"T{i}", "2026-10-19", f"2026-10-19 0{i}:15:00", "Friars Rd", "LINE 1\nLINE 2") for i in range(5)],
+            )
+        conn.close()
+        db.init_db()
+
+    def tearDown(self):
+        db.DB_FILE = self._orig_db
+        self.tmpdir.cleanup()
+
+    def test_rows_keep_their_times_and_page_by_epoch(self):
+        with sqlite3.connect(db.DB_FILE) as conn:
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            row = conn.execute("SELECT ts_epoch, timestamp FROM incidents WHERE incident_no = 'T3'").fetchone()
+        conn.close()
+        self.assertIn("idx_incidents_how", indexes)
+        self.assertNotIn("idx_incidents_timestamp", indexes)
+        self.assertEqual(row, (db.to_epoch("2026-10-19 03:15:00"), "2026-10-19 03:15:00"))
+
+        page = db.read_incidents(limit=2)
+        self.assertEqual([inc["incident_no"] for inc in page], ["T4", "T3"])
+        self.assertEqual(page[0]["Details"], ["LINE 1", "LINE 2"])
+        cursor = f"{page[-1]['timestamp']}|{page[-1]['incident_no']}"
+        self.assertEqual([inc["incident_no"] for inc in db.read_incidents(limit=5, cursor=cursor)], ["T2", "T1", "T0"])
+
+
+if __name__ == "__main__":
+    unittest.main()
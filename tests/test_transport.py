@@ -0,0 +1,151 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+import db
+import monitor
+from config import CHP_SCRAPE_URL, HEADERS, PARAMS, SDFD_API_URL, SDPD_SCRAPE_URL
+from notify import ChangeChannel
+from scrapers import chp, sdfd, sdpd, transport
+from scrapers.transport import FixtureStore
+
+SDPD_HTML = """
+<table id="myDataTable"><thead><tr><th>Date</th></tr></thead><tbody>
+<tr><td>2026-10-19 08:15:00</td><td>TRAFFIC ACCIDENT</td><td>Central</td><td>Downtown</td><td>100 BROADWAY</td></tr>
+</tbody></table>
+"""
+
+CHP_LIST = """
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="abc123" />
+<table id="gvIncidents">
+<tr><th>No.</th><th>Time</th><th>Type</th><th>Location</th></tr>
+<tr><td>0101</td><td>8:15 AM</td><td>Trfc Collision</td><td>I5 N / Main St</td></tr>
+</table>
+"""
+
+CHP_ROW = """
+<span>32.715736 -117.161087</span>
+<table id="tblDetails"><tr><td>8:16 AM</td><td>1</td><td colspan="2">2 VEHS BLKG LN</td></tr></table>
+"""
+
+
+def _sdfd_items(*addresses):
+    return json.dumps([
+        {"ResponseDate": "2026-10-19T08:00:00", "CallType": "Medical", "Address": address, "Units": []}
+        for address in addresses
+    ]).encode()
+
+
+def _record(path, sdfd_body, include_chp=True):
+    """Write a fixture directory the way transport.record() would."""
+    store = FixtureStore(path)
+    get = lambda url: requests.Request("GET", url, headers=HEADERS).prepare()  # noqa: E731
+    store.add(get(SDPD_SCRAPE_URL), 200, {"Content-Type": "text/html"}, SDPD_HTML.encode())
+    store.add(get(SDFD_API_URL), 200, {"Content-Type": "application/json"}, sdfd_body)
+    if include_chp:
+        store.add(get(CHP_SCRAPE_URL), 200, {"Content-Type": "text/html"}, CHP_LIST.encode())
+        row = requests.Request("POST", CHP_SCRAPE_URL, params=PARAMS, headers=HEADERS, data={
+            "__LASTFOCUS": "", "__EVENTTARGET": "gvIncidents", "__EVENTARGUMENT": "Select$0",
+            "__VIEWSTATE": "abc123", "__VIEWSTATEGENERATOR": "B13DF00D", "ddlComCenter": "BCCC",
+            "ddlSearches": "Choose One", "ddlResources": "Choose One",
+        }).prepare()
+        store.add(row, 200, {"Content-Type": "text/html"}, CHP_ROW.encode())
+    return store
+
+
+class TestReplayTransport(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(transport.reset)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_scrapers_run_from_fixtures(self):
+        _record(self.tmpdir.name, _sdfd_items("1 MAIN ST"))
+        adapter = transport.replay(self.tmpdir.name)
+
+        self.assertEqual(sdpd.scrape_sdpd_incidents()[0]["Location"], "100 BROADWAY")
+        self.assertEqual(sdfd.scrape_sdfd_incidents()[0]["Location"], "1 MAIN ST")
+        incidents = chp.scrape_chp_incidents()
+        self.assertEqual(len(incidents), 1)
+        self.assertEqual(incidents[0]["Latitude"], 32.715736)
+        self.assertEqual(incidents[0]["Details"], ["[8:16 AM] 2 VEHS BLKG LN"])
+        self.assertEqual((adapter.hits, adapter.misses), (4, 0))
+
+    def test_unrecorded_request_fails_like_an_outage(self):
+        _record(self.tmpdir.name, _sdfd_items("1 MAIN ST"), include_chp=False)
+        adapter = transport.replay(self.tmpdir.name)
+        self.assertEqual(chp.scrape_chp_incidents(), [])
+        self.assertEqual(adapter.misses, 1)
+
+    def test_store_reloads_from_disk(self):
+        _record(self.tmpdir.name, _sdfd_items("1 MAIN ST"))
+        self.assertEqual(len(FixtureStore(self.tmpdir.name)), 4)
+
+    def test_rerecording_keeps_every_body(self):
+        get = lambda url: requests.Request("GET", url).prepare()  # noqa: E731
+        store = FixtureStore(self.tmpdir.name)
+        for _ in range(2):
+            store.add(get("https://a.example/"), 200, {}, b"A")
+            store.add(get("https://b.example/"), 200, {}, b"B")
+        store.add(get("https://c.example/"), 200, {}, b"C")
+
+        store = FixtureStore(self.tmpdir.name)
+        bodies = [store.lookup(get(f"https://{host}.example/"))[1] for host in "abc"]
+        self.assertEqual(bodies, [b"A", b"B", b"C"])
+
+
+class TestReplayedMonitorCycle(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._orig_db = db.DB_FILE
+        db.DB_FILE = monitor.DB_FILE = os.path.join(self.tmpdir.name, "cycle.db")
+        db.init_db()
+        self.addCleanup(transport.reset)
+        geocode = {"Latitude": 32.7, "Longitude": -117.1, "precision": "street"}
+        for patch in (
+            mock.patch.object(monitor, "geocode_location", return_value=geocode),
+            mock.patch.object(monitor, "generate_description", return_value=("Closed.", 1)),
+            mock.patch.object(monitor, "run_map_generator"),
+            mock.patch("llm.generate_description", return_value=("Stub.", 2)),
+            mock.patch.object(monitor, "change_channel", ChangeChannel(os.path.join(self.tmpdir.name, "changes"))),
+            mock.patch.object(monitor, "_last_map_eviction", time.time()),
+            mock.patch.object(monitor, "_last_archive", time.time()),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        db.DB_FILE = monitor.DB_FILE = self._orig_db
+        self.tmpdir.cleanup()
+
+    def test_cycles_replay_deterministically(self):
+        first, second = (os.path.join(self.tmpdir.name, name) for name in ("c0", "c1"))
+        _record(first, _sdfd_items("1 MAIN ST", "2 ELM ST"), include_chp=False)
+        _record(second, _sdfd_items("1 MAIN ST"), include_chp=False)
+        scrapers = {"SDPD": sdpd.scrape_sdpd_incidents, "SDFD": sdfd.scrape_sdfd_incidents}
+        active_set = monitor.ActiveSet()
+
+        transport.replay(first)
+        changed, timings = monitor.run_cycle(active_set, scrapers)
+        self.assertEqual(changed, 3)
+        self.assertTrue({"scrape", "process", "close", "scrape.SDFD"} <= set(timings))
+
+        transport.replay(second)
+        changed, _timings = monitor.run_cycle(active_set, scrapers)
+        self.assertEqual(changed, 1)  # 2 ELM ST went inactive (no details, so no final summary)
+        self.assertEqual(len(active_set.closed(set())), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
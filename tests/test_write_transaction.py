@@ -0,0 +1,95 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GPT_KEY", "test")
+
+import db
+
+
+class TestWriteTransaction(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._orig_db = db.DB_FILE
+        db.DB_FILE = os.path.join(self.tmpdir.name, "writes.db")
+        db.init_db()
+        db.write_stats.reset()
+
+    def tearDown(self):
+        db.DB_FILE = self._orig_db
+        self.tmpdir.cleanup()
+
+    def _count(self):
+        with sqlite3.connect(db.DB_FILE) as conn:
+            return conn.execute("SELECT COUNT(*) FROM likes").fetchone()[0]
+
+    def test_commits_and_rolls_back(self):
+        with db.write_transaction("test") as conn:
+            conn.execute("INSERT INTO likes (device_uuid, incident_no) VALUES ('d', 'a')")
+
+        with self.assertRaises(RuntimeError):
+            with db.write_transaction("test") as conn:
+                conn.execute("INSERT INTO likes (device_uuid, incident_no) VALUES ('d', 'b')")
+                raise RuntimeError("boom")
+
+        self.assertEqual(self._count(), 1)
+        stats = db.write_stats.snapshot()
+        self.assertEqual((stats["transactions"], stats["failures"]), (1, 1))
+        self.assertEqual(stats["by_label"], {"test": 1})
+
+    def test_retries_while_another_writer_holds_the_lock(self):
+        blocker = sqlite3.connect(db.DB_FILE, isolation_level=None, check_same_thread=False)
+        blocker.execute("BEGIN IMMEDIATE")
+        threading.Timer(0.15, blocker.rollback).start()
+
+        with mock.patch.object(db, "WRITE_BUSY_TIMEOUT", 0.05), mock.patch.object(db, "WRITE_BACKOFF", 0.02):
+            with db.write_transaction("test") as conn:
+                conn.execute("INSERT INTO likes (device_uuid, incident_no) VALUES ('d', 'a')")
+        blocker.close()
+
+        stats = db.write_stats.snapshot()
+        self.assertGreater(stats["busy_retries"], 0)
+        self.assertGreater(stats["wait_max_ms"], 50)
+        self.assertEqual(self._count(), 1)
+
+    def test_gives_up_after_retries(self):
+        blocker = sqlite3.connect(db.DB_FILE, isolation_level=None)
+        blocker.execute("BEGIN IMMEDIATE")
+        try:
+            with mock.patch.object(db, "WRITE_BUSY_TIMEOUT", 0.01), \
+                 mock.patch.object(db, "WRITE_BACKOFF", 0.001), \
+                 mock.patch.object(db, "WRITE_RETRIES", 3):
+                with self.assertRaises(sqlite3.OperationalError):
+                    with db.write_transaction("test"):
+                        pass
+        finally:
+            blocker.rollback()
+            blocker.close()
+        stats = db.write_stats.snapshot()
+        self.assertEqual((stats["busy_retries"], stats["failures"]), (2, 1))
+
+    def test_concurrent_writers_do_not_lose_updates(self):
+        def worker(n):
+            for i in range(20):
+                db.set_like("A1", f"dev-{n}-{i}")
+
+        with sqlite3.connect(db.DB_FILE) as conn:
+            conn.execute("INSERT INTO incidents (incident_no, date, details) VALUES ('A1', 'd', '[]')")
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        with sqlite3.connect(db.DB_FILE) as conn:
+            self.assertEqual(conn.execute("SELECT likes FROM incidents").fetchone()[0], 80)
+        self.assertEqual(db.write_stats.snapshot()["transactions"], 80)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
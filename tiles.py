@@ -0,0 +1,285 @@
+# tiles.py
+"""
+Server-side Mapbox Vector Tile (MVT) generation for incidents.
+
+Incidents inside a tile are looked up through the R*Tree spatial index,
+grid-clustered in tile space, and encoded as a single "incidents" layer.
+Encoded tiles are cached per (data version, tile, filters) with LRU eviction.
+The data version is the monitor's change channel, bumped once per scrape
+cycle that changed incidents; like and comment writes leave it alone, and
+tiles carry neither. Served at /tiles/incidents/{z}/{x}/{y}.mvt (API only:
+the frontend map still draws its own markers).
+"""
+
+import math
+import struct
+import threading
+from collections import OrderedDict
+
+import metrics
+from config import change_channel
+from db import incidents_in_bbox
+
+# ── Tile parameters ────────────────────────────────────────────────────────
+TILE_EXTENT        = 4096   # MVT coordinate space per tile
+TILE_SIZE_PX       = 512    # Rendered tile size the cluster radius is expressed in
+CLUSTER_RADIUS_PX  = 40     # Points closer than this (on screen) are merged
+CLUSTER_MAX_ZOOM   = 15     # Above this zoom every incident is its own feature
+LAYER_NAME         = "incidents"
+MVT_MIMETYPE       = "application/vnd.mapbox-vector-tile"
+
+# ── MVT geometry / wire constants ──────────────────────────────────────────
+_GEOM_POINT     = 1
+_CMD_MOVE_TO    = 1
+_WIRE_VARINT    = 0
+_WIRE_LENGTH    = 2
+
+
+# ---------------------------------------------------------------------------
+# Tile math
+# ---------------------------------------------------------------------------
+
+def tile_bounds(z, x, y):
+    """Return (min_lon, min_lat, max_lon, max_lat) for a Web Mercator XYZ tile."""
+    n = 2 ** z
+
+    def lon(px):
+        return px / n * 360.0 - 180.0
+
+    def lat(py):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * py / n))))
+
+    return lon(x), lat(y + 1), lon(x + 1), lat(y)
+
+
+def project(lon, lat, z, x, y, extent=TILE_EXTENT):
+    """Project lon/lat into integer tile-local coordinates (0..extent)."""
+    n      = 2 ** z
+    lat_r  = math.radians(max(min(lat, 85.0511), -85.0511))
+    world_x = (lon + 180.0) / 360.0 * n
+    world_y = (1.0 - math.log(math.tan(lat_r) + 1.0 / math.cos(lat_r)) / math.pi) / 2.0 * n
+    return int(round((world_x - x) * extent)), int(round((world_y - y) * extent))
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= 22 and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+# ---------------------------------------------------------------------------
+# Clustering
+# ---------------------------------------------------------------------------
+
+def cluster_points(points, z, extent=TILE_EXTENT):
+    """Grid-cluster projected points.
+
+    Args:
+        points: list of (px, py, properties) tuples in tile coordinates.
+        z:      tile zoom; clustering is disabled above CLUSTER_MAX_ZOOM.
+
+    Returns:
+        list of (px, py, properties). Clusters carry ``cluster``, ``point_count``,
+        ``active_count`` and ``max_severity``; singletons keep their own properties.
+    """
+    if z > CLUSTER_MAX_ZOOM or len(points) < 2:
+        return list(points)
+
+    cell  = max(1, int(extent * CLUSTER_RADIUS_PX / TILE_SIZE_PX))
+    cells = {}
+    for px, py, props in points:
+        cells.setdefault((px // cell, py // cell), []).append((px, py, props))
+
+    features = []
+    for members in cells.values():
+        if len(members) == 1:
+            features.append(members[0])
+            continue
+        count      = len(members)
+        cx         = int(round(sum(m[0] for m in members) / count))
+        cy         = int(round(sum(m[1] for m in members) / count))
+        severities = [m[2].get("severity") for m in members if m[2].get("severity") is not None]
+        features.append((cx, cy, {
+            "cluster":      True,
+            "point_count":  count,
+            "active_count": sum(1 for m in members if m[2].get("active")),
+            "max_severity": max(severities) if severities else 0,
+        }))
+    return features
+
+
+# ---------------------------------------------------------------------------
+# Protobuf / MVT encoding
+# ---------------------------------------------------------------------------
+
+def encode_varint(value):
+    """Encode a non-negative integer as a protobuf base-128 varint."""
+    if value < 0:
+        value += 1 << 64  # int64 two's complement
+    out = bytearray()
+    while True:
+        byte  = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def zigzag(value):
+    return (value << 1) ^ (value >> 31)
+
+
+def _field(number, wire_type):
+    return encode_varint((number << 3) | wire_type)
+
+
+def _length_delimited(number, payload):
+    return _field(number, _WIRE_LENGTH) + encode_varint(len(payload)) + payload
+
+
+def _packed(number, values):
+    return _length_delimited(number, b"".join(encode_varint(v) for v in values))
+
+
+def _encode_value(value):
+    """Encode one property value as an MVT ``Value`` message."""
+    if isinstance(value, bool):
+        return _field(7, _WIRE_VARINT) + encode_varint(int(value))
+    if isinstance(value, int):
+        if value >= 0:
+            return _field(5, _WIRE_VARINT) + encode_varint(value)
+        return _field(6, _WIRE_VARINT) + encode_varint((value << 1) ^ (value >> 63))
+    if isinstance(value, float):
+        return _field(3, 1) + struct.pack("<d", value)
+    return _length_delimited(1, str(value).encode("utf-8"))
+
+
+def encode_tile(features, layer_name=LAYER_NAME, extent=TILE_EXTENT):
+    """Encode point features into an MVT tile containing a single layer.
+
+    Args:
+        features: iterable of (px, py, properties) in tile coordinates.
+    """
+    keys, key_index     = [], {}
+    values, value_index = [], {}
+    encoded_features    = []
+
+    for feature_id, (px, py, props) in enumerate(features, start=1):
+        tags = []
+        for key, value in props.items():
+            if value is None:
+                continue
+            if key not in key_index:
+                key_index[key] = len(keys)
+                keys.append(key)
+            value_key = (type(value).__name__, value)
+            if value_key not in value_index:
+                value_index[value_key] = len(values)
+                values.append(value)
+            tags.extend((key_index[key], value_index[value_key]))
+
+        geometry = (_CMD_MOVE_TO & 0x7) | (1 << 3), zigzag(px), zigzag(py)
+        encoded_features.append(_length_delimited(2, (
+            _field(1, _WIRE_VARINT) + encode_varint(feature_id)
+            + _packed(2, tags)
+            + _field(3, _WIRE_VARINT) + encode_varint(_GEOM_POINT)
+            + _packed(4, geometry)
+        )))
+
+    layer = (
+        _field(15, _WIRE_VARINT) + encode_varint(2)
+        + _length_delimited(1, layer_name.encode("utf-8"))
+        + b"".join(encoded_features)
+        + b"".join(_length_delimited(3, k.encode("utf-8")) for k in keys)
+        + b"".join(_length_delimited(4, _encode_value(v)) for v in values)
+        + _field(5, _WIRE_VARINT) + encode_varint(extent)
+    )
+    return _length_delimited(3, layer)
+
+
+# ---------------------------------------------------------------------------
+# Tile cache
+# ---------------------------------------------------------------------------
+
+class TileCache:
+    """Thread-safe LRU cache of encoded tiles keyed by data version + tile + filters."""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries    = OrderedDict()
+        self._lock       = threading.Lock()
+        self.hits        = 0
+        self.misses      = 0
+
+    def get(self, key):
+        with self._lock:
+            tile = self._entries.get(key)
+            if tile is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return tile
+
+    def put(self, key, tile):
+        with self._lock:
+            self._entries[key] = tile
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+tile_cache = TileCache()
+
+
+@metrics.collector
+def _collect_tile_cache():
+    return [
+        ("traffic_tile_cache_lookups_total", "counter", "Vector tile cache lookups by result.",
+         [({"result": "hit"}, tile_cache.hits), ({"result": "miss"}, tile_cache.misses)]),
+        ("traffic_tile_cache_entries", "gauge", "Encoded tiles currently cached.",
+         [({}, len(tile_cache))]),
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Public entry point
+# ---------------------------------------------------------------------------
+
+def render_incident_tile(z, x, y, sources=None, incident_types=None, active_only=False):
+    """Return the encoded MVT bytes for one incidents tile (cached)."""
+    sources        = tuple(sorted(sources or ()))
+    incident_types = tuple(sorted(incident_types or ()))
+    key  = (change_channel.version(), z, x, y, sources, incident_types, bool(active_only))
+    tile = tile_cache.get(key)
+    if tile is not None:
+        return tile
+
+    min_lon, min_lat, max_lon, max_lat = tile_bounds(z, x, y)
+    rows = incidents_in_bbox(
+        min_lon, min_lat, max_lon, max_lat,
+        sources=sources, incident_types=incident_types, active_only=active_only,
+    )
+
+    points = []
+    for row in rows:
+        px, py = project(row["longitude"], row["latitude"], z, x, y)
+        points.append((px, py, {
+            "incident_no": row["incident_no"],
+            "type":        row["type"],
+            "source":      row["source"],
+            "active":      bool(row["active"]),
+            "severity":    row["severity"],
+            "timestamp":   row["timestamp"],
+        }))
+
+    tile = encode_tile(cluster_points(points, z))
+    tile_cache.put(key, tile)
+    return tile
@@ -17,6 +17,10 @@ export default defineConfig({
       '/maps': {
         target: process.env.VITE_PROD_URL || 'http://127.0.0.1:5002',
         changeOrigin: true
+      },
+      '/tiles': {
+        target: process.env.VITE_PROD_URL || 'http://127.0.0.1:5002',
+        changeOrigin: true
       }
     }
   }
@@ -5,7 +5,7 @@ Entry point for the Traffic Alert System.
 Structure
 ---------
 config.py     — constants, paths, Flask app, locks, clients
-logger.py     — thread-safe safe_print()
+logger.py     — queue-backed logging (get_logger, safe_print)
 db.py         — SQLite schema, CRUD operations
 llm.py        — LLM description + severity generation
 scrapers/
@@ -13,29 +13,44 @@ scrapers/
   sdpd.py     — San Diego Police Department scraper
   sdfd.py     — San Diego Fire Department scraper
   sdso.py     — San Diego Sheriff's Office scraper
-monitor.py    — background monitoring loop + geocoding orchestration
+monitor.py    — background monitoring loop + geocoding orchestration (also `python monitor.py`)
+notify.py     — monitor → API change-notification channel
+profiling.py  — opt-in per-request profiling (Server-Timing, slow-query plans)
+suggest.py    — in-memory typeahead index for filter values
+stats.py      — /api/incident_stats computation and the monitor's precomputed snapshots
 routes.py     — Flask API endpoints
+wsgi.py       — WSGI app for production API workers (gunicorn)
 traffic_scraper.py  ← you are here (entry point only)
+
+Modes
+-----
+python traffic_scraper.py                 Flask dev server + monitor thread (one process)
+python traffic_scraper.py --production    gunicorn API workers + singleton monitor process
+python traffic_scraper.py --monitor-only  singleton monitor process only (same as `python monitor.py`)
 """
 
+import argparse
+import os
+import sys
 import threading
 
-from config import app, BASE_DIR, DB_FILE, MAP_GENERATOR, TARGET_DIR
+from config import app, BASE_DIR, DB_FILE, MAP_GENERATOR, TARGET_DIR, get_suggest_index
 from logger import safe_print
 from db import init_db
-from monitor import monitor_traffic_data
+from monitor import run_monitor_process, run_monitor_singleton
 
 # Register all Flask routes by importing the module
 import routes  # noqa: F401
 
+GUNICORN_CONFIG = os.path.join(BASE_DIR, "gunicorn.conf.py")
+
 
 def run_scraper_and_server():
     """Initialise the database, start the scraper thread, then serve Flask."""
-    import os
-
     init_db()
+    get_suggest_index().refresh()
 
-    scraper_thread = threading.Thread(target=monitor_traffic_data, daemon=True)
+    scraper_thread = threading.Thread(target=run_monitor_singleton, daemon=True)
     scraper_thread.start()
 
     safe_print("Starting Flask server...")
@@ -48,8 +63,31 @@ def run_scraper_and_server():
         os._exit(1)
 
 
+def run_production():
+    """Serve the API from gunicorn workers with the monitor in its own singleton process.
+
+    The gunicorn master migrates the schema and starts, restarts and stops
+    the monitor (hooks in gunicorn.conf.py, enabled by RUN_MONITOR).
+    """
+    try:
+        from gunicorn.app.wsgiapp import WSGIApplication
+    except ImportError:
+        safe_print("gunicorn is not installed (pip install gunicorn); cannot start production mode.")
+        sys.exit(1)
+
+    os.environ["RUN_MONITOR"] = "true"
+    sys.argv = ["gunicorn", "-c", GUNICORN_CONFIG, "wsgi:app"]
+    WSGIApplication("%(prog)s [OPTIONS] [APP_MODULE]").run()
+
+
 if __name__ == "__main__":
-    import os
+    parser = argparse.ArgumentParser(description="Traffic Alert System")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--production", action="store_true",
+                      help="run the API under gunicorn and the monitor as a separate singleton process")
+    mode.add_argument("--monitor-only", action="store_true",
+                      help="run only the monitor (exits if another monitor holds the lock)")
+    args = parser.parse_args()
 
     safe_print("Traffic Alert System Starting...")
     safe_print(f"Base directory: {BASE_DIR}")
@@ -59,6 +97,12 @@ if __name__ == "__main__":
         safe_print(f"WARNING: Map generator not found at {MAP_GENERATOR}")
 
     try:
-        run_scraper_and_server()
+        if args.production:
+            run_production()
+        elif args.monitor_only:
+            init_db()
+            run_monitor_process()
+        else:
+            run_scraper_and_server()
     except KeyboardInterrupt:
         os._exit(0)
@@ -0,0 +1,21 @@
+# wsgi.py
+"""
+WSGI entry point for production API workers, e.g.:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Only the API is served here; the monitor runs as its own singleton process
+(see `python monitor.py` / `python traffic_scraper.py --production`). The
+schema is migrated once in the gunicorn master (`on_starting` in
+gunicorn.conf.py) before workers fork; workers only open connections.
+"""
+
+import metrics
+from config import METRICS_DIR, METRICS_DUMP_INTERVAL, app, get_suggest_index
+
+# Register all Flask routes by importing the module
+import routes  # noqa: F401
+
+metrics.process_role = "api"
+metrics.start_publisher(METRICS_DIR, METRICS_DUMP_INTERVAL)  # A scrape reaches one worker
+get_suggest_index().refresh()